@@ -0,0 +1,15 @@
+# burnermanagement/backends/__init__.py
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_backend = None
+
+def get_backend():
+    """The data backend selected by settings.DATA_BACKEND (created once per process)"""
+    global _backend
+    
+    if _backend is None:
+        _backend = import_string(settings.DATA_BACKEND)()
+        if settings.METRICS_ENABLED:
+            _backend.instrument()
+    return _backend
@@ -0,0 +1,21 @@
+# burnermanagement/backends/base.py
+
+class BaseBackend:
+    """Data backend behind the Firestore-backed models.
+
+    get_client() returns an object with the Firestore client API the models
+    use: collection()/document()/collection_group(), where/order_by/limit/
+    select/start_after queries, stream()/get(), set/update/delete with
+    Increment and SERVER_TIMESTAMP transforms, count()/sum() aggregations,
+    batch(), get_all() and transactions through run_in_transaction().
+    """
+
+    def get_client(self):
+        raise NotImplementedError
+
+    def run_in_transaction(self, callback, *args, **kwargs):
+        """Run callback(transaction, *args, **kwargs) atomically and return its result"""
+        raise NotImplementedError
+
+    def instrument(self):
+        """Count client operations in burnermanagement.metrics (called once per process)"""
@@ -0,0 +1,44 @@
+# burnermanagement/backends/firestore.py
+from firebase_admin import firestore
+from google.cloud.firestore_v1 import aggregation, batch, client, document, query, transaction
+from burnermanagement.firebase_config import initialize_firebase
+from burnermanagement.metrics import collection_of_path, count_calls, count_get_all, count_writes
+from .base import BaseBackend
+
+# Attempts before a contended transaction gives up
+TRANSACTION_MAX_ATTEMPTS = 10
+
+class FirestoreBackend(BaseBackend):
+    """Cloud Firestore (or the emulator when FIRESTORE_EMULATOR_HOST is set)"""
+
+    def get_client(self):
+        return initialize_firebase()
+
+    def run_in_transaction(self, callback, *args, **kwargs):
+        db = self.get_client()
+        if db is None:
+            raise RuntimeError("Firestore client not available")
+
+        transaction = db.transaction(max_attempts=TRANSACTION_MAX_ATTEMPTS)
+        return firestore.transactional(callback)(transaction, *args, **kwargs)
+
+    def instrument(self):
+        count_calls(document.DocumentReference, 'get', 'get', lambda ref: collection_of_path(ref.path))
+        # Query.get() and CollectionReference.stream()/get() all go through Query.stream()
+        count_calls(query.Query, 'stream', 'query', lambda q: q._parent.id)
+        count_calls(aggregation.AggregationQuery, 'stream', 'aggregation', lambda a: a._nested_query._parent.id)
+        count_get_all(client.Client)
+        # DocumentReference.set()/update()/delete() commit through a WriteBatch
+        count_writes(batch.WriteBatch, 'commit', _pending_writes)
+        count_writes(transaction.Transaction, '_commit', _pending_writes)
+
+
+def _pending_writes(writer, *args, **kwargs):
+    for write in writer._write_pbs:
+        kind = type(write).pb(write).WhichOneof('operation')
+        if kind == 'delete':
+            yield collection_of_path(write.delete), 'delete'
+        elif kind == 'update':
+            yield collection_of_path(write.update.name), 'write'
+        elif kind == 'transform':
+            yield collection_of_path(write.transform.document), 'write'
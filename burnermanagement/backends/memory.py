@@ -0,0 +1,700 @@
+# burnermanagement/backends/memory.py
+import queue
+import random
+import string
+import threading
+from datetime import datetime, timezone
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1.transforms import (
+    ArrayRemove, ArrayUnion, DELETE_FIELD, Increment, SERVER_TIMESTAMP
+)
+from google.cloud.firestore_v1.watch import ChangeType, DocumentChange
+from burnermanagement.metrics import collection_of_path, count_calls, count_get_all, count_writes
+from .base import BaseBackend
+
+DOCUMENT_ID = '__name__'
+MAX_BATCH_WRITES = 500
+
+
+def _auto_id():
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=20))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _normalize(value):
+    """Store values the way Firestore returns them: naive datetimes are UTC"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _split_path(field_path):
+    """Split a dotted field path; `backtick quoted` segments may contain dots"""
+    if '`' not in field_path:
+        return field_path.split('.')
+    parts, current, quoted = [], '', False
+    for char in field_path:
+        if char == '`':
+            quoted = not quoted
+        elif char == '.' and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    parts.append(current)
+    return parts
+
+
+def _get_field(data, field_path):
+    for part in _split_path(field_path):
+        if not isinstance(data, dict) or part not in data:
+            raise KeyError(field_path)
+        data = data[part]
+    return data
+
+
+def _apply(data, parts, value):
+    """Write one field (given as path segments), resolving Firestore transforms"""
+    target = data
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    key = parts[-1]
+
+    if value is DELETE_FIELD:
+        target.pop(key, None)
+    elif value is SERVER_TIMESTAMP:
+        target[key] = _now()
+    elif isinstance(value, Increment):
+        current = target.get(key)
+        target[key] = (current if isinstance(current, (int, float)) else 0) + value.value
+    elif isinstance(value, ArrayUnion):
+        current = list(target.get(key) or [])
+        target[key] = current + [v for v in _normalize(list(value.values)) if v not in current]
+    elif isinstance(value, ArrayRemove):
+        removed = _normalize(list(value.values))
+        target[key] = [v for v in (target.get(key) or []) if v not in removed]
+    else:
+        target[key] = _normalize(_copy(value))
+
+
+def _merge(data, updates, prefix=()):
+    """Write a document's fields; nested maps merge key by key"""
+    for key, value in updates.items():
+        parts = prefix + (key,)
+        if isinstance(value, dict) and value:
+            _merge(data, value, parts)
+        else:
+            _apply(data, parts, value)
+
+
+def _type_rank(value):
+    # Firestore orders values of different types by type first
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, list):
+        return 6
+    if isinstance(value, dict):
+        return 7
+    return 5
+
+
+def _sort_key(value):
+    return (_type_rank(value), value if _type_rank(value) in (1, 2, 3, 4) else 0)
+
+
+def _compare(left, op, right):
+    if op == '==':
+        return left == right
+    if op == '!=':
+        return left != right
+    if op == 'in':
+        return left in right
+    if op == 'not-in':
+        return left not in right
+    if op == 'array_contains':
+        return isinstance(left, list) and right in left
+    if op == 'array_contains_any':
+        return isinstance(left, list) and any(v in left for v in right)
+    # Range filters only match values of the same type
+    if _type_rank(left) != _type_rank(right):
+        return False
+    if op == '<':
+        return left < right
+    if op == '<=':
+        return left <= right
+    if op == '>':
+        return left > right
+    if op == '>=':
+        return left >= right
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data, field_paths=None):
+        self.reference = reference
+        self._data = data
+        self._field_paths = field_paths
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        if self._field_paths is None:
+            return _copy(self._data)
+        projected = {}
+        for field_path in self._field_paths:
+            try:
+                _apply(projected, _split_path(field_path), _get_field(self._data, field_path))
+            except KeyError:
+                pass
+        return projected
+
+    def get(self, field_path):
+        return _copy(_get_field(self._data or {}, field_path))
+
+
+class Query:
+    def __init__(self, client, collection_path=None, collection_id=None, filters=(),
+                 orders=(), limit=None, offset=0, projection=None, start=None, end=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._collection_id = collection_id  # collection group queries
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._projection = projection
+        self._start = start
+        self._end = end
+
+    def _copy_with(self, **changes):
+        options = {
+            'collection_path': self._collection_path,
+            'collection_id': self._collection_id,
+            'filters': self._filters,
+            'orders': self._orders,
+            'limit': self._limit,
+            'offset': self._offset,
+            'projection': self._projection,
+            'start': self._start,
+            'end': self._end,
+        }
+        options.update(changes)
+        return Query(self._client, **options)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy_with(filters=self._filters + ((field_path, op_string, _normalize(value)),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy_with(orders=self._orders + ((field_path, direction == 'DESCENDING'),))
+
+    def limit(self, count):
+        return self._copy_with(limit=count)
+
+    def offset(self, num_to_skip):
+        return self._copy_with(offset=num_to_skip)
+
+    def select(self, field_paths):
+        return self._copy_with(projection=list(field_paths))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy_with(start=(document_fields_or_snapshot, False))
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._copy_with(start=(document_fields_or_snapshot, True))
+
+    def end_before(self, document_fields_or_snapshot):
+        return self._copy_with(end=(document_fields_or_snapshot, False))
+
+    def end_at(self, document_fields_or_snapshot):
+        return self._copy_with(end=(document_fields_or_snapshot, True))
+
+    def _value(self, doc_id, data, field_path):
+        if field_path == DOCUMENT_ID:
+            return doc_id
+        return _get_field(data, field_path)
+
+    def _cursor_key(self, cursor):
+        """Sort key for a start/end cursor (snapshot, dict or list of values)"""
+        if isinstance(cursor, DocumentSnapshot):
+            data = cursor._data or {}
+            values = [self._value(cursor.id, data, f) for f, _ in self._orders]
+            return [_sort_key(v) for v in values] + [cursor.reference.path]
+        if isinstance(cursor, dict):
+            cursor = [cursor[f] for f, _ in self._orders]
+        return [_sort_key(_normalize(v)) for v in cursor]
+
+    def _matches(self):
+        client = self._client
+        if self._collection_id is not None:
+            collections = [
+                (path, docs) for path, docs in client._collections.items()
+                if path.rsplit('/', 1)[-1] == self._collection_id
+            ]
+        else:
+            collections = [(self._collection_path, client._collections.get(self._collection_path, {}))]
+
+        rows = []
+        for path, docs in collections:
+            for doc_id, data in docs.items():
+                try:
+                    if not all(_compare(self._value(doc_id, data, f), op, v) for f, op, v in self._filters):
+                        continue
+                    keys = [_sort_key(self._value(doc_id, data, f)) for f, _ in self._orders]
+                except KeyError:
+                    # Docs missing a filtered or ordered field never match
+                    continue
+                rows.append((keys, f'{path}/{doc_id}', data))
+
+        # Sort by each order field (respecting direction), then document path
+        rows.sort(key=lambda row: row[1])
+        for index in reversed(range(len(self._orders))):
+            descending = self._orders[index][1]
+            rows.sort(key=lambda row: row[0][index], reverse=descending)
+
+        if self._start is not None:
+            cursor, inclusive = self._start
+            key = self._cursor_key(cursor)
+            rows = [row for row in rows if self._after(row, key, inclusive)]
+        if self._end is not None:
+            cursor, inclusive = self._end
+            key = self._cursor_key(cursor)
+            rows = [row for row in rows if not self._after(row, key, not inclusive)]
+
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return rows
+
+    def _after(self, row, cursor_key, inclusive):
+        """True if row sorts after the cursor (or level with it when inclusive)"""
+        row_key = list(row[0]) + [row[1]]
+        for index, cursor_value in enumerate(cursor_key):
+            value = row_key[index]
+            descending = index < len(self._orders) and self._orders[index][1]
+            if value != cursor_value:
+                return (value < cursor_value) if descending else (value > cursor_value)
+        return inclusive
+
+    def stream(self, transaction=None, **kwargs):
+        with self._client._lock:
+            rows = self._matches()
+            snapshots = [
+                DocumentSnapshot(self._client.document(path), _copy(data), self._projection)
+                for _, path, data in rows
+            ]
+        return iter(snapshots)
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream(transaction=transaction))
+
+    def count(self, alias=None):
+        return AggregationQuery(self).count(alias)
+
+    def sum(self, field_ref, alias=None):
+        return AggregationQuery(self).sum(field_ref, alias)
+
+    def avg(self, field_ref, alias=None):
+        return AggregationQuery(self).avg(field_ref, alias)
+
+    def on_snapshot(self, callback):
+        return self._client._watch(self, callback)
+
+
+class AggregationQuery:
+    def __init__(self, query):
+        self._query = query
+        self._aggregations = []
+
+    def count(self, alias=None):
+        self._aggregations.append(('count', None, alias or 'count'))
+        return self
+
+    def sum(self, field_ref, alias=None):
+        self._aggregations.append(('sum', field_ref, alias or 'sum'))
+        return self
+
+    def avg(self, field_ref, alias=None):
+        self._aggregations.append(('avg', field_ref, alias or 'avg'))
+        return self
+
+    def get(self, transaction=None, **kwargs):
+        with self._query._client._lock:
+            rows = self._query._matches()
+            results = []
+            for kind, field_path, alias in self._aggregations:
+                if kind == 'count':
+                    results.append(AggregationResult(alias, len(rows)))
+                    continue
+                values = []
+                for _, _, data in rows:
+                    try:
+                        value = _get_field(data, field_path)
+                    except KeyError:
+                        continue
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        values.append(value)
+                if kind == 'sum':
+                    results.append(AggregationResult(alias, sum(values)))
+                else:
+                    results.append(AggregationResult(alias, sum(values) / len(values) if values else None))
+        return [results]
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        super().__init__(client, collection_path=path)
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        if '/' not in self._path:
+            return None
+        return self._client.document(self._path.rsplit('/', 1)[0])
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, f'{self._path}/{document_id or _auto_id()}')
+
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        reference.create(document_data)
+        return _now(), reference
+
+    def list_documents(self, page_size=None):
+        with self._client._lock:
+            ids = list(self._client._collections.get(self._path, {}))
+        return [self.document(doc_id) for doc_id in ids]
+
+
+class DocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        return self._client.collection(self.path.rsplit('/', 1)[0])
+
+    def collection(self, collection_id):
+        return CollectionReference(self._client, f'{self.path}/{collection_id}')
+
+    def collections(self, page_size=None):
+        prefix = f'{self.path}/'
+        with self._client._lock:
+            paths = [
+                path for path, docs in self._client._collections.items()
+                if docs and path.startswith(prefix) and '/' not in path[len(prefix):]
+            ]
+        return [CollectionReference(self._client, path) for path in paths]
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        data = self._client._read(self.path)
+        return DocumentSnapshot(self, data, list(field_paths) if field_paths else None)
+
+    def create(self, document_data):
+        self._client._write([('create', self.path, document_data, None)])
+
+    def set(self, document_data, merge=False):
+        self._client._write([('set', self.path, document_data, merge)])
+
+    def update(self, field_updates):
+        self._client._write([('update', self.path, field_updates, None)])
+
+    def delete(self):
+        self._client._write([('delete', self.path, None, None)])
+
+    def on_snapshot(self, callback):
+        query = Query(self._client, self.path.rsplit('/', 1)[0], filters=((DOCUMENT_ID, '==', self.id),))
+        return self._client._watch(query, lambda docs, changes, read_time: callback(
+            docs or [DocumentSnapshot(self, None)], changes, read_time
+        ))
+
+
+class Watch:
+    """Listener handle returned by on_snapshot(); callbacks run on the client's dispatch thread"""
+
+    def __init__(self, client, query, callback):
+        self._client = client
+        self._query = query
+        self._callback = callback
+        self._docs = {}  # path -> data as of the last callback
+        self.is_active = True
+
+    def _diff(self):
+        """Changes since the last call, as (snapshots, changes); None if nothing changed"""
+        rows = self._query._matches()
+        current = {path: data for _, path, data in rows}
+        snapshots = [
+            DocumentSnapshot(self._client.document(path), _copy(data), self._query._projection)
+            for _, path, data in rows
+        ]
+        index = {snapshot.reference.path: i for i, snapshot in enumerate(snapshots)}
+        old_index = {path: i for i, path in enumerate(self._docs)}
+
+        changes = []
+        for path in self._docs:
+            if path not in current:
+                snapshot = DocumentSnapshot(self._client.document(path), _copy(self._docs[path]))
+                changes.append(DocumentChange(ChangeType.REMOVED, snapshot, old_index[path], -1))
+        for path, data in current.items():
+            if path not in self._docs:
+                changes.append(DocumentChange(ChangeType.ADDED, snapshots[index[path]], -1, index[path]))
+            elif self._docs[path] != data:
+                changes.append(DocumentChange(
+                    ChangeType.MODIFIED, snapshots[index[path]], old_index[path], index[path]
+                ))
+
+        self._docs = {path: _copy(data) for path, data in current.items()}
+        return (snapshots, changes) if changes else None
+
+    def unsubscribe(self):
+        self.is_active = False
+        self._client._unwatch(self)
+
+    close = unsubscribe
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference.path, document_data, None))
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('set', reference.path, document_data, merge))
+
+    def update(self, reference, field_updates):
+        self._writes.append(('update', reference.path, field_updates, None))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference.path, None, None))
+
+    def commit(self):
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"A batch can contain at most {MAX_BATCH_WRITES} writes")
+        self._client._write(self._writes)
+        self._writes = []
+        return []
+
+
+class Transaction(WriteBatch):
+    """Buffers writes until commit; reads see committed data (run under the client lock)"""
+
+    def __init__(self, client, max_attempts=None, read_only=False):
+        super().__init__(client)
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, DocumentReference):
+            return iter([ref_or_query.get()])
+        return ref_or_query.stream()
+
+    def get_all(self, references, **kwargs):
+        return self._client.get_all(references)
+
+
+class MemoryClient:
+    """Thread-safe in-process stand-in for google.cloud.firestore.Client"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._collections = {}  # collection path -> {document id: data}
+        self._watches = []
+        self._dispatch_queue = None
+
+    def reset(self):
+        with self._lock:
+            self._collections = {}
+
+    def collection(self, *path):
+        return CollectionReference(self, '/'.join(path))
+
+    def document(self, *path):
+        return DocumentReference(self, '/'.join(path))
+
+    def collection_group(self, collection_id):
+        return Query(self, collection_id=collection_id)
+
+    def collections(self):
+        with self._lock:
+            paths = [path for path, docs in self._collections.items() if docs and '/' not in path]
+        return [CollectionReference(self, path) for path in paths]
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return Transaction(self, **kwargs)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        field_paths = list(field_paths) if field_paths else None
+        with self._lock:
+            snapshots = [
+                DocumentSnapshot(reference, self._read(reference.path), field_paths)
+                for reference in references
+            ]
+        return iter(snapshots)
+
+    def _watch(self, query, callback):
+        watch = Watch(self, query, callback)
+        with self._lock:
+            self._watches.append(watch)
+            if self._dispatch_queue is None:
+                self._dispatch_queue = queue.Queue()
+                threading.Thread(target=self._dispatch, daemon=True).start()
+            # Like Firestore, the first callback carries the whole result set
+            snapshots, changes = watch._diff() or ([], [])
+            self._dispatch_queue.put((watch, snapshots, changes, _now()))
+        return watch
+
+    def _unwatch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _notify(self):
+        for watch in self._watches:
+            diff = watch._diff()
+            if diff:
+                self._dispatch_queue.put((watch, *diff, _now()))
+
+    def _dispatch(self):
+        while True:
+            watch, snapshots, changes, read_time = self._dispatch_queue.get()
+            if not watch.is_active:
+                continue
+            try:
+                watch._callback(snapshots, changes, read_time)
+            except Exception as e:
+                print(f"Error in snapshot listener: {e}")
+
+    def _read(self, path):
+        collection_path, doc_id = path.rsplit('/', 1)
+        with self._lock:
+            data = self._collections.get(collection_path, {}).get(doc_id)
+            return _copy(data) if data is not None else None
+
+    def _write(self, writes):
+        """Apply writes atomically - all of them or none"""
+        with self._lock:
+            staged = {}
+            for kind, path, document_data, merge in writes:
+                collection_path, doc_id = path.rsplit('/', 1)
+                if path in staged:
+                    current = staged[path]
+                else:
+                    current = self._collections.get(collection_path, {}).get(doc_id)
+
+                if kind == 'delete':
+                    staged[path] = None
+                    continue
+                if kind == 'create' and current is not None:
+                    raise AlreadyExists(f"Document already exists: {path}")
+                if kind == 'update' and current is None:
+                    raise NotFound(f"No document to update: {path}")
+
+                data = _copy(current) if (current is not None and kind != 'create' and
+                                          (kind == 'update' or merge)) else {}
+                if kind == 'update':
+                    for field_path, value in document_data.items():
+                        _apply(data, _split_path(field_path), value)
+                else:
+                    _merge(data, document_data)
+                staged[path] = data
+
+            for path, data in staged.items():
+                collection_path, doc_id = path.rsplit('/', 1)
+                if data is None:
+                    self._collections.get(collection_path, {}).pop(doc_id, None)
+                else:
+                    self._collections.setdefault(collection_path, {})[doc_id] = data
+
+            if self._watches:
+                self._notify()
+
+
+class MemoryBackend(BaseBackend):
+    """In-process data store for tests, load tests and benchmarks - nothing leaves the process"""
+
+    def __init__(self):
+        self.client = MemoryClient()
+
+    def get_client(self):
+        return self.client
+
+    def run_in_transaction(self, callback, *args, **kwargs):
+        # Holding the client lock for the whole callback makes transactions serializable
+        with self.client._lock:
+            transaction = self.client.transaction()
+            result = callback(transaction, *args, **kwargs)
+            transaction.commit()
+        return result
+
+    def instrument(self):
+        count_calls(DocumentReference, 'get', 'get', lambda ref: collection_of_path(ref.path))
+        count_calls(Query, 'stream', 'query', lambda q: q._collection_id or q._collection_path.rsplit('/', 1)[-1])
+        count_calls(AggregationQuery, 'get', 'aggregation', lambda a: a._query._collection_id or
+                    a._query._collection_path.rsplit('/', 1)[-1])
+        count_get_all(MemoryClient)
+        count_writes(MemoryClient, '_write', lambda client, writes: (
+            (collection_of_path(path), 'delete' if kind == 'delete' else 'write')
+            for kind, path, _, _ in writes
+        ))
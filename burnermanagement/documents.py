@@ -0,0 +1,265 @@
+# burnermanagement/documents.py
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import caches
+from .firebase_config import get_firestore_client
+from .metrics import record_cache
+from .singleflight import invalidate_reads, single_flight
+
+_MISSING = object()
+
+# Documents per get_all() round trip
+GET_ALL_CHUNK_SIZE = 100
+
+# Firestore's limit on writes in one batch
+MAX_BATCH_WRITES = 500
+
+
+class DocumentFetchError(Exception):
+    """Raised by strict reads when documents couldn't be fetched (as opposed to not existing)"""
+
+
+def decode_datetime(value):
+    """Firestore timestamps -> naive UTC datetimes, which the models compare against utcnow()"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if hasattr(value, 'timestamp'):
+        return datetime.fromtimestamp(value.timestamp(), timezone.utc).replace(tzinfo=None)
+    # Leave anything else alone so callers can spot bad data
+    return value
+
+
+class BatchWriter:
+    """Queues writes and commits them in batches of at most MAX_BATCH_WRITES.
+
+    Each batch is atomic on its own, but a run spanning several batches is
+    not, so callers should order their writes such that a partial run can
+    simply be repeated.
+    """
+
+    def __init__(self, db, batch_size=MAX_BATCH_WRITES):
+        self.db = db
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self.batch = None
+        self.pending = 0
+        self.committed = 0
+
+    def _queued(self):
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.commit()
+
+    def _current(self):
+        if self.batch is None:
+            self.batch = self.db.batch()
+        return self.batch
+
+    def create(self, ref, data):
+        self._current().create(ref, data)
+        self._queued()
+
+    def set(self, ref, data, merge=False):
+        self._current().set(ref, data, merge=merge)
+        self._queued()
+
+    def update(self, ref, data):
+        self._current().update(ref, data)
+        self._queued()
+
+    def delete(self, ref):
+        self._current().delete(ref)
+        self._queued()
+
+    def commit(self):
+        if self.pending:
+            self.batch.commit()
+            self.committed += self.pending
+        self.batch = None
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+
+
+class Field:
+    """One Firestore document field and the model attribute it decodes into"""
+
+    def __init__(self, name, attr=None, default=None, decode=None):
+        self.name = name
+        self.attr = attr or name
+        self.default = default
+        self.decode = decode
+
+    def default_value(self):
+        # Fresh containers per object so instances never share a dict
+        return self.default() if callable(self.default) else self.default
+
+
+class DocumentMeta(type):
+    """Builds __slots__ and the decode plan from a model's `fields` schema"""
+
+    def __new__(mcs, name, bases, namespace):
+        fields = namespace.get('fields', ())
+        inherited = {slot for base in bases for slot in getattr(base, '_all_slots', ())}
+        slots = tuple(
+            slot for slot in [f.attr for f in fields] + list(namespace.get('extra_slots', ()))
+            if slot not in inherited
+        )
+        namespace['__slots__'] = slots
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._all_slots = tuple(inherited) + slots
+        cls._fields_by_attr = {f.attr: f for f in fields}
+        cls._decode_plan = tuple((f.name, f.attr, f, f.decode) for f in fields)
+        return cls
+
+
+class FirestoreDocument(metaclass=DocumentMeta):
+    """Base for models stored as Firestore documents.
+
+    Subclasses declare `fields`, a tuple of Field, and get __slots__ plus a
+    single decode path from document data. `extra_slots` names any other
+    per-instance attributes the model needs.
+
+    Whole-document reads by ID go through get_many(), which serves what it
+    can from the DOCUMENT_CACHE_ALIAS cache and fetches the rest with
+    batched get_all() calls. Models with an `archive_collection` fall back
+    to it for IDs missing from the main collection.
+    """
+
+    collection = None
+    archive_collection = None
+    fields = ()
+    extra_slots = ('id',)
+
+    def __init__(self, id=None, **data):
+        self._decode(id, data)
+
+    @classmethod
+    def from_dict(cls, doc_id, data):
+        obj = cls.__new__(cls)
+        obj._decode(doc_id, data)
+        return obj
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls.from_dict(snapshot.id, snapshot.to_dict() or {})
+
+    @classmethod
+    def field_paths(cls, *attrs):
+        """Firestore field names for model attributes, for projected (select) reads"""
+        return [cls._fields_by_attr[attr].name for attr in attrs]
+
+    @classmethod
+    def cache_key(cls, doc_id):
+        return f"doc:{cls.collection}:{doc_id}"
+
+    @classmethod
+    def get_cache(cls):
+        if not settings.DOCUMENT_CACHE_TIMEOUT:
+            return None
+        return caches[settings.DOCUMENT_CACHE_ALIAS]
+
+    @classmethod
+    def invalidate(cls, *doc_ids):
+        """Drop cached copies, and any cached list reads, after a document changes"""
+        cache = cls.get_cache()
+        if cache is not None:
+            cache.delete_many([cls.cache_key(doc_id) for doc_id in doc_ids])
+        invalidate_reads(cls.collection)
+
+    @classmethod
+    def get_many(cls, doc_ids, fields=None, strict=False):
+        """Fetch several documents in as few round trips as possible.
+
+        Returns objects in the order of doc_ids, skipping IDs that don't
+        exist. Projected reads (fields) bypass the cache. Read errors are
+        logged and those documents skipped too, unless strict is set: then
+        DocumentFetchError is raised, so a missing document really is gone.
+        """
+        doc_ids = list(dict.fromkeys(doc_id for doc_id in doc_ids if doc_id))
+        if not doc_ids:
+            return []
+
+        cache = cls.get_cache() if not fields else None
+        found = {}
+        if cache is not None:
+            cached = cache.get_many([cls.cache_key(doc_id) for doc_id in doc_ids])
+            for doc_id in doc_ids:
+                obj = cached.get(cls.cache_key(doc_id))
+                if obj is not None:
+                    found[doc_id] = obj
+
+        missing = [doc_id for doc_id in doc_ids if doc_id not in found]
+        if cache is not None:
+            record_cache('documents', 'hit', len(found))
+            record_cache('documents', 'miss', len(missing))
+        if missing:
+            # Requests missing the same documents at once share one fetch
+            flight_key = (cls.collection, tuple(missing), tuple(fields or ()), strict)
+            fetched = single_flight.do(flight_key, cls._fetch_many, missing, fields, strict)
+            found.update(fetched)
+            if cache is not None and fetched:
+                cache.set_many(
+                    {cls.cache_key(doc_id): obj for doc_id, obj in fetched.items()},
+                    settings.DOCUMENT_CACHE_TIMEOUT
+                )
+
+        return [found[doc_id] for doc_id in doc_ids if doc_id in found]
+
+    @classmethod
+    def _fetch_many(cls, doc_ids, fields=None, strict=False):
+        db = get_firestore_client()
+
+        if db is None:
+            if strict:
+                raise DocumentFetchError('Firestore is unavailable')
+            return {}
+
+        found = cls._fetch_from(db, cls.collection, doc_ids, fields, strict)
+        if cls.archive_collection:
+            archived = [doc_id for doc_id in doc_ids if doc_id not in found]
+            if archived:
+                found.update(cls._fetch_from(db, cls.archive_collection, archived, fields, strict))
+        return found
+
+    @classmethod
+    def _fetch_from(cls, db, collection_name, doc_ids, fields=None, strict=False):
+        found = {}
+        try:
+            collection = db.collection(collection_name)
+            for start in range(0, len(doc_ids), GET_ALL_CHUNK_SIZE):
+                refs = [collection.document(doc_id) for doc_id in doc_ids[start:start + GET_ALL_CHUNK_SIZE]]
+                for doc in db.get_all(refs, field_paths=fields):
+                    if doc.exists:
+                        found[doc.id] = cls.from_snapshot(doc)
+        except Exception as e:
+            print(f"Error fetching {collection_name} {doc_ids}: {e}")
+            if strict:
+                raise DocumentFetchError(f"Error fetching {collection_name}: {e}") from e
+
+        return found
+
+    @classmethod
+    def get_by_id(cls, doc_id):
+        """Get a single document by ID"""
+        results = cls.get_many([doc_id])
+        return results[0] if results else None
+
+    def _decode(self, doc_id, data):
+        self.id = doc_id
+        for name, attr, field, decode in self._decode_plan:
+            value = data.get(name, _MISSING)
+            if value is _MISSING or value is None:
+                value = field.default_value()
+            elif decode is not None:
+                value = decode(value)
+            setattr(self, attr, value)
+        for slot in self.extra_slots:
+            if slot != 'id':
+                setattr(self, slot, None)
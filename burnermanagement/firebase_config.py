@@ -13,6 +13,19 @@ def initialize_firebase():
         return _firestore_client
         
     try:
+        # Local Firestore emulator (tests, benchmarks) - no credentials needed
+        emulator_host = os.environ.get('FIRESTORE_EMULATOR_HOST')
+        if emulator_host:
+            from google.auth.credentials import AnonymousCredentials
+            from google.cloud import firestore as cloud_firestore
+            
+            project_id = getattr(settings, 'FIREBASE_WEB_CONFIG', {}).get('projectId') or 'demo-burner'
+            _firestore_client = cloud_firestore.Client(
+                project=project_id, credentials=AnonymousCredentials()
+            )
+            print(f"Using Firestore emulator at {emulator_host}")
+            return _firestore_client
+        
         # Check if Firebase is already initialized
         if not firebase_admin._apps:
             # Try to initialize Firebase
@@ -38,4 +51,11 @@ def initialize_firebase():
         return None
 
 def get_firestore_client():
-    return initialize_firebase()
\ No newline at end of file
+    """Client for the configured data backend (Firestore unless DATA_BACKEND says otherwise)"""
+    from .backends import get_backend
+    return get_backend().get_client()
+
+def run_in_transaction(callback, *args, **kwargs):
+    """Run callback(transaction, *args, **kwargs) in a transaction, retrying on contention"""
+    from .backends import get_backend
+    return get_backend().run_in_transaction(callback, *args, **kwargs)
@@ -0,0 +1,145 @@
+# burnermanagement/metrics.py
+import functools
+import hmac
+import os
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+
+# Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (an empty directory shared by
+# the workers) and every worker writes its samples to mmap files there that
+# metrics_view merges. Only counters and histograms are used, so no
+# child_exit hook is needed to clean up after dead workers.
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by view',
+    ['view', 'method', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size by view',
+    ['view'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+FIRESTORE_OPERATIONS = Counter(
+    'firestore_operations_total', 'Firestore document reads, queries and writes',
+    ['collection', 'operation'],
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups by cache and result (hit, stale or miss)',
+    ['cache', 'result'],
+)
+
+
+def record_firestore(collection, operation, amount=1):
+    if settings.METRICS_ENABLED and amount:
+        FIRESTORE_OPERATIONS.labels(collection or 'unknown', operation).inc(amount)
+
+
+def record_cache(cache, result, amount=1):
+    """Count cache lookups; result is 'hit', 'stale' or 'miss'"""
+    if settings.METRICS_ENABLED and amount:
+        CACHE_REQUESTS.labels(cache, result).inc(amount)
+
+
+def collection_of_path(path):
+    """'events/abc/tickets/xyz' (or a full resource name) -> 'tickets'"""
+    parts = path.split('/')
+    return parts[-2] if len(parts) >= 2 else path
+
+
+def _replace(cls, method_name, make_wrapper):
+    original = getattr(cls, method_name)
+    if getattr(original, '_counted', False):
+        return  # Already instrumented
+    wrapper = functools.wraps(original)(make_wrapper(original))
+    wrapper._counted = True
+    setattr(cls, method_name, wrapper)
+
+
+def count_calls(cls, method_name, operation, collection_of):
+    """Wrap cls.method_name so every call counts one Firestore operation"""
+    def make_wrapper(original):
+        def wrapper(self, *args, **kwargs):
+            try:
+                record_firestore(collection_of(self), operation)
+            except Exception:
+                pass  # Never let metrics break a read
+            return original(self, *args, **kwargs)
+        return wrapper
+    _replace(cls, method_name, make_wrapper)
+
+
+def count_get_all(cls, method_name='get_all'):
+    """Wrap a get_all(references, ...) method to count one read per document"""
+    def make_wrapper(original):
+        def wrapper(self, references, *args, **kwargs):
+            references = list(references)
+            for reference in references:
+                record_firestore(collection_of_path(reference.path), 'get')
+            return original(self, references, *args, **kwargs)
+        return wrapper
+    _replace(cls, method_name, make_wrapper)
+
+
+def count_writes(cls, method_name, writes_of):
+    """Wrap a commit method; writes_of(self, *args, **kwargs) yields (collection, operation) per write"""
+    def make_wrapper(original):
+        def wrapper(self, *args, **kwargs):
+            try:
+                for collection, operation in writes_of(self, *args, **kwargs):
+                    record_firestore(collection, operation)
+            except Exception:
+                pass
+            return original(self, *args, **kwargs)
+        return wrapper
+    _replace(cls, method_name, make_wrapper)
+
+
+def can_scrape(request):
+    """Scrapers present the METRICS_TOKEN bearer token; otherwise only staff and site admins get in"""
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'.encode()
+        if hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), expected):
+            return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and (user.is_staff or user.is_site_admin()))
+
+
+def metrics_view(request):
+    """Prometheus text exposition, merged across workers in multiprocess mode"""
+    if not can_scrape(request):
+        return HttpResponse(status=401)
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """Records latency and response size per view (by URL name, to keep label cardinality low)"""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match.route) if match else '<unmatched>'
+        REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view).observe(len(response.content))
+        return response
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',  # Outermost, to see the whole request
+    'burnermanagement.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -51,6 +53,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'users.activity.LastSeenMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -84,6 +87,14 @@ DATABASES = {
     }
 }
 
+# Cache - local memory by default, point at a shared backend (e.g. Redis) in production
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='burner-default'),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -119,6 +130,20 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Token buckets: 'N/period' allows bursts of N refilled evenly over the period
+    'DEFAULT_THROTTLE_CLASSES': [
+        'burnermanagement.throttling.IPTokenBucketThrottle',
+        'burnermanagement.throttling.UserTokenBucketThrottle',
+        'burnermanagement.throttling.EndpointTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'ip': config('THROTTLE_RATE_IP', default='120/min'),            # anonymous, per IP
+        'user': config('THROTTLE_RATE_USER', default='300/min'),        # per signed-in user
+        'scanner': config('THROTTLE_RATE_SCANNER', default='3000/min'), # per user who can_scan_tickets
+        'events': config('THROTTLE_RATE_EVENTS', default='6000/min'),   # per endpoint, all clients
+        'venues': config('THROTTLE_RATE_VENUES', default='3000/min'),
+        'status': config('THROTTLE_RATE_STATUS', default='600/min'),
+    },
 }
 
 # CORS settings
@@ -140,6 +165,12 @@ ACCOUNT_EMAIL_VERIFICATION = 'none'  # Firebase handles email verification
 ACCOUNT_LOGIN_ON_EMAIL_CONFIRMATION = False
 ACCOUNT_LOGOUT_ON_GET = False
 ACCOUNT_SESSION_REMEMBER = True
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+
+# Minimum seconds between last_login_at writes for one user
+LAST_SEEN_INTERVAL = config('LAST_SEEN_INTERVAL', default=5 * 60, cast=int)
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
@@ -178,6 +209,11 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 FIREBASE_SERVICE_ACCOUNT_KEY = config('FIREBASE_SERVICE_ACCOUNT_KEY', 
                                      default=str(BASE_DIR / 'burner-34556-firebase-adminsdk-fbsvc-16f8bd0d99.json'))
 
+# Data backend behind the Firestore models. Use
+# 'burnermanagement.backends.memory.MemoryBackend' for an in-process store
+# (tests, load tests, benchmarks) that needs no Firebase project or network.
+DATA_BACKEND = config('DATA_BACKEND', default='burnermanagement.backends.firestore.FirestoreBackend')
+
 # Firebase Configuration - Client Side (Web SDK)
 FIREBASE_WEB_CONFIG = {
     'apiKey': config('FIREBASE_API_KEY'),
@@ -188,6 +224,93 @@ FIREBASE_WEB_CONFIG = {
     'appId': config('FIREBASE_APP_ID'),
 }
 
+# Cached Event/Venue documents for get_by_id/get_many (0 disables)
+DOCUMENT_CACHE_ALIAS = 'default'
+DOCUMENT_CACHE_TIMEOUT = config('DOCUMENT_CACHE_TIMEOUT', default=30, cast=int)  # seconds
+
+# Cached list/count reads (cached_read); a miss is fetched once per process,
+# or once across processes while the cache lock is held (0 disables caching).
+# Stale results are served for READ_STALE_GRACE seconds while a background
+# refresh runs, and as a fallback on Firestore errors for READ_STALE_TIMEOUT.
+READ_CACHE_TIMEOUT = config('READ_CACHE_TIMEOUT', default=10, cast=int)  # seconds
+READ_STALE_GRACE = config('READ_STALE_GRACE', default=60, cast=int)  # seconds
+READ_STALE_TIMEOUT = config('READ_STALE_TIMEOUT', default=24 * 60 * 60, cast=int)  # seconds
+SINGLE_FLIGHT_CROSS_PROCESS = config('SINGLE_FLIGHT_CROSS_PROCESS', default=True, cast=bool)
+SINGLE_FLIGHT_LOCK_TIMEOUT = config('SINGLE_FLIGHT_LOCK_TIMEOUT', default=5, cast=int)  # seconds
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05  # seconds
+
+# Sharded ticketsSold counters
+TICKET_COUNTER_SHARDS = config('TICKET_COUNTER_SHARDS', default=20, cast=int)
+TICKET_COUNTER_CACHE_TIMEOUT = config('TICKET_COUNTER_CACHE_TIMEOUT', default=5, cast=int)  # seconds
+
+# Events dated more than this many days ago move to eventsArchive (manage.py archive_events)
+EVENT_ARCHIVE_AFTER_DAYS = config('EVENT_ARCHIVE_AFTER_DAYS', default=30, cast=int)
+
+# Live availability streams (/api/events/live/)
+LIVE_MAX_EVENTS_PER_STREAM = config('LIVE_MAX_EVENTS_PER_STREAM', default=20, cast=int)
+LIVE_HEARTBEAT_SECONDS = config('LIVE_HEARTBEAT_SECONDS', default=15, cast=int)
+
+# Ticket reservations
+TICKET_HOLD_SECONDS = config('TICKET_HOLD_SECONDS', default=600, cast=int)
+TICKET_INVENTORY_SHARDS = config('TICKET_INVENTORY_SHARDS', default=10, cast=int)
+TICKET_MAX_PER_ORDER = config('TICKET_MAX_PER_ORDER', default=6, cast=int)
+
+# Payments (tickets.payments). A hold becomes tickets only once PAYMENT_PROVIDER
+# (dotted path to a BasePaymentProvider) confirms the payment server-side, or
+# the provider posts a webhook to /api/tickets/payments/webhook/ signed with
+# PAYMENT_WEBHOOK_SECRET (hex HMAC-SHA256 of the body in X-Payment-Signature).
+PAYMENT_PROVIDER = config('PAYMENT_PROVIDER', default='tickets.payments.UnconfiguredProvider')
+PAYMENT_WEBHOOK_SECRET = config('PAYMENT_WEBHOOK_SECRET', default='')
+
+# Ed25519 keys signing ticket QR codes (tickets.signing). TICKET_SIGNING_KEY is a
+# base64url 32-byte private key, e.g. from
+#   python -c "import base64, os; print(base64.urlsafe_b64encode(os.urandom(32)).decode())"
+# Left empty, ticket codes are neither issued nor checked.
+# TICKET_VERIFY_KEYS lists retired public keys (comma-separated) still accepted.
+TICKET_SIGNING_KEY = config('TICKET_SIGNING_KEY', default='')
+TICKET_VERIFY_KEYS = config('TICKET_VERIFY_KEYS', default='')
+TICKET_PAYLOAD_VALID_HOURS = config('TICKET_PAYLOAD_VALID_HOURS', default=12, cast=int)  # after the event starts
+TICKET_UNDATED_PAYLOAD_VALID_DAYS = config('TICKET_UNDATED_PAYLOAD_VALID_DAYS', default=365, cast=int)  # after purchase
+TICKET_QR_CACHE_TIMEOUT = config('TICKET_QR_CACHE_TIMEOUT', default=86400, cast=int)  # seconds
+
+# Hourly/daily sales rollups per event and venue (events.rollups); each bucket
+# is split over this many shard documents to spread on-sale writes, as wide as
+# the ticketsSold counter by default
+SALES_ROLLUP_SHARDS = config('SALES_ROLLUP_SHARDS', default=TICKET_COUNTER_SHARDS, cast=int)
+SALES_SERIES_CACHE_TIMEOUT = config('SALES_SERIES_CACHE_TIMEOUT', default=30, cast=int)  # seconds
+
+# Documents read per Firestore page by the streaming CSV/NDJSON exports
+EXPORT_PAGE_SIZE = config('EXPORT_PAGE_SIZE', default=500, cast=int)
+
+# Largest CSV accepted by the bulk event import (manage.py import_events, /api/events/import/)
+EVENT_IMPORT_MAX_ROWS = config('EVENT_IMPORT_MAX_ROWS', default=1000, cast=int)
+
+# Occurrences per recurring event series; each series is written in one batch, so keep this under 500
+EVENT_SERIES_MAX_OCCURRENCES = config('EVENT_SERIES_MAX_OCCURRENCES', default=104, cast=int)
+
+# Materialized home feed (feeds/home); workers re-read the document after the cache timeout
+HOME_FEED_FEATURED_COUNT = config('HOME_FEED_FEATURED_COUNT', default=6, cast=int)
+HOME_FEED_UPCOMING_COUNT = config('HOME_FEED_UPCOMING_COUNT', default=12, cast=int)
+HOME_FEED_CACHE_TIMEOUT = config('HOME_FEED_CACHE_TIMEOUT', default=60, cast=int)  # seconds
+
+# Virtual waiting room for high-demand on-sales
+WAITING_ROOM_DEFAULT_RATE = config('WAITING_ROOM_DEFAULT_RATE', default=200, cast=int)  # admissions per minute
+WAITING_ROOM_TOKEN_MAX_AGE = config('WAITING_ROOM_TOKEN_MAX_AGE', default=6 * 60 * 60, cast=int)  # seconds
+WAITING_ROOM_PASS_SECONDS = config('WAITING_ROOM_PASS_SECONDS', default=15 * 60, cast=int)
+
+# Prometheus metrics at /api/metrics/ (set PROMETHEUS_MULTIPROC_DIR under gunicorn)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # Bearer token for scrapers; without one only staff can read
+
+# Request profiling (core.profiling.ProfilingMiddleware); dumps are listed at /api/profiles/
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)  # share of requests
+PROFILING_PATHS = config('PROFILING_PATHS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOKEN = config('PROFILING_TOKEN', default='')  # X-Profile value that forces a profile
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = config('PROFILING_MAX_FILES', default=200, cast=int)
+
 # Logging configuration
 LOGGING = {
     'version': 1,
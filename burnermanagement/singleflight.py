@@ -0,0 +1,186 @@
+# burnermanagement/singleflight.py
+import functools
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from .metrics import record_cache
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key within this process.
+
+    The first caller for a key runs the function; anyone arriving while it
+    is in flight waits and gets the same result (or exception) instead of
+    repeating the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+single_flight = SingleFlight()
+
+
+def _cache():
+    return caches[settings.DOCUMENT_CACHE_ALIAS]
+
+
+def _version_key(name):
+    return f"read:{name}:version"
+
+
+def invalidate_reads(name):
+    """Drop every cached_read result for name by moving it to a new key version"""
+    cache = _cache()
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.add(_version_key(name), 1, None)
+
+
+def _entry_key(name, fn, args, kwargs):
+    call = repr((fn.__name__, args, sorted(kwargs.items())))
+    return f"read:{name}:{hashlib.md5(call.encode()).hexdigest()}"
+
+
+def _store(cache, key, version, value):
+    cache.set(key, {
+        'value': value,
+        'version': version,
+        'fresh_until': time.time() + settings.READ_CACHE_TIMEOUT,
+    }, settings.READ_STALE_TIMEOUT)
+
+
+def _is_fresh(entry, version):
+    return entry is not None and entry['version'] == version and time.time() < entry['fresh_until']
+
+
+def cached_read(name, default=None):
+    """Cache a model read classmethod with stale-while-revalidate, fetching each miss once.
+
+    Results are fresh for READ_CACHE_TIMEOUT seconds. For READ_STALE_GRACE
+    seconds after that the old result is still served while a background
+    thread refreshes it, so only a read after a long quiet spell waits on
+    Firestore. If a fetch fails, the last good result (kept for
+    READ_STALE_TIMEOUT) is served, and only without one does the read
+    return `default` (a callable default is called).
+
+    Concurrent misses in one process are coalesced with single_flight. With
+    SINGLE_FLIGHT_CROSS_PROCESS on, the fetching process also holds a cache
+    lock so other processes wait for its result rather than querying too.
+    Call invalidate_reads(name) after writes that change the results.
+    """
+    def fallback(error, entry):
+        if entry is not None:
+            print(f"Serving stale {name} after error: {error}")
+            return entry['value']
+        return default() if callable(default) else default
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(cls, *args, **kwargs):
+            if not settings.READ_CACHE_TIMEOUT:
+                try:
+                    return fn(cls, *args, **kwargs)
+                except Exception as e:
+                    return fallback(e, None)
+
+            cache = _cache()
+            version = cache.get(_version_key(name), 0)
+            key = _entry_key(name, fn, args, kwargs)
+
+            entry = cache.get(key)
+            if entry is not None and entry['version'] == version:
+                age = time.time() - entry['fresh_until']
+                if age < 0:
+                    record_cache(name, 'hit')
+                    return entry['value']
+                if age < settings.READ_STALE_GRACE:
+                    record_cache(name, 'stale')
+                    _refresh(cls, cache, key, version, args, kwargs)
+                    return entry['value']
+            record_cache(name, 'miss')
+
+            try:
+                return single_flight.do((key, version), _load, cls, cache, key, version, args, kwargs)
+            except Exception as e:
+                # Even a result from before the last invalidation beats an empty page
+                return fallback(e, entry)
+
+        def _load(cls, cache, key, version, args, kwargs):
+            lock_key = f"{key}:lock"
+            timeout = settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+            locked = settings.SINGLE_FLIGHT_CROSS_PROCESS and cache.add(lock_key, 1, timeout)
+            if settings.SINGLE_FLIGHT_CROSS_PROCESS and not locked:
+                # Another process is fetching; wait for its result
+                deadline = time.monotonic() + timeout
+                while time.monotonic() < deadline:
+                    time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+                    entry = cache.get(key)
+                    if _is_fresh(entry, version):
+                        return entry['value']
+                    if cache.get(lock_key) is None:
+                        break  # It failed, or finished without caching
+
+            try:
+                value = fn(cls, *args, **kwargs)
+                _store(cache, key, version, value)
+                return value
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+
+        def _refresh(cls, cache, key, version, args, kwargs):
+            # One refresh at a time per key (across processes with a shared cache)
+            lock_key = f"{key}:refresh"
+            if not cache.add(lock_key, 1, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+                return
+
+            def run():
+                try:
+                    _store(cache, key, version, fn(cls, *args, **kwargs))
+                except Exception as e:
+                    print(f"Error refreshing {name}, still serving the stale copy: {e}")
+                finally:
+                    cache.delete(lock_key)
+
+            threading.Thread(target=run, daemon=True).start()
+
+        return wrapper
+    return decorator
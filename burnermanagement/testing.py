@@ -0,0 +1,39 @@
+# burnermanagement/testing.py
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase
+from django.utils import timezone
+from .backends.memory import MemoryBackend
+
+
+class MemoryBackendTestCase(TestCase):
+    """TestCase whose Firestore models run against a fresh in-memory backend and empty caches"""
+
+    def setUp(self):
+        super().setUp()
+        self.backend = MemoryBackend()
+        patcher = mock.patch('burnermanagement.backends._backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.db = self.backend.get_client()
+
+    def create_venue(self, venue_id='venue-1', **data):
+        self.db.collection('venues').document(venue_id).set(dict({'name': 'The Venue', 'city': 'Berlin'}, **data))
+        return venue_id
+
+    def create_event(self, event_id='event-1', **data):
+        self.db.collection('events').document(event_id).set(dict({
+            'name': 'Test Event',
+            'venue': 'The Venue',
+            'venueId': 'venue-1',
+            'date': timezone.now() + timedelta(days=7),
+            'price': 10.0,
+            'maxTickets': 100,
+            'ticketsSold': 0,
+            'isActive': True,
+        }, **data))
+        return event_id
@@ -0,0 +1,116 @@
+# burnermanagement/throttling.py
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def take_token(cache, key, capacity, period, now):
+    """Take one token from the bucket stored at key.
+
+    The bucket is two cache entries: when it last started refilling and how
+    many tokens have been taken since, bumped with the cache's atomic incr.
+    Tokens available = capacity + refilled since start - taken. Whenever the
+    bucket is found full the clock restarts, so idle time can't bank more
+    than capacity; that reset isn't atomic, but it only races while the
+    bucket is full, where a lost token doesn't matter.
+
+    Returns None if a token was taken, otherwise the seconds until one is free.
+    """
+    rate = capacity / period
+    ttl = int(period) + 1
+    start_key = f"{key}:start"
+    used_key = f"{key}:used"
+
+    values = cache.get_many([start_key, used_key])
+    start = values.get(start_key)
+    used = values.get(used_key, 0)
+
+    if start is None or used <= (now - start) * rate:
+        start = now
+        cache.set_many({start_key: start, used_key: 0}, ttl)
+
+    try:
+        used = cache.incr(used_key)
+    except ValueError:
+        # Expired between the read and the incr
+        cache.add(used_key, 0, ttl)
+        used = cache.incr(used_key)
+
+    available = capacity + (now - start) * rate - used
+    if available < 0:
+        # Rejected requests don't consume tokens
+        cache.decr(used_key)
+        return (-available) / rate
+
+    # A drained bucket takes a full period to refill; keep it until then
+    cache.touch(start_key, ttl)
+    cache.touch(used_key, ttl)
+    return None
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Token bucket throttle: a rate of '120/min' means bursts of up to 120
+    requests, refilled at 2 per second. Rates come from DEFAULT_THROTTLE_RATES
+    in REST_FRAMEWORK; a scope without a rate isn't limited.
+    """
+
+    def __init__(self):
+        # Scope is decided per request in get_scope()
+        self.wait_seconds = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if not self.scope or self.scope not in self.THROTTLE_RATES:
+            return True
+
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.wait_seconds = take_token(
+            self.cache, self.key, self.num_requests, self.duration, self.timer()
+        )
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Per-IP budget for anonymous requests"""
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None  # Covered by UserTokenBucketThrottle
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Per-user budget, with a bigger 'scanner' budget for anyone who can scan tickets"""
+
+    def get_scope(self, request, view):
+        if request.user and request.user.is_authenticated and request.user.can_scan_tickets():
+            return 'scanner'
+        return 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class EndpointTokenBucketThrottle(TokenBucketThrottle):
+    """Shared budget per endpoint across all clients, keyed by the view's throttle_scope"""
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': 'endpoint', 'ident': self.scope}
@@ -0,0 +1,66 @@
+# core/feeds.py
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from burnermanagement.firebase_config import get_firestore_client
+from burnermanagement.metrics import record_cache
+
+HOME_FEED_COLLECTION = 'feeds'
+HOME_FEED_DOCUMENT = 'home'
+HOME_FEED_CACHE_KEY = 'feeds:home'
+
+
+def build_home_feed():
+    """Assemble the home feed from the catalogue - the expensive part, done off the request path"""
+    from events.models import Event
+    from events.serializers import EventListSerializer
+    from venues.models import Venue
+
+    fields = EventListSerializer.document_fields
+    featured = Event.get_featured(limit=settings.HOME_FEED_FEATURED_COUNT, fields=fields)
+    upcoming = Event.get_upcoming(limit=settings.HOME_FEED_UPCOMING_COUNT, fields=fields)
+
+    return {
+        'featuredEvents': EventListSerializer(featured, many=True).data,
+        'upcomingEvents': EventListSerializer(upcoming, many=True).data,
+        'totalEvents': Event.count_upcoming(),
+        'totalFeatured': Event.count_upcoming(featured_only=True),
+        'totalVenues': Venue.count_active(),
+        'generatedAt': datetime.utcnow().isoformat() + 'Z',
+    }
+
+
+def rebuild_home_feed():
+    """Rebuild feeds/home and refresh the cached copy"""
+    feed = build_home_feed()
+
+    db = get_firestore_client()
+    if db is not None:
+        try:
+            db.collection(HOME_FEED_COLLECTION).document(HOME_FEED_DOCUMENT).set(feed)
+        except Exception as e:
+            print(f"Error writing home feed: {e}")
+
+    cache.set(HOME_FEED_CACHE_KEY, feed, settings.HOME_FEED_CACHE_TIMEOUT)
+    return feed
+
+
+def get_home_feed():
+    """The home feed: cached blob, then the feeds/home document, rebuilding only if neither exists"""
+    feed = cache.get(HOME_FEED_CACHE_KEY)
+    record_cache('home_feed', 'miss' if feed is None else 'hit')
+    if feed is not None:
+        return feed
+
+    db = get_firestore_client()
+    if db is not None:
+        try:
+            doc = db.collection(HOME_FEED_COLLECTION).document(HOME_FEED_DOCUMENT).get()
+            if doc.exists:
+                feed = doc.to_dict()
+                cache.set(HOME_FEED_CACHE_KEY, feed, settings.HOME_FEED_CACHE_TIMEOUT)
+                return feed
+        except Exception as e:
+            print(f"Error fetching home feed: {e}")
+
+    return rebuild_home_feed()
@@ -0,0 +1,28 @@
+# core/management/commands/rebuild_home_feed.py
+import time
+from django.core.management.base import BaseCommand
+from core.feeds import rebuild_home_feed
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized home feed (feeds/home)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            help='Keep rebuilding every N seconds instead of running once'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            feed = rebuild_home_feed()
+            self.stdout.write(
+                f"Rebuilt home feed: {len(feed['featuredEvents'])} featured, "
+                f"{len(feed['upcomingEvents'])} upcoming, {feed['totalEvents']} events, "
+                f"{feed['totalVenues']} venues"
+            )
+            
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,122 @@
+# core/profiling.py
+import cProfile
+import json
+import os
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.crypto import constant_time_compare
+
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.prof$')
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def list_profiles():
+    """Metadata for every stored profile, newest first"""
+    profiles = []
+    for meta_path in profile_dir().glob('*.json'):
+        try:
+            with open(meta_path) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda p: p.get('started_at', 0), reverse=True)
+    return profiles
+
+
+def profile_path(name):
+    """Path to a stored profile, or None for unknown or unsafe names"""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def save_profile(profiler, metadata):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    slug = re.sub(r'[^\w]+', '-', metadata['path']).strip('-')[:60] or 'root'
+    name = f"{int(metadata['started_at'])}-{metadata['method'].lower()}-{slug}-{uuid.uuid4().hex[:8]}"
+    metadata['file'] = f"{name}.prof"
+
+    profiler.dump_stats(directory / metadata['file'])
+    with open(directory / f"{name}.json", 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    rotate_profiles(directory)
+
+
+def rotate_profiles(directory):
+    """Keep only the newest PROFILING_MAX_FILES dumps"""
+    dumps = sorted(directory.glob('*.prof'), key=os.path.getmtime, reverse=True)
+    for old in dumps[settings.PROFILING_MAX_FILES:]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.json').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Profiles a sample of requests with cProfile and stores the dumps.
+
+    A request is profiled when it falls in the PROFILING_SAMPLE_RATE sample,
+    its path starts with one of PROFILING_PATHS, or it sends the
+    PROFILING_HEADER with PROFILING_TOKEN as the value. With PROFILING_ENABLED
+    off, Django drops the middleware at startup, so it costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+
+    def should_profile(self, request):
+        if settings.PROFILING_TOKEN and constant_time_compare(request.META.get(self.header, ''), settings.PROFILING_TOKEN):
+            return 'header'
+        if any(request.path.startswith(prefix) for prefix in settings.PROFILING_PATHS):
+            return 'path'
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return 'sample'
+        return None
+
+    def __call__(self, request):
+        trigger = self.should_profile(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+
+        user = getattr(request, 'user', None)
+        try:
+            save_profile(profiler, {
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 1),
+                'trigger': trigger,
+                'user': user.pk if user is not None and user.is_authenticated else None,
+                'pid': os.getpid(),
+                'started_at': started_at,
+            })
+        except OSError as e:
+            print(f"Error saving profile for {request.path}: {e}")
+        return response
@@ -1,3 +1,438 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from google.cloud.firestore_v1.field_path import FieldPath
+from rest_framework.test import APIClient
+from burnermanagement.documents import DocumentFetchError
+from burnermanagement.singleflight import SingleFlight, cached_read, invalidate_reads
+from burnermanagement.testing import MemoryBackendTestCase
+from burnermanagement.throttling import TokenBucketThrottle, take_token
+from events.models import Event
+from events.rollups import rebuild_rollups, record_sale, sales_series, series_range
+from users.models import User
+from venues.models import Venue
+from events.exports import iter_pages
 
-# Create your tests here.
+
+class MemoryBackendQueryTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        for event_id in ('a', 'b', 'c', 'd', 'e'):
+            self.create_event(event_id, venueId='venue-2' if event_id == 'c' else 'venue-1')
+
+    def ids(self, query):
+        return [doc.id for doc in query.stream()]
+
+    def test_document_id_filters_match_ids(self):
+        events = self.db.collection('events')
+
+        self.assertEqual(self.ids(events.where(FieldPath.document_id(), '==', 'b')), ['b'])
+        self.assertEqual(sorted(self.ids(events.where(FieldPath.document_id(), 'in', ['a', 'd', 'x']))), ['a', 'd'])
+        self.assertEqual(
+            self.ids(events.where(FieldPath.document_id(), '>=', 'c').order_by(FieldPath.document_id())), ['c', 'd', 'e']
+        )
+
+    def test_pages_resume_after_the_last_document(self):
+        query = self.db.collection('events').where('venueId', '==', 'venue-1').order_by(FieldPath.document_id())
+
+        pages = [[doc.id for doc in page] for page in iter_pages(query, page_size=2)]
+
+        self.assertEqual(pages, [['a', 'b'], ['d', 'e']])
+
+
+class TokenBucketTests(MemoryBackendTestCase):
+    def take(self, now, key='bucket'):
+        # 3 tokens, refilled at one every 20 seconds
+        return take_token(cache, key, 3, 60, now)
+
+    def test_bursts_up_to_capacity_then_waits_for_a_refill(self):
+        self.assertEqual([self.take(1000) for _ in range(4)], [None, None, None, 20])
+        self.assertEqual(self.take(1010), 10)
+        self.assertIsNone(self.take(1020))
+        self.assertEqual(self.take(1020), 20)
+
+    def test_rejected_requests_use_no_tokens(self):
+        for _ in range(3):
+            self.take(1000)
+        for _ in range(10):
+            self.take(1000)
+
+        self.assertIsNone(self.take(1020))
+
+    def test_idle_time_does_not_bank_more_than_capacity(self):
+        self.take(1000)
+
+        self.assertEqual([self.take(5000) for _ in range(4)], [None, None, None, 20])
+
+    def test_buckets_are_separate(self):
+        for _ in range(3):
+            self.take(1000, 'one')
+
+        self.assertIsNotNone(self.take(1000, 'one'))
+        self.assertIsNone(self.take(1000, 'two'))
+
+
+class ThrottleTests(MemoryBackendTestCase):
+    url = '/api/venues/count/'
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', {'ip': '2/min', 'user': '3/min', 'scanner': '4/min'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def statuses(self, client, count, **extra):
+        return [client.get(self.url, **extra).status_code for _ in range(count)]
+
+    def test_anonymous_clients_are_limited_per_ip(self):
+        client = APIClient()
+
+        self.assertEqual(self.statuses(client, 3, REMOTE_ADDR='10.0.0.1'), [200, 200, 429])
+        self.assertEqual(client.get(self.url, REMOTE_ADDR='10.0.0.1')['Retry-After'], '30')
+        self.assertEqual(self.statuses(client, 2, REMOTE_ADDR='10.0.0.2'), [200, 200])
+
+    def test_signed_in_users_are_limited_per_user_not_per_ip(self):
+        clients = []
+        for username, role in (('fan-1', 'user'), ('fan-2', 'user'), ('door', 'scanner')):
+            client = APIClient()
+            client.force_authenticate(User.objects.create(username=username, email=f'{username}@example.com', role=role))
+            clients.append(client)
+        fan, other_fan, scanner = clients
+
+        self.assertEqual(self.statuses(fan, 4, REMOTE_ADDR='10.0.0.1'), [200, 200, 200, 429])
+        self.assertEqual(self.statuses(other_fan, 3, REMOTE_ADDR='10.0.0.1'), [200, 200, 200])
+        self.assertEqual(self.statuses(scanner, 5, REMOTE_ADDR='10.0.0.1'), [200, 200, 200, 200, 429])
+
+
+class DocumentSchemaTests(MemoryBackendTestCase):
+    def test_documents_decode_into_slotted_models(self):
+        self.create_event('event-1', name='Friday Night', venueId='venue-1', maxTickets=200,
+                          date=datetime(2030, 5, 3, 22, tzinfo=dt_timezone(timedelta(hours=2))))
+
+        event = Event.get_by_id('event-1')
+
+        self.assertEqual((event.id, event.name, event.venue_id, event.max_tickets), ('event-1', 'Friday Night', 'venue-1', 200))
+        self.assertEqual(event.date, datetime(2030, 5, 3, 20))
+        self.assertFalse(hasattr(event, '__dict__'))
+        with self.assertRaises(AttributeError):
+            event.not_a_field = 1
+
+    def test_missing_and_null_fields_get_defaults(self):
+        first = Venue.from_dict('venue-1', {'name': None})
+        second = Venue.from_dict('venue-2', {})
+
+        self.assertEqual((first.name, first.city, first.created_at, first.admins), ('', '', None, {}))
+        first.admins['someone@example.com'] = True
+        self.assertEqual(second.admins, {})
+
+    def test_field_paths_name_the_document_fields(self):
+        self.assertEqual(Event.field_paths('venue_id', 'max_tickets', 'name'), ['venueId', 'maxTickets', 'name'])
+
+
+class GetManyTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        for n in range(5):
+            self.create_venue(f'venue-{n}', name=f'Venue {n}')
+        self.get_all = mock.patch.object(self.db, 'get_all', wraps=self.db.get_all).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_results_follow_the_requested_order_without_duplicates_or_gaps(self):
+        venues = Venue.get_many(['venue-3', 'missing', 'venue-1', 'venue-3', '', None])
+
+        self.assertEqual([venue.id for venue in venues], ['venue-3', 'venue-1'])
+
+    def test_ids_are_fetched_in_chunks(self):
+        with mock.patch('burnermanagement.documents.GET_ALL_CHUNK_SIZE', 2):
+            Venue.get_many([f'venue-{n}' for n in range(5)])
+
+        self.assertEqual([len(call.args[0]) for call in self.get_all.call_args_list], [2, 2, 1])
+
+    def test_cached_documents_are_not_fetched_again(self):
+        Venue.get_many(['venue-0', 'venue-1'])
+        self.get_all.reset_mock()
+
+        venues = Venue.get_many(['venue-0', 'venue-1', 'venue-2'])
+
+        self.assertEqual([venue.id for venue in venues], ['venue-0', 'venue-1', 'venue-2'])
+        self.assertEqual([[ref.id for ref in call.args[0]] for call in self.get_all.call_args_list], [['venue-2']])
+
+        Venue.invalidate('venue-0')
+        self.get_all.reset_mock()
+        Venue.get_many(['venue-0', 'venue-1'])
+        self.assertEqual([[ref.id for ref in call.args[0]] for call in self.get_all.call_args_list], [['venue-0']])
+
+    def test_projected_reads_bypass_the_cache(self):
+        Venue.get_many(['venue-0'])
+
+        venues = Venue.get_many(['venue-0'], fields=Venue.field_paths('name'))
+
+        self.assertEqual(venues[0].name, 'Venue 0')
+        self.assertEqual(self.get_all.call_count, 2)
+
+    def test_archived_documents_are_read_from_the_archive(self):
+        self.create_event('live')
+        self.db.collection(Event.archive_collection).document('old').set({'name': 'Old Event'})
+
+        events = Event.get_many(['old', 'live', 'gone'])
+
+        self.assertEqual([(event.id, event.name) for event in events], [('old', 'Old Event'), ('live', 'Test Event')])
+
+    def test_read_errors_skip_documents_unless_strict(self):
+        self.get_all.side_effect = RuntimeError('deadline exceeded')
+
+        self.assertEqual(Venue.get_many(['venue-0']), [])
+        with self.assertRaises(DocumentFetchError):
+            Venue.get_many(['venue-0'], strict=True)
+
+
+class CountingLock:
+    """Lock that counts how many times it has been taken"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.taken = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.taken += 1
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+
+class SingleFlightTests(MemoryBackendTestCase):
+    def run_concurrently(self, fn, count):
+        """Run count concurrent flight.do('key', fn) calls, letting fn finish only once all have joined"""
+        flight = SingleFlight()
+        flight._lock = CountingLock()
+        release = threading.Event()
+        results = [None] * count
+
+        def leader_fn():
+            release.wait(5)
+            return fn()
+
+        def caller(n):
+            try:
+                results[n] = flight.do('key', leader_fn)
+            except Exception as e:
+                results[n] = e
+
+        threads = [threading.Thread(target=caller, args=(n,)) for n in range(count)]
+        for thread in threads:
+            thread.start()
+        # Every caller takes the lock once on the way in
+        while flight._lock.taken < count:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        return flight, results
+
+    def test_concurrent_callers_share_one_call(self):
+        fetch = mock.Mock(return_value='result')
+
+        _, results = self.run_concurrently(fetch, 5)
+
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(results, ['result'] * 5)
+
+    def test_errors_reach_every_waiting_caller_and_are_not_kept(self):
+        fetch = mock.Mock(side_effect=RuntimeError('deadline exceeded'))
+
+        flight, results = self.run_concurrently(fetch, 3)
+
+        self.assertEqual(fetch.call_count, 1)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(flight.do('key', lambda: 'retried'), 'retried')
+
+
+class Listing:
+    """Stands in for a model with a cached list read"""
+    fetch = None
+
+    @classmethod
+    @cached_read('listings', default=list)
+    def all(cls, page=1):
+        return cls.fetch(page)
+
+
+@override_settings(READ_CACHE_TIMEOUT=10, READ_STALE_GRACE=60, READ_STALE_TIMEOUT=3600, SINGLE_FLIGHT_CROSS_PROCESS=False)
+class CachedReadTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        Listing.fetch = mock.Mock(side_effect=lambda page: [f'page {page}, fetch {Listing.fetch.call_count}'])
+        self.now = 1000.0
+        clock = SimpleNamespace(time=lambda: self.now, monotonic=time.monotonic, sleep=time.sleep)
+        patcher = mock.patch('burnermanagement.singleflight.time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Background refreshes run inline so the tests can see their result
+        patcher = mock.patch('burnermanagement.singleflight.threading.Thread',
+                             lambda target, daemon: SimpleNamespace(start=target))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_results_are_cached_per_arguments_until_invalidated(self):
+        self.assertEqual(Listing.all(), ['page 1, fetch 1'])
+        self.assertEqual(Listing.all(), ['page 1, fetch 1'])
+        self.assertEqual(Listing.all(page=2), ['page 2, fetch 2'])
+
+        invalidate_reads('listings')
+
+        self.assertEqual(Listing.all(), ['page 1, fetch 3'])
+
+    def test_stale_results_are_served_while_they_refresh(self):
+        Listing.all()
+
+        self.now += 30
+        self.assertEqual(Listing.all(), ['page 1, fetch 1'])
+        self.assertEqual(Listing.fetch.call_count, 2)
+        self.assertEqual(Listing.all(), ['page 1, fetch 2'])
+
+    def test_results_too_old_to_serve_are_fetched_first(self):
+        Listing.all()
+
+        self.now += 10 + 60
+
+        self.assertEqual(Listing.all(), ['page 1, fetch 2'])
+
+    def test_failed_fetches_fall_back_to_the_last_result_then_the_default(self):
+        Listing.all()
+        invalidate_reads('listings')
+        Listing.fetch.side_effect = RuntimeError('deadline exceeded')
+
+        self.assertEqual(Listing.all(), ['page 1, fetch 1'])
+        self.assertEqual(Listing.all(page=2), [])
+
+    @override_settings(SINGLE_FLIGHT_CROSS_PROCESS=True, SINGLE_FLIGHT_POLL_INTERVAL=0.001)
+    def test_other_processes_wait_for_the_fetching_one(self):
+        Listing.all()
+        self.now += 10 + 60
+        add = cache.add
+
+        def locked_elsewhere(key, value, timeout=None):
+            if not key.endswith(':lock'):
+                return add(key, value, timeout)
+            # The other process finishes its fetch while this one polls
+            entry_key = key[:-len(':lock')]
+            cache.set(entry_key, dict(cache.get(entry_key), value=['from another process'], fresh_until=self.now + 10))
+            return False
+
+        with mock.patch.object(cache, 'add', side_effect=locked_elsewhere):
+            self.assertEqual(Listing.all(), ['from another process'])
+        self.assertEqual(Listing.fetch.call_count, 1)
+
+
+class UserPaginationTests(MemoryBackendTestCase):
+    url = '/api/auth/users/'
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', email='admin@example.com', role='siteAdmin')
+        for n in range(6):
+            User.objects.create(
+                username=f'user-{n}', email=f'user-{n}@example.com',
+                role='scanner' if n % 2 else 'user', venue_id='venue-1' if n < 3 else 'venue-2',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def pages(self, url):
+        pages = []
+        while url:
+            body = self.client.get(url).json()
+            pages.append([user['username'] for user in body['results']])
+            url = body['next']
+        return pages
+
+    def test_pages_walk_every_user_once_in_id_order(self):
+        pages = self.pages(f'{self.url}?page_size=3')
+
+        self.assertEqual(pages, [['admin', 'user-0', 'user-1'], ['user-2', 'user-3', 'user-4'], ['user-5']])
+
+    def test_later_pages_seek_by_id_instead_of_offset(self):
+        next_page = self.client.get(f'{self.url}?page_size=3').json()['next']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(next_page)
+
+        user_queries = [query['sql'] for query in queries.captured_queries if 'FROM "users_user"' in query['sql']]
+        self.assertTrue(any('"users_user"."id" >' in sql for sql in user_queries))
+        self.assertFalse(any('OFFSET' in sql for sql in user_queries))
+
+    def test_site_admins_filter_in_the_database(self):
+        self.assertEqual(self.pages(f'{self.url}?role=scanner&venue_id=venue-2'), [['user-3', 'user-5']])
+
+    def test_other_users_only_see_themselves(self):
+        self.client.force_authenticate(User.objects.get(username='user-1'))
+
+        self.assertEqual(self.pages(f'{self.url}?role=user'), [['user-1']])
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+@override_settings(SALES_ROLLUP_SHARDS=4)
+class SalesRollupTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_event('event-1', venueId='venue-1')
+        self.create_event('event-2', venueId='venue-1')
+
+    def sell(self, event_id, quantity, revenue, moment):
+        batch = self.db.batch()
+        record_sale(batch, self.db, event_id, 'venue-1', quantity, revenue, moment)
+        batch.commit()
+
+    def points(self, scope, scope_id, granularity, start, end):
+        series = sales_series(scope, scope_id, granularity, start, end)
+        return [(point['start'], point['tickets'], point['revenue']) for point in series['points']]
+
+    def test_sales_land_in_hourly_and_daily_buckets_per_event_and_venue(self):
+        self.sell('event-1', 2, 20.0, utc(2030, 5, 3, 10, 15))
+        self.sell('event-1', 1, 10.0, utc(2030, 5, 3, 10, 45))
+        self.sell('event-2', 3, 45.0, utc(2030, 5, 4, 9, 0))
+
+        self.assertEqual(self.points('events', 'event-1', 'hour', utc(2030, 5, 3, 10), utc(2030, 5, 3, 11, 30)), [
+            ('2030-05-03T10:00:00+00:00', 3, 30.0),
+            ('2030-05-03T11:00:00+00:00', 0, 0),
+        ])
+        self.assertEqual(self.points('venues', 'venue-1', 'day', utc(2030, 5, 3), utc(2030, 5, 4, 12)), [
+            ('2030-05-03T00:00:00+00:00', 3, 30.0),
+            ('2030-05-04T00:00:00+00:00', 3, 45.0),
+        ])
+
+    def test_series_ranges_are_checked(self):
+        for granularity, start, end in (
+            ('week', None, None),
+            ('day', utc(2030, 5, 4), utc(2030, 5, 3)),
+            ('hour', utc(2030, 1, 1), utc(2030, 5, 1)),
+        ):
+            with self.assertRaises(ValueError):
+                series_range(granularity, start, end)
+
+    def test_rebuilding_recounts_buckets_from_the_tickets(self):
+        self.sell('event-1', 5, 50.0, utc(2030, 5, 3, 10))
+        for n, moment in enumerate((utc(2030, 5, 3, 10, 5), utc(2030, 5, 3, 12, 30))):
+            self.db.collection('events').document('event-1').collection('tickets').document(f'ticket-{n}').set({
+                'eventId': 'event-1', 'price': 12.5, 'purchasedAt': moment,
+            })
+
+        self.assertEqual(rebuild_rollups(), 2)
+
+        cache.clear()
+        self.assertEqual(self.points('events', 'event-1', 'hour', utc(2030, 5, 3, 10), utc(2030, 5, 3, 12)), [
+            ('2030-05-03T10:00:00+00:00', 1, 12.5),
+            ('2030-05-03T11:00:00+00:00', 0, 0),
+            ('2030-05-03T12:00:00+00:00', 1, 12.5),
+        ])
+        self.assertEqual(sales_series('venues', 'venue-1', 'day', utc(2030, 5, 3), utc(2030, 5, 3))['totalTickets'], 2)
@@ -1,7 +1,12 @@
 from django.urls import path
+from burnermanagement.metrics import metrics_view
 from . import views
 
 urlpatterns = [
     path('health/', views.HealthCheckView.as_view(), name='health-check'),
     path('status/', views.StatusView.as_view(), name='api-status'),
+    path('home/', views.HomeFeedView.as_view(), name='home-feed'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('profiles/', views.ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:name>/', views.ProfileDownloadView.as_view(), name='profile-download'),
 ]
\ No newline at end of file
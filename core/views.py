@@ -1,12 +1,14 @@
+from django.http import FileResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
-from venues.models import Venue
-from events.models import Event
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from .feeds import get_home_feed
+from .profiling import list_profiles, profile_path
 
 class HealthCheckView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = []  # Load balancer probes
     
     def get(self, request):
         return Response({
@@ -16,19 +18,57 @@ class HealthCheckView(APIView):
 
 class StatusView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = 'status'
     
     def get(self, request):
-        # Get basic stats
-        venues_count = Venue.count_active()
-        events = Event.get_all_active()
-        events_count = len(events)
+        # Counts come from the materialized home feed rather than collection scans
+        feed = get_home_feed()
         
         return Response({
             'api_version': '1.0',
             'status': 'operational',
             'stats': {
-                'venues': venues_count,
-                'events': events_count,
-                'featured_events': len([e for e in events if e.is_featured])
+                'venues': feed['totalVenues'],
+                'events': feed['totalEvents'],
+                'featured_events': feed['totalFeatured']
             }
-        })
\ No newline at end of file
+        })
+
+class HomeFeedView(APIView):
+    """Everything the home screen needs, read from the precomputed feeds/home document"""
+    permission_classes = [AllowAny]
+    throttle_scope = 'status'
+    
+    def get(self, request):
+        return Response(get_home_feed())
+
+class ProfileListView(APIView):
+    """Stored request profiles, newest first (site admins only)"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        if not request.user.is_site_admin():
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(list_profiles())
+
+class ProfileDownloadView(APIView):
+    """Download one cProfile dump, for pstats or snakeviz (site admins only)"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, name):
+        if not request.user.is_site_admin():
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        path = profile_path(name)
+        if path is None:
+            return Response(
+                {'error': 'Profile not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
@@ -0,0 +1,103 @@
+# events/counters.py
+import random
+from django.conf import settings
+from django.core.cache import cache
+from firebase_admin import firestore
+from burnermanagement.firebase_config import get_firestore_client
+from burnermanagement.metrics import record_cache
+
+
+class ShardedCounter:
+    """Distributed counter stored as N shard documents under a parent document.
+
+    Writes increment one randomly chosen shard so concurrent writers rarely
+    touch the same document; reads sum every shard with a single aggregation
+    query and keep the total in the Django cache for a few seconds.
+    """
+
+    field = 'count'
+
+    def __init__(self, parent_path, collection, num_shards=None):
+        self.parent_path = parent_path
+        self.collection = collection
+        self.num_shards = num_shards or settings.TICKET_COUNTER_SHARDS
+
+    @property
+    def cache_key(self):
+        return f"counter:{self.parent_path}/{self.collection}"
+
+    def shards_ref(self, db):
+        return db.document(self.parent_path).collection(self.collection)
+
+    def shard_ref(self, db, index=None):
+        """Reference to a shard document, picked at random unless given"""
+        if index is None:
+            index = random.randrange(self.num_shards)
+        return self.shards_ref(db).document(str(index))
+
+    def initialize(self, db, batch=None):
+        """Create all shard documents with a zero count"""
+        # An empty batch is falsy (it has a length), so test for None
+        writer = batch if batch is not None else db.batch()
+        for index in range(self.num_shards):
+            writer.set(self.shard_ref(db, index), {self.field: 0}, merge=True)
+        if batch is None:
+            writer.commit()
+
+    def increment(self, amount=1, transaction=None):
+        """Add amount to a random shard.
+
+        When a transaction is given the write is staged on it and the cached
+        total is left alone; call invalidate() once the transaction commits.
+        """
+        db = get_firestore_client()
+        if db is None:
+            return False
+
+        data = {self.field: firestore.Increment(amount)}
+        if transaction is not None:
+            transaction.set(self.shard_ref(db), data, merge=True)
+            return True
+
+        self.shard_ref(db).set(data, merge=True)
+
+        # Keep the cached total in step instead of forcing a re-read
+        try:
+            cache.incr(self.cache_key, amount)
+        except ValueError:
+            pass
+        return True
+
+    def get_total(self, use_cache=True):
+        """Sum of all shards, served from cache when available.
+
+        Returns None if the shards can't be read, so callers never mistake a
+        failed read for a count of 0.
+        """
+        if use_cache:
+            total = cache.get(self.cache_key)
+            record_cache('counters', 'miss' if total is None else 'hit')
+            if total is not None:
+                return total
+
+        db = get_firestore_client()
+        if db is None:
+            return None
+
+        try:
+            results = self.shards_ref(db).sum(self.field, alias='total').get()
+            total = int(results[0][0].value or 0) if results else 0
+        except Exception as e:
+            print(f"Error reading counter {self.cache_key}: {e}")
+            return None
+
+        cache.set(self.cache_key, total, settings.TICKET_COUNTER_CACHE_TIMEOUT)
+        return total
+
+    def invalidate(self):
+        cache.delete(self.cache_key)
+
+
+def ticket_sales_counter(event_id, num_shards=None):
+    """Sharded ticketsSold counter for an event"""
+    return ShardedCounter(f'events/{event_id}', 'ticketCounterShards', num_shards)
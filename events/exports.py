@@ -0,0 +1,156 @@
+# events/exports.py
+import csv
+import json
+from datetime import datetime
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from google.cloud.firestore_v1.field_path import FieldPath
+from burnermanagement.firebase_config import get_firestore_client
+
+# (column, attribute) pairs for each export
+EVENT_COLUMNS = (
+    ('id', 'id'),
+    ('name', 'name'),
+    ('date', 'date'),
+    ('venue', 'venue'),
+    ('price', 'price'),
+    ('maxTickets', 'max_tickets'),
+    ('ticketsSold', 'tickets_sold'),
+    ('ticketsRemaining', 'tickets_remaining'),
+    ('isFeatured', 'is_featured'),
+    ('status', 'event_status'),
+    ('createdAt', 'created_at'),
+)
+TICKET_COLUMNS = (
+    ('id', 'id'),
+    ('eventId', 'event_id'),
+    ('userEmail', 'user_email'),
+    ('userId', 'user_id'),
+    ('price', 'price'),
+    ('status', 'status'),
+    ('paymentReference', 'payment_reference'),
+    ('purchasedAt', 'purchased_at'),
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Last line of an export that failed part way; the status code went out with the headers
+EXPORT_ERROR = 'Export failed part way through; this file is incomplete'
+
+# Leading characters that make a spreadsheet treat a CSV cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def iter_pages(query, page_size=None):
+    """Yield a query's snapshots one page at a time, resuming after the last document"""
+    page_size = page_size or settings.EXPORT_PAGE_SIZE
+    last = None
+    while True:
+        page = query.limit(page_size)
+        if last is not None:
+            page = page.start_after(last)
+        docs = list(page.stream())
+        if docs:
+            yield docs
+            last = docs[-1]
+        if len(docs) < page_size:
+            return
+
+
+def _value(obj, attr):
+    value = getattr(obj, attr, None)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+def _csv_cell(value):
+    """Quote text a spreadsheet would run as a formula (names and emails are user input)"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object whose write() hands back the line csv.writer produced"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(columns, pages):
+    writer = csv.writer(_Echo())
+    # The header goes out before the first query, so the download starts at once
+    yield writer.writerow([column for column, _ in columns])
+    try:
+        for objects in pages:
+            yield ''.join(
+                writer.writerow([_csv_cell(_value(obj, attr)) for _, attr in columns]) for obj in objects
+            )
+    except Exception:
+        yield writer.writerow(['#error', EXPORT_ERROR])
+
+
+def render_ndjson(columns, pages):
+    try:
+        for objects in pages:
+            yield ''.join(
+                json.dumps({column: _value(obj, attr) for column, attr in columns}) + '\n'
+                for obj in objects
+            )
+    except Exception:
+        yield json.dumps({'error': EXPORT_ERROR}) + '\n'
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
+
+
+def stream_export(model, query, columns, export_format, filename):
+    """StreamingHttpResponse of every document in query, decoded with model, one page in memory at a time"""
+    def pages():
+        try:
+            for docs in iter_pages(query):
+                yield [model.from_snapshot(doc) for doc in docs]
+        except Exception as e:
+            # Headers are already sent; the renderer ends the file with an error marker
+            print(f"Error exporting {filename}: {e}")
+            raise
+
+    response = StreamingHttpResponse(
+        RENDERERS[export_format](columns, pages()), content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    response['Cache-Control'] = 'no-store'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_event_tickets(event_id, export_format='csv'):
+    """Door list / sales export of an event's tickets, in purchase order"""
+    from tickets.models import Ticket
+
+    db = get_firestore_client()
+    if db is None:
+        return None
+    query = (
+        db.collection('events').document(event_id).collection('tickets')
+        .order_by('purchasedAt')
+    )
+    return stream_export(Ticket, query, TICKET_COLUMNS, export_format, f'tickets-{event_id}')
+
+
+def export_venue_events(venue_id, export_format='csv'):
+    """Every event at a venue, past and future, in document order"""
+    from events.models import Event
+
+    db = get_firestore_client()
+    if db is None:
+        return None
+    query = (
+        db.collection(Event.collection).where('venueId', '==', venue_id)
+        .order_by(FieldPath.document_id())
+    )
+    return stream_export(Event, query, EVENT_COLUMNS, export_format, f'events-{venue_id}')
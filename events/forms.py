@@ -1,6 +1,6 @@
 # events/forms.py
 from django import forms
-from datetime import datetime
+from django.utils import timezone
 
 class EventForm(forms.Form):
     """Simple form for creating/editing events"""
@@ -72,6 +72,7 @@ class EventForm(forms.Form):
     
     def __init__(self, *args, user=None, venues=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.user = user
         
         # Set up venue choices based on user role
         if user and venues is not None:
@@ -93,6 +94,25 @@ class EventForm(forms.Form):
     def clean_date(self):
         """Ensure the event date is in the future"""
         date = self.cleaned_data.get('date')
-        if date and date <= datetime.now():
+        if date and date <= timezone.now():
             raise forms.ValidationError("Event date must be in the future.")
-        return date
\ No newline at end of file
+        return date
+    
+    def to_document(self, venue, created_by='', image_url=''):
+        """Firestore data for a new event from the cleaned form (venue admins can't feature events)"""
+        data = self.cleaned_data
+        return {
+            'name': data['name'],
+            'description': data['description'],
+            'venue': venue.name,
+            'venueId': venue.id,
+            'date': data['date'],
+            'price': float(data['price']),
+            'maxTickets': data['max_tickets'],
+            'ticketsSold': 0,
+            'imageUrl': image_url,
+            'isFeatured': data['is_featured'] if self.user is None or self.user.is_site_admin() else False,
+            'createdAt': timezone.now(),
+            'createdBy': created_by,
+            'isActive': True,
+        }
@@ -0,0 +1,179 @@
+# events/imports.py
+import csv
+import hashlib
+import io
+from django.conf import settings
+from burnermanagement.documents import BatchWriter, decode_datetime
+from burnermanagement.firebase_config import get_firestore_client
+from burnermanagement.singleflight import invalidate_reads
+from .forms import EventForm
+from .models import rebuild_home_feed
+
+# CSV headers the import understands (EventForm field names), plus the Firestore spellings
+COLUMN_ALIASES = {
+    'venueId': 'venue_id',
+    'maxTickets': 'max_tickets',
+    'isFeatured': 'is_featured',
+    'imageUrl': 'image_url',
+}
+
+
+class EventImportError(Exception):
+    """Raised when an import file can't be read at all"""
+
+
+def read_csv(file):
+    """Rows of an uploaded or opened CSV file as dicts keyed by EventForm field names"""
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    if not isinstance(file, io.TextIOBase):
+        # utf-8-sig drops the byte order mark spreadsheet exports start with
+        file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+
+    try:
+        reader = csv.DictReader(file)
+        if not reader.fieldnames or 'name' not in [f.strip() for f in reader.fieldnames]:
+            raise EventImportError('The first row must be a header naming the columns, including "name"')
+        rows = []
+        for row in reader:
+            if len(rows) >= settings.EVENT_IMPORT_MAX_ROWS:
+                raise EventImportError(f'At most {settings.EVENT_IMPORT_MAX_ROWS} events per import')
+            rows.append({
+                COLUMN_ALIASES.get(key.strip(), key.strip()): (value or '').strip()
+                for key, value in row.items() if key
+            })
+        if not rows:
+            raise EventImportError('The file has no events in it')
+        return rows
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise EventImportError(f'Could not read the CSV file: {e}')
+
+
+def import_key(venue_id, name, date):
+    """(venue, lower-cased name, UTC start) - two events with the same key are the same event"""
+    return (venue_id, name.strip().lower(), decode_datetime(date))
+
+
+def import_event_id(key):
+    """Document ID derived from an import key, so re-running an import can't create an event twice"""
+    venue_id, name, date = key
+    return hashlib.sha256(f'{venue_id}|{name}|{date.isoformat()}'.encode()).hexdigest()[:20]
+
+
+def _existing_events(db, venue_ids):
+    """{import key: event ID} for every event already at the given venues, however it was created"""
+    existing = {}
+    for venue_id in venue_ids:
+        docs = db.collection('events').where('venueId', '==', venue_id).select(['name', 'date']).stream()
+        for doc in docs:
+            data = doc.to_dict()
+            if data.get('name') and data.get('date'):
+                existing[import_key(venue_id, data['name'], data['date'])] = doc.id
+    return existing
+
+
+def import_events(rows, user=None, dry_run=False, created_by=''):
+    """Validate rows with EventForm and write the valid ones in Firestore batches.
+
+    user limits the import to what they could create through the form:
+    venue admins only get their own venue and can't feature events. Without
+    a user (management command) every row must name its venue. Rows
+    matching an existing event at the venue (same name and start) are
+    reported as 'exists' and skipped, and new events get IDs derived from
+    the same fields, so re-running an import after a partial failure only
+    creates what is missing. Returns a report with one entry per row; row
+    numbers match the spreadsheet, with the header as row 1.
+    """
+    from venues.models import Venue
+
+    db = get_firestore_client()
+    if db is None:
+        raise EventImportError('Firestore is unavailable')
+
+    site_admin = user is None or user.is_site_admin()
+    venue_ids = {row.get('venue_id') for row in rows if row.get('venue_id')}
+    if not site_admin:
+        venue_ids = {user.venue_id}
+    venues = {venue.id: venue for venue in Venue.get_many(venue_ids)}
+    try:
+        existing = _existing_events(db, venues)
+    except Exception as e:
+        print(f"Error reading existing events for import: {e}")
+        raise EventImportError('Could not check for existing events, please try again')
+
+    report = []
+    accepted = []
+    seen = set()
+    for number, row in enumerate(rows, start=2):
+        entry = {'row': number, 'name': row.get('name', '')}
+        report.append(entry)
+
+        if not site_admin:
+            if row.get('venue_id') and row['venue_id'] != user.venue_id:
+                entry.update(status='invalid', errors={'venue_id': ['You can only import events for your own venue.']})
+                continue
+            row = dict(row, venue_id=user.venue_id, is_featured='')
+
+        form = EventForm(data=row, user=user, venues=list(venues.values()))
+        if not form.is_valid():
+            entry.update(status='invalid', errors={field: list(errors) for field, errors in form.errors.items()})
+            continue
+
+        data = form.cleaned_data
+        if not data['venue_id']:
+            entry.update(status='invalid', errors={'venue_id': ['This field is required.']})
+            continue
+        venue = venues.get(data['venue_id'])
+        if venue is None:
+            entry.update(status='invalid', errors={'venue_id': ['Unknown venue.']})
+            continue
+
+        key = import_key(venue.id, data['name'], data['date'])
+        if key in seen:
+            entry.update(status='invalid', errors={'__all__': ['Duplicate of an earlier row.']})
+            continue
+        seen.add(key)
+        if key in existing:
+            entry.update(status='exists', id=existing[key])
+            continue
+
+        accepted.append((entry, key, form.to_document(venue, created_by, image_url=row.get('image_url', ''))))
+        entry['status'] = 'valid'
+
+    if not dry_run and accepted:
+        writer = BatchWriter(db)
+        written = []
+        try:
+            for entry, key, event_data in accepted:
+                # create() fails rather than overwrite an event a concurrent import just wrote
+                ref = db.collection('events').document(import_event_id(key))
+                writer.create(ref, event_data)
+                written.append((entry, ref.id))
+            writer.commit()
+        except Exception as e:
+            print(f"Error importing events: {e}")
+        # Rows in batches that committed are created; the rest can be re-imported
+        for index, (entry, event_id) in enumerate(written):
+            if index < writer.committed:
+                entry.update(status='created', id=event_id)
+        for entry, _, _ in accepted:
+            if entry['status'] != 'created':
+                entry.update(status='error', errors={'__all__': ['Not saved, please try again.']})
+
+        if writer.committed:
+            invalidate_reads('events')
+            rebuild_home_feed()
+
+    counts = {}
+    for entry in report:
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    return {
+        'dryRun': dry_run,
+        'total': len(report),
+        'created': counts.get('created', 0),
+        'valid': counts.get('valid', 0),
+        'exists': counts.get('exists', 0),
+        'invalid': counts.get('invalid', 0),
+        'failed': counts.get('error', 0),
+        'rows': report,
+    }
@@ -0,0 +1,144 @@
+# events/live.py
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from burnermanagement.firebase_config import get_firestore_client
+from .models import Event
+
+
+def availability(event):
+    """The part of an event live watchers care about"""
+    return {
+        'event_id': event.id,
+        'max_tickets': event.max_tickets,
+        'tickets_sold': event.tickets_sold,
+        'tickets_remaining': event.tickets_remaining,
+        'is_sold_out': event.is_sold_out,
+        'event_status': event.event_status,
+    }
+
+
+class Subscription:
+    """One streaming client. Only the latest state per event is kept, so slow readers never back up."""
+
+    def __init__(self, event_ids):
+        self.event_ids = set(event_ids)
+        self.loop = asyncio.get_running_loop()
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, state):
+        # Runs on the subscriber's event loop
+        self.pending[state['event_id']] = state
+        self.ready.set()
+
+    async def next(self, timeout=None):
+        """Wait for updates; returns {} on timeout"""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.ready.clear()
+        states, self.pending = self.pending, {}
+        return states
+
+
+class AvailabilityHub:
+    """Fans Firestore changes out to every live client in this process.
+
+    The hub owns the process's only listeners: one on upcoming events and
+    one on the ticket counter shards (a collection group query), started on
+    the first subscription. Shard counts are summed in memory, so a sale
+    costs one listener update however many clients are watching.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}  # event_id -> set of Subscription
+        self._events = {}  # event_id -> latest Event
+        self._shard_counts = {}  # event_id -> {shard id: count}
+        self._states = {}  # event_id -> last published state
+        self._watches = None
+
+    def _start(self):
+        db = get_firestore_client()
+        if db is None:
+            return
+
+        since = datetime.utcnow() - timedelta(days=1)
+        try:
+            self._watches = [
+                db.collection(Event.collection).where('date', '>=', since).on_snapshot(self._on_events),
+                db.collection_group('ticketCounterShards').on_snapshot(self._on_shards),
+            ]
+        except Exception as e:
+            print(f"Error starting availability listeners: {e}")
+
+    def subscribe(self, event_ids):
+        subscription = Subscription(event_ids)
+        with self._lock:
+            if self._watches is None:
+                self._start()
+            for event_id in subscription.event_ids:
+                self._subscriptions.setdefault(event_id, set()).add(subscription)
+                if event_id in self._states:
+                    subscription.push(self._states[event_id])
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for event_id in subscription.event_ids:
+                subscribers = self._subscriptions.get(event_id)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[event_id]
+
+    def _on_events(self, docs, changes, read_time):
+        with self._lock:
+            for change in changes:
+                event_id = change.document.id
+                if change.type.name == 'REMOVED':
+                    self._events.pop(event_id, None)
+                    continue
+                self._events[event_id] = Event.from_snapshot(change.document)
+                self._publish(event_id)
+
+    def _on_shards(self, docs, changes, read_time):
+        with self._lock:
+            touched = set()
+            for change in changes:
+                event_id = change.document.reference.parent.parent.id
+                counts = self._shard_counts.setdefault(event_id, {})
+                if change.type.name == 'REMOVED':
+                    counts.pop(change.document.id, None)
+                else:
+                    counts[change.document.id] = (change.document.to_dict() or {}).get('count', 0)
+                touched.add(event_id)
+            for event_id in touched:
+                self._publish(event_id)
+
+    def _publish(self, event_id):
+        # Called with the lock held, on the listener's thread
+        event = self._events.get(event_id)
+        if event is None:
+            return
+
+        # Sum the shards we already hold instead of querying the counter
+        event._counted_tickets_sold = event.base_tickets_sold
+        if event.counter_shards:
+            event._counted_tickets_sold += sum(self._shard_counts.get(event_id, {}).values())
+
+        state = availability(event)
+        if self._states.get(event_id) == state:
+            return
+        self._states[event_id] = state
+
+        for subscription in self._subscriptions.get(event_id, ()):
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, state)
+            except RuntimeError:
+                pass  # Loop already closed; the stream's cleanup will unsubscribe it
+
+
+hub = AvailabilityHub()
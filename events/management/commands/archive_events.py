@@ -0,0 +1,46 @@
+# events/management/commands/archive_events.py
+import time
+from django.core.management.base import BaseCommand
+from events.models import Event
+
+class Command(BaseCommand):
+    help = 'Move past events and their tickets out of the events collection into eventsArchive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Archive events dated more than N days ago (default: EVENT_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=100,
+            help='Events to fetch per query (default: 100)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many events would be archived'
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            help='Keep archiving every N seconds instead of running once'
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = Event.count_archivable(options['days'])
+            self.stdout.write(f'{count} events would be archived')
+            return
+
+        while True:
+            archived = Event.archive_past(options['days'], page_size=options['page_size'])
+            self.stdout.write(f'Archived {archived} events')
+            
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
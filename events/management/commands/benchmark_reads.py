@@ -0,0 +1,181 @@
+# events/management/commands/benchmark_reads.py
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from burnermanagement.backends import get_backend
+from burnermanagement.backends.memory import MemoryBackend
+from burnermanagement.documents import BatchWriter
+from events.models import Event
+from events.serializers import EventListSerializer
+from venues.models import Venue
+
+class Command(BaseCommand):
+    help = 'Time the events and venues read paths on synthetic datasets and record the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated event counts (default: 1000,10000,100000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark (default: 5)')
+        parser.add_argument('--seed', type=int, default=1234, help='Random seed for the datasets (default: 1234)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+        parser.add_argument(
+            '--fail-over', type=float, default=0,
+            help='Exit with an error if any median is this many percent slower than --compare'
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(get_backend(), MemoryBackend):
+            raise CommandError(
+                'This benchmark loads up to 100k synthetic events and must run on the '
+                'in-memory DATA_BACKEND (burnermanagement.backends.memory.MemoryBackend).'
+            )
+
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        self.repeat = options['repeat']
+        results = {
+            'commit': self.git_commit(),
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeat': self.repeat,
+            'sizes': {},
+        }
+
+        for size in sizes:
+            self.stdout.write(f'Benchmarking {size} events...')
+            rng = random.Random(options['seed'])
+            results['sizes'][str(size)] = self.run_size(size, rng)
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+        if options['compare']:
+            self.compare(results, options['compare'], options['fail_over'])
+
+    def run_size(self, size, rng):
+        client = get_backend().get_client()
+        client.reset()
+        cache.clear()
+
+        documents = self.make_events(size, rng)
+        self.load(client, documents)
+        fields = EventListSerializer.document_fields
+        timings = {}
+
+        # Decoding raw document data into Event objects, dates included
+        timings['event_construction'] = self.time(
+            lambda: [Event.from_dict(doc_id, data) for doc_id, data in documents]
+        )
+
+        # Firestore query, filtering and sorting with no list cache in front
+        with override_settings(READ_CACHE_TIMEOUT=0):
+            timings['get_all_active'] = self.time(lambda: Event.get_all_active(fields=fields))
+            timings['venue_get_all_active'] = self.time(lambda: Venue.get_all_active())
+        timings['get_all_active_cached'] = self.time(lambda: Event.get_all_active(fields=fields))
+
+        events = Event.get_all_active(fields=fields)
+        timings['event_list_serializer'] = self.time(lambda: EventListSerializer(events, many=True).data)
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            http = Client()
+
+            def cold_request():
+                cache.clear()  # No cached lists (and a fresh throttle bucket) each time
+                return http.get('/api/events/')
+
+            timings['api_events_cold'] = self.time(cold_request)
+            timings['api_events_warm'] = self.time(lambda: http.get('/api/events/'))
+
+        timings['active_events'] = len(events)
+        return timings
+
+    def make_events(self, size, rng):
+        """Synthetic events: mostly upcoming, some past, a few without dates"""
+        now = datetime.now(timezone.utc)
+        venues = [(f'bench-venue-{i}', f'Venue {i}') for i in range(max(1, size // 100))]
+        documents = []
+        for i in range(size):
+            venue_id, venue_name = rng.choice(venues)
+            data = {
+                'name': f'Event {i}',
+                'description': 'Synthetic benchmark event',
+                'venue': venue_name,
+                'venueId': venue_id,
+                'price': round(rng.uniform(5, 80), 2),
+                'maxTickets': rng.choice([100, 250, 500, 1000]),
+                'ticketsSold': rng.randint(0, 100),
+                'imageUrl': f'https://example.com/events/{i}.jpg',
+                'isFeatured': rng.random() < 0.1,
+                'createdAt': now - timedelta(days=rng.randint(1, 365)),
+                'createdBy': 'benchmark',
+            }
+            if rng.random() > 0.02:
+                data['date'] = now + timedelta(hours=rng.randint(-24 * 180, 24 * 365))
+            documents.append((f'bench-{i}', data))
+        self.venues = venues
+        return documents
+
+    def load(self, client, documents):
+        with BatchWriter(client) as writer:
+            for venue_id, name in self.venues:
+                writer.set(client.collection('venues').document(venue_id), {'name': name, 'city': 'Bench'})
+            for doc_id, data in documents:
+                writer.set(client.collection('events').document(doc_id), data)
+
+    def time(self, fn):
+        """Run fn repeat times (after one warm-up) and summarise in milliseconds"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+            runs = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                fn()
+                runs.append((time.perf_counter() - started) * 1000)
+        return {
+            'min_ms': round(min(runs), 3),
+            'median_ms': round(statistics.median(runs), 3),
+            'mean_ms': round(statistics.mean(runs), 3),
+            'max_ms': round(max(runs), 3),
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, results, baseline_path, fail_over):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        regressions = []
+        self.stdout.write(f"\nCompared with {baseline.get('commit') or baseline_path}:")
+        for size, timings in results['sizes'].items():
+            for name, timing in timings.items():
+                before = baseline.get('sizes', {}).get(size, {}).get(name)
+                if not isinstance(timing, dict) or not isinstance(before, dict) or not before['median_ms']:
+                    continue
+                change = (timing['median_ms'] - before['median_ms']) / before['median_ms'] * 100
+                self.stdout.write(
+                    f"  {size:>7} {name:<26} {before['median_ms']:>10.2f} -> {timing['median_ms']:>10.2f} ms  ({change:+.1f}%)"
+                )
+                if fail_over and change > fail_over:
+                    regressions.append(f'{name} at {size} events ({change:+.1f}%)')
+
+        if regressions:
+            raise CommandError('Slower than the baseline: ' + ', '.join(regressions))
@@ -0,0 +1,39 @@
+# events/management/commands/import_events.py
+import json
+from django.core.management.base import BaseCommand, CommandError
+from events.imports import EventImportError, import_events, read_csv
+
+class Command(BaseCommand):
+    help = 'Create events from a CSV file (columns named like EventForm fields), written in Firestore batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row: name, description, venue_id, date, price, max_tickets, is_featured, image_url')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything')
+        parser.add_argument('--created-by', default='import-script', help='createdBy value for the new events (default: import-script)')
+        parser.add_argument('--report', help='Write the per-row report as JSON to this file')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = read_csv(f)
+            report = import_events(rows, dry_run=options['dry_run'], created_by=options['created_by'])
+        except (OSError, EventImportError) as e:
+            raise CommandError(str(e))
+
+        for entry in report['rows']:
+            if entry['status'] in ('invalid', 'error'):
+                errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in entry['errors'].items())
+                self.stdout.write(self.style.WARNING(f"Row {entry['row']} ({entry['name']}): {errors}"))
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        summary = (
+            f"{report['total']} rows: {report['created']} created, {report['valid']} valid, "
+            f"{report['exists']} already exist, {report['invalid']} invalid, {report['failed']} failed"
+        )
+        if report['invalid'] or report['failed']:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,10 @@
+# events/management/commands/rebuild_sales_rollups.py
+from django.core.management.base import BaseCommand
+from events.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly and daily sales rollups from issued tickets (run outside on-sales)'
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {count} tickets'))
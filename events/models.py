@@ -1,38 +1,92 @@
 # events/models.py
-from django.db import models
-from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta, timezone as dt_timezone
+import itertools
 import warnings
+from django.conf import settings
+from django.utils import timezone
+from burnermanagement.documents import BatchWriter, FirestoreDocument, Field, decode_datetime
 from burnermanagement.firebase_config import get_firestore_client
+from burnermanagement.singleflight import cached_read, invalidate_reads
+from .counters import ticket_sales_counter
+
+def rebuild_home_feed():
+    """Refresh the materialized home feed after the catalogue changes"""
+    from core.feeds import rebuild_home_feed
+    rebuild_home_feed()
 
 # Suppress the Firestore filter warnings
 warnings.filterwarnings("ignore", message="Detected filter using positional arguments")
 
-class Event:
+class Event(FirestoreDocument):
     """Event model that interfaces with Firestore"""
     
-    def __init__(self, id=None, **kwargs):
-        self.id = id
-        self.name = kwargs.get('name', '')
-        self.description = kwargs.get('description', '')
-        self.venue = kwargs.get('venue', '')  # Changed from venue_name
-        self.venue_id = kwargs.get('venueId', '')
-        self.date = kwargs.get('date')
-        self.price = kwargs.get('price', 0)
-        self.max_tickets = kwargs.get('maxTickets', 0)
-        self.tickets_sold = kwargs.get('ticketsSold', 0)
-        self.image_url = kwargs.get('imageUrl', '')
-        self.is_featured = kwargs.get('isFeatured', False)
-        self.created_at = kwargs.get('createdAt')
-        self.created_by = kwargs.get('createdBy', '')
-        
-        # Default values for fields not in your Firestore
-        self.is_active = True  # Assume all events are active
-        self.updated_at = None
-    
-    @classmethod
-    def get_all_active(cls):
-        """Get all events from Firestore"""
+    collection = 'events'
+    archive_collection = 'eventsArchive'
+    fields = (
+        Field('name', default=''),
+        Field('description', default=''),
+        Field('venue', default=''),  # Changed from venue_name
+        Field('venueId', 'venue_id', default=''),
+        Field('date', decode=decode_datetime),
+        Field('price', default=0),
+        Field('maxTickets', 'max_tickets', default=0),
+        Field('ticketsSold', 'base_tickets_sold', default=0),
+        Field('counterShards', 'counter_shards', default=0),
+        Field('inventoryShards', 'inventory_shards', default=0),
+        Field('imageUrl', 'image_url', default=''),
+        Field('isFeatured', 'is_featured', default=False),
+        Field('createdAt', 'created_at', decode=decode_datetime),
+        Field('createdBy', 'created_by', default=''),
+        Field('seriesId', 'series_id', default=''),
+        Field('isCancelled', 'is_cancelled', default=False),
+    )
+    extra_slots = ('_counted_tickets_sold',)
+    
+    # Default values for fields not in your Firestore
+    is_active = True  # Assume all events are active
+    updated_at = None
+    
+    @classmethod
+    def _query(cls, db, fields=None):
+        query = db.collection(cls.collection)
+        if fields:
+            query = query.select(fields)
+        return query
+    
+    @classmethod
+    def _upcoming_query(cls, db, fields=None):
+        return cls._query(db, fields).where('date', '>=', datetime.utcnow()).order_by('date')
+    
+    @staticmethod
+    def _live(events):
+        """Drop cancelled events - they stay readable by ID for ticket holders"""
+        return [event for event in events if not event.is_cancelled]
+    
+    @classmethod
+    def _first_live(cls, query, limit):
+        """The first limit non-cancelled events of query, reading one page of limit at a time"""
+        events = []
+        last = None
+        while len(events) < limit:
+            page = query.limit(limit)
+            if last is not None:
+                page = page.start_after(last)
+            docs = list(page.stream())
+            events.extend(cls._live([cls.from_snapshot(doc) for doc in docs]))
+            if len(docs) < limit:
+                break
+            last = docs[-1]
+        return events[:limit]
+    
+    @staticmethod
+    def _sort_by_date(events):
+        events.sort(key=lambda x: x.date if x.date else datetime.max)
+        return events
+    
+    @classmethod
+    @cached_read('events', default=list)
+    def get_all_active(cls, fields=None):
+        """Get all upcoming events from Firestore, optionally reading only some fields"""
         db = get_firestore_client()
         
         if db is None:
@@ -40,57 +94,38 @@ class Event:
             return []
         
         try:
-            events_ref = db.collection('events')
-            docs = list(events_ref.stream())
+            docs = list(cls._query(db, fields).stream())
             print(f"Found {len(docs)} total events in Firestore")
             
             events = []
             now = datetime.utcnow()
             
             for doc in docs:
-                data = doc.to_dict()
-                print(f"Processing event: {data.get('name', 'Unknown')}")
+                event = cls.from_snapshot(doc)
                 
-                # Handle date conversion
-                event_date = data.get('date')
-                if event_date:
-                    if hasattr(event_date, 'timestamp'):
-                        # Firestore timestamp
-                        event_datetime = datetime.fromtimestamp(event_date.timestamp())
-                        data['date'] = event_datetime
-                    elif isinstance(event_date, datetime):
-                        event_datetime = event_date
-                    else:
-                        # Skip events without proper dates
-                        print(f"Skipping event with invalid date: {event_date}")
-                        continue
-                    
-                    # Only include future events
-                    if event_datetime >= now:
-                        event = cls(id=doc.id, **data)
-                        events.append(event)
-                        print(f"Added event: {event.name}")
-                    else:
-                        print(f"Skipping past event: {data.get('name')}")
-                else:
+                if event.date is None:
                     # Include events without dates for now
-                    event = cls(id=doc.id, **data)
                     events.append(event)
-                    print(f"Added event without date: {event.name}")
+                elif not isinstance(event.date, datetime):
+                    # Skip events without proper dates
+                    print(f"Skipping event with invalid date: {event.date}")
+                elif event.date >= now:
+                    # Only include future events
+                    events.append(event)
             
             # Sort by date
-            events.sort(key=lambda x: x.date if x.date else datetime.max)
+            events = cls._sort_by_date(cls._live(events))
             print(f"Returning {len(events)} events")
             return events
             
         except Exception as e:
+            # cached_read serves the last good list (or []) instead
             print(f"Error fetching events: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+            raise
     
     @classmethod
-    def get_by_venue(cls, venue_id):
+    @cached_read('events', default=list)
+    def get_by_venue(cls, venue_id, fields=None):
         """Get events for a specific venue"""
         db = get_firestore_client()
         
@@ -99,69 +134,86 @@ class Event:
             return []
         
         try:
-            events_ref = db.collection('events').where('venueId', '==', venue_id)
+            events_ref = cls._query(db, fields).where('venueId', '==', venue_id)
             docs = list(events_ref.stream())
             print(f"Found {len(docs)} events for venue {venue_id}")
             
-            events = []
             now = datetime.utcnow()
+            events = cls._live([cls.from_snapshot(doc) for doc in docs])
             
-            for doc in docs:
-                data = doc.to_dict()
-                
-                # Handle date conversion
-                event_date = data.get('date')
-                if event_date and hasattr(event_date, 'timestamp'):
-                    data['date'] = datetime.fromtimestamp(event_date.timestamp())
-                
-                event = cls(id=doc.id, **data)
-                
-                # Only include future events or events without dates
-                if not event.date or event.date >= now:
-                    events.append(event)
-            
-            # Sort by date
-            events.sort(key=lambda x: x.date if x.date else datetime.max)
-            return events
+            # Only include future events or events without dates
+            events = [e for e in events if not isinstance(e.date, datetime) or e.date >= now]
+            return cls._sort_by_date(events)
             
         except Exception as e:
             print(f"Error fetching events for venue {venue_id}: {e}")
-            return []
+            raise
     
     @classmethod
-    def get_by_id(cls, event_id):
-        """Get a specific event by ID"""
+    @cached_read('events', default=list)
+    def get_featured(cls, limit=6, fields=None):
+        """Get featured events for home page, topped up with the next upcoming events"""
         db = get_firestore_client()
         
         if db is None:
-            return None
-            
+            return []
+        
         try:
-            doc = db.collection('events').document(event_id).get()
+            # Served by the (isFeatured, date) composite index - no collection scan
+            # (cancelling an event also unfeatures it)
+            upcoming = cls._upcoming_query(db, fields)
+            docs = upcoming.where('isFeatured', '==', True).limit(limit).stream()
+            events = [cls.from_snapshot(doc) for doc in docs]
+            
+            if len(events) < limit:
+                # Not enough featured events - fill up with whatever is on next
+                seen = {event.id for event in events}
+                for event in cls._first_live(upcoming, limit + len(events)):
+                    if event.id not in seen and len(events) < limit:
+                        events.append(event)
+            
+            return events
             
-            if doc.exists:
-                data = doc.to_dict()
-                
-                # Handle date conversion
-                event_date = data.get('date')
-                if event_date and hasattr(event_date, 'timestamp'):
-                    data['date'] = datetime.fromtimestamp(event_date.timestamp())
-                
-                return cls(id=doc.id, **data)
         except Exception as e:
-            print(f"Error fetching event {event_id}: {e}")
+            print(f"Error fetching featured events: {e}")
+            raise
+    
+    @classmethod
+    @cached_read('events', default=list)
+    def get_upcoming(cls, limit=12, fields=None):
+        """Get the next upcoming events, soonest first"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return []
         
-        return None
+        try:
+            return cls._first_live(cls._upcoming_query(db, fields), limit)
+        except Exception as e:
+            print(f"Error fetching upcoming events: {e}")
+            raise
     
     @classmethod
-    def get_featured(cls, limit=6):
-        """Get featured events for home page"""
-        events = cls.get_all_active()
-        # Filter by isFeatured if available, otherwise return first few
-        featured = [e for e in events if e.is_featured]
-        if featured:
-            return featured[:limit]
-        return events[:limit]
+    @cached_read('events', default=0)
+    def count_upcoming(cls, featured_only=False):
+        """Count upcoming events with an aggregation query instead of streaming them"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return 0
+        
+        try:
+            query = db.collection(cls.collection).where('date', '>=', datetime.utcnow())
+            if featured_only:
+                # Cancelled events are never featured
+                return query.where('isFeatured', '==', True).count(alias='total').get()[0][0].value
+            total = query.count(alias='total').get()[0][0].value
+            # Served by the (isCancelled, date) composite index
+            cancelled = query.where('isCancelled', '==', True).count(alias='total').get()[0][0].value
+            return total - cancelled
+        except Exception as e:
+            print(f"Error counting events: {e}")
+            raise
     
     @classmethod
     def toggle_featured(cls, event_id):
@@ -178,12 +230,38 @@ class Event:
             if doc.exists:
                 current_featured = doc.to_dict().get('isFeatured', False)
                 doc_ref.update({'isFeatured': not current_featured})
+                cls.invalidate(event_id)
+                rebuild_home_feed()
                 return True
             return False
         except Exception as e:
             print(f"Error toggling featured status for event {event_id}: {e}")
             return False
     
+    @classmethod
+    def enable_sharded_counter(cls, event_id, num_shards=None):
+        """Move an event's ticketsSold onto a sharded counter ahead of an on-sale"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return False
+        
+        try:
+            counter = ticket_sales_counter(event_id, num_shards)
+            batch = db.batch()
+            counter.initialize(db, batch=batch)
+            batch.update(
+                db.collection('events').document(event_id),
+                {'counterShards': counter.num_shards}
+            )
+            batch.commit()
+            counter.invalidate()
+            cls.invalidate(event_id)
+            return True
+        except Exception as e:
+            print(f"Error enabling sharded counter for event {event_id}: {e}")
+            return False
+    
     @classmethod
     def delete_by_id(cls, event_id):
         """Delete an event by ID"""
@@ -200,20 +278,138 @@ class Event:
             for ticket in tickets:
                 ticket.reference.delete()
             
+            # Remove the ticketsSold counter shards as well
+            counter = ticket_sales_counter(event_id)
+            for shard in counter.shards_ref(db).stream():
+                shard.reference.delete()
+            counter.invalidate()
+            
             # Then delete the event itself
             db.collection('events').document(event_id).delete()
+            cls.invalidate(event_id)
+            rebuild_home_feed()
             return True
         except Exception as e:
             print(f"Error deleting event {event_id}: {e}")
             return False
     
+    @classmethod
+    def count_archivable(cls, older_than_days=None):
+        """How many events archive_past() would move"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return 0
+        
+        try:
+            query = db.collection(cls.collection).where('date', '<', cls._archive_cutoff(older_than_days))
+            return query.count(alias='total').get()[0][0].value
+        except Exception as e:
+            print(f"Error counting archivable events: {e}")
+            return 0
+    
+    @classmethod
+    def archive_past(cls, older_than_days=None, page_size=100):
+        """Move events dated more than older_than_days ago, with their tickets, into the archive collection"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return 0
+        
+        cutoff = cls._archive_cutoff(older_than_days)
+        archived = 0
+        skipped = None
+        try:
+            while True:
+                # Archived events leave the collection, so every page starts from the top,
+                # or just after the last event that had to be left behind
+                query = db.collection(cls.collection).where('date', '<', cutoff).order_by('date')
+                if skipped is not None:
+                    query = query.start_after(skipped)
+                docs = list(query.limit(page_size).stream())
+                for doc in docs:
+                    if cls._archive(db, doc):
+                        archived += 1
+                    else:
+                        skipped = doc
+                
+                if len(docs) < page_size:
+                    break
+        except Exception as e:
+            print(f"Error archiving events: {e}")
+        
+        return archived
+    
+    @staticmethod
+    def _archive_cutoff(older_than_days=None):
+        if older_than_days is None:
+            older_than_days = settings.EVENT_ARCHIVE_AFTER_DAYS
+        return datetime.utcnow() - timedelta(days=older_than_days)
+    
+    @classmethod
+    def _archive(cls, db, snapshot):
+        """Archive one event; False (event and shards untouched) if its sales count can't be read"""
+        event_ref = snapshot.reference
+        archive_ref = db.collection(cls.archive_collection).document(snapshot.id)
+        data = snapshot.to_dict()
+        
+        # Fold the sharded counter back into ticketsSold; reservations are long over
+        counter = ticket_sales_counter(snapshot.id, data.get('counterShards') or None)
+        if data.get('counterShards'):
+            counted = counter.get_total(use_cache=False)
+            if counted is None:
+                # The shards are deleted below, so an unread count would be lost for good
+                print(f"Skipping archive of event {snapshot.id}: its ticket counter could not be read")
+                return False
+            data['ticketsSold'] = data.get('ticketsSold', 0) + counted
+        data.update({'counterShards': 0, 'inventoryShards': 0, 'archivedAt': datetime.utcnow()})
+        
+        tickets = list(event_ref.collection('tickets').stream())
+        with BatchWriter(db) as writer:
+            # Copy first, so a run that stops part-way leaves the event live to be archived again
+            writer.set(archive_ref, data)
+            for ticket in tickets:
+                writer.set(archive_ref.collection('tickets').document(ticket.id), ticket.to_dict())
+            writer.commit()
+            
+            for ticket in tickets:
+                writer.delete(ticket.reference)
+            for name in ('holds', 'inventory'):
+                for doc in event_ref.collection(name).stream():
+                    writer.delete(doc.reference)
+            writer.commit()
+            
+            # The counter shards go with the event itself, so the fold above is never repeated
+            for shard in counter.shards_ref(db).stream():
+                writer.delete(shard.reference)
+            writer.delete(event_ref)
+        
+        counter.invalidate()
+        cls.invalidate(snapshot.id)
+        return True
+    
+    @property
+    def tickets_sold(self):
+        """ticketsSold from the document plus the sharded counter total, if enabled; None if the counter can't be read"""
+        if not self.counter_shards or not self.id:
+            return self.base_tickets_sold
+        if self._counted_tickets_sold is None:
+            counted = ticket_sales_counter(self.id, self.counter_shards).get_total()
+            if counted is None:
+                return None
+            self._counted_tickets_sold = self.base_tickets_sold + counted
+        return self._counted_tickets_sold
+    
     @property
     def tickets_remaining(self):
-        return self.max_tickets - self.tickets_sold
+        tickets_sold = self.tickets_sold
+        return None if tickets_sold is None else self.max_tickets - tickets_sold
     
     @property
     def is_sold_out(self):
-        return self.tickets_sold >= self.max_tickets
+        # Unknown sales aren't shown as sold out; inventory still stops overselling
+        tickets_sold = self.tickets_sold
+        return tickets_sold is not None and tickets_sold >= self.max_tickets
     
     @property
     def is_upcoming(self):
@@ -230,6 +426,8 @@ class Event:
     def event_status(self):
         """Get the current status of the event"""
         now = datetime.utcnow()
+        if self.is_cancelled:
+            return "cancelled"
         if self.date and isinstance(self.date, datetime):
             if self.date < now:
                 return "past"
@@ -238,4 +436,191 @@ class Event:
         return "available"
     
     def __str__(self):
-        return f"Event: {self.name} (ID: {self.id})"
\ No newline at end of file
+        return f"Event: {self.name} (ID: {self.id})"
+
+WEEKDAYS = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+
+def occurrence_dates(first, frequency='weekly', interval=1, count=None, until=None, weekdays=None):
+    """Start times of a recurring series, from first (an aware datetime) onwards.
+
+    Weekly series run on weekdays (e.g. ['FRI', 'SAT'], default first's
+    weekday) every interval weeks; daily series every interval days. The run
+    stops after count occurrences or on the until date, whichever comes
+    first, and every occurrence keeps first's local wall-clock time. Raises
+    ValueError past EVENT_SERIES_MAX_OCCURRENCES.
+    """
+    local = timezone.localtime(first)
+    start_day, wall_time = local.date(), local.time()
+    limit = settings.EVENT_SERIES_MAX_OCCURRENCES
+    
+    if frequency == 'daily':
+        offsets = (index * interval for index in itertools.count())
+    else:
+        days = sorted({WEEKDAYS.index(day) for day in weekdays}) if weekdays else [start_day.weekday()]
+        week_start = start_day - timedelta(days=start_day.weekday())
+        offsets = (
+            (week_start - start_day).days + week * interval * 7 + day
+            for week in itertools.count() for day in days
+        )
+    
+    dates = []
+    for offset in offsets:
+        if offset < 0:
+            continue
+        day = start_day + timedelta(days=offset)
+        if (count is not None and len(dates) >= count) or (until is not None and day > until):
+            break
+        if len(dates) >= limit:
+            raise ValueError(f'A series can have at most {limit} occurrences')
+        dates.append(timezone.make_aware(datetime.combine(day, wall_time)))
+    return dates
+
+
+class EventSeries(FirestoreDocument):
+    """A recurring run of events (e.g. a weekly residency) whose occurrences share a seriesId.
+
+    Occurrences are ordinary event documents, so listings, tickets and
+    exports treat them like any other event. Creating, editing and
+    cancelling a series each write every affected occurrence in one batch.
+    """
+    
+    collection = 'eventSeries'
+    fields = (
+        Field('name', default=''),
+        Field('venueId', 'venue_id', default=''),
+        Field('recurrence', default=dict),
+        Field('eventIds', 'event_ids', default=list),
+        Field('createdAt', 'created_at', decode=decode_datetime),
+        Field('createdBy', 'created_by', default=''),
+    )
+    
+    # Event fields a series edit may change, by Firestore name
+    EDITABLE_FIELDS = ('name', 'description', 'price', 'maxTickets', 'imageUrl', 'isFeatured')
+    
+    @classmethod
+    def create(cls, template, dates, recurrence, created_by=''):
+        """Write the series and one event per date (template is the event document minus its date)"""
+        db = get_firestore_client()
+        
+        if db is None or not dates:
+            return None
+        
+        try:
+            series_ref = db.collection(cls.collection).document()
+            batch = db.batch()
+            event_ids = []
+            for index, date in enumerate(dates):
+                event_ref = db.collection(Event.collection).document()
+                batch.set(event_ref, dict(template, date=date, seriesId=series_ref.id, seriesIndex=index))
+                event_ids.append(event_ref.id)
+            
+            series_data = {
+                'name': template.get('name', ''),
+                'venueId': template.get('venueId', ''),
+                'recurrence': recurrence,
+                'eventIds': event_ids,
+                'createdAt': timezone.now(),
+                'createdBy': created_by,
+            }
+            batch.set(series_ref, series_data)
+            batch.commit()
+        except Exception as e:
+            print(f"Error creating event series {template.get('name')}: {e}")
+            return None
+        
+        invalidate_reads(Event.collection)
+        rebuild_home_feed()
+        return cls.from_dict(series_ref.id, series_data)
+    
+    @classmethod
+    def get_occurrences(cls, series_id, fields=None):
+        """Every event in the series (archived ones excepted), in date order"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return []
+        
+        try:
+            docs = Event._query(db, fields).where('seriesId', '==', series_id).stream()
+            return Event._sort_by_date([Event.from_snapshot(doc) for doc in docs])
+        except Exception as e:
+            print(f"Error fetching occurrences of series {series_id}: {e}")
+            return []
+    
+    @classmethod
+    def _future(cls, series_id, from_date=None):
+        """Occurrences on or after from_date (default now) that aren't cancelled"""
+        cutoff = from_date or timezone.now()
+        if timezone.is_aware(cutoff):
+            cutoff = timezone.make_naive(cutoff, dt_timezone.utc)
+        return [
+            event for event in cls.get_occurrences(series_id)
+            if not event.is_cancelled and isinstance(event.date, datetime) and event.date >= cutoff
+        ]
+    
+    @classmethod
+    def _write_occurrences(cls, updates):
+        """Apply {event_id: changes} in one batch, then refresh the caches and home feed"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return False
+        
+        try:
+            with BatchWriter(db) as writer:
+                for event_id, changes in updates.items():
+                    writer.update(db.collection(Event.collection).document(event_id), changes)
+        except Exception as e:
+            print(f"Error updating series occurrences: {e}")
+            return False
+        
+        Event.invalidate(*updates)
+        invalidate_reads(Event.collection)
+        rebuild_home_feed()
+        return True
+    
+    @classmethod
+    def update_future(cls, series_id, changes, start_time=None, from_date=None):
+        """Apply changes (Event fields by Firestore name) to upcoming occurrences.
+
+        start_time moves each occurrence to that local time on its own day.
+        maxTickets is left alone on occurrences already on sale, whose
+        inventory shards were sized from the old capacity. Returns
+        (updated event IDs, IDs that kept their maxTickets), or None on error.
+        """
+        changes = {field: value for field, value in changes.items() if field in cls.EDITABLE_FIELDS}
+        updates = {}
+        kept_capacity = []
+        for event in cls._future(series_id, from_date):
+            event_changes = dict(changes)
+            if 'maxTickets' in event_changes and event.inventory_shards:
+                del event_changes['maxTickets']
+                kept_capacity.append(event.id)
+            if start_time is not None:
+                local = timezone.localtime(timezone.make_aware(event.date, dt_timezone.utc))
+                event_changes['date'] = timezone.make_aware(datetime.combine(local.date(), start_time))
+            if event_changes:
+                updates[event.id] = event_changes
+        
+        if updates and not cls._write_occurrences(updates):
+            return None
+        return list(updates), kept_capacity
+    
+    @classmethod
+    def cancel_future(cls, series_id, from_date=None):
+        """Cancel upcoming occurrences; returns the cancelled event IDs, or None on error.
+
+        Cancelled events drop out of listings but stay readable by ID and
+        keep their tickets, so holders can be told and refunded.
+        """
+        now = timezone.now()
+        updates = {
+            event.id: {'isCancelled': True, 'isFeatured': False, 'cancelledAt': now}
+            for event in cls._future(series_id, from_date)
+        }
+        if updates and not cls._write_occurrences(updates):
+            return None
+        return list(updates)
+    
+    def __str__(self):
+        return f"Event series: {self.name} (ID: {self.id})"
@@ -0,0 +1,182 @@
+# events/rollups.py
+import random
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from firebase_admin import firestore
+from burnermanagement.documents import BatchWriter
+from burnermanagement.firebase_config import get_firestore_client
+from burnermanagement.metrics import record_cache
+
+ROLLUP_COLLECTION = 'salesRollups'
+
+# Bucket subcollection, bucket length and the most buckets one series may span
+GRANULARITIES = {
+    'hour': ('salesHourly', timedelta(hours=1), 24 * 31),
+    'day': ('salesDaily', timedelta(days=1), 366),
+}
+
+# Range served when the request gives no start
+DEFAULT_SPAN = {'hour': timedelta(hours=48), 'day': timedelta(days=30)}
+
+SCOPES = ('events', 'venues')
+
+
+def bucket_start(moment, granularity):
+    """Start of the hour or day (in TIME_ZONE) that moment falls in"""
+    local = timezone.localtime(moment) if timezone.is_aware(moment) else timezone.make_aware(moment)
+    if granularity == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    # Day buckets follow the wall clock, so rebuild the aware datetime across DST changes
+    return timezone.make_aware(datetime(local.year, local.month, local.day))
+
+
+def _bucket_ref(db, scope, scope_id, granularity, start, shard):
+    subcollection = GRANULARITIES[granularity][0]
+    key = start.strftime('%Y%m%d%H' if granularity == 'hour' else '%Y%m%d')
+    return (
+        db.collection(ROLLUP_COLLECTION).document(f'{scope}_{scope_id}')
+        .collection(subcollection).document(f'{key}-{shard}')
+    )
+
+
+def record_sale(writer, db, event_id, venue_id, quantity, revenue, moment):
+    """Stage increments of the event's and venue's hourly and daily buckets on writer.
+
+    writer is a batch committed after the tickets are issued, never the
+    issuing transaction, so a busy bucket can't hold up a sale. Each bucket
+    is split over SALES_ROLLUP_SHARDS documents so an on-sale doesn't queue
+    on one of them.
+    """
+    shard = random.randrange(settings.SALES_ROLLUP_SHARDS)
+    data = {
+        'tickets': firestore.Increment(quantity),
+        'revenue': firestore.Increment(revenue),
+    }
+    scopes = [('events', event_id)] + ([('venues', venue_id)] if venue_id else [])
+    for scope, scope_id in scopes:
+        for granularity in GRANULARITIES:
+            start = bucket_start(moment, granularity)
+            writer.set(
+                _bucket_ref(db, scope, scope_id, granularity, start, shard),
+                dict(data, start=start),
+                merge=True,
+            )
+
+
+def series_range(granularity, start=None, end=None):
+    """Bucket-aligned [start, end) for a series; raises ValueError for unusable ranges"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    step, max_buckets = GRANULARITIES[granularity][1:]
+
+    end = bucket_start(end or timezone.now(), granularity) + step
+    start = bucket_start(start, granularity) if start else end - DEFAULT_SPAN[granularity]
+    if start >= end:
+        raise ValueError('start must be before end')
+    if (end - start) / step > max_buckets:
+        raise ValueError(f'At most {max_buckets} {granularity} buckets per series')
+    return start, end
+
+
+def sales_series(scope, scope_id, granularity='day', start=None, end=None):
+    """Chart-ready sales for an event or venue, one point per bucket (empty buckets included)"""
+    start, end = series_range(granularity, start, end)
+    cache_key = f"sales:{scope}/{scope_id}:{granularity}:{start.isoformat()}:{end.isoformat()}"
+    series = cache.get(cache_key)
+    record_cache('sales_series', 'miss' if series is None else 'hit')
+    if series is not None:
+        return series
+
+    totals = {}
+    db = get_firestore_client()
+    if db is not None:
+        subcollection = GRANULARITIES[granularity][0]
+        try:
+            docs = (
+                db.collection(ROLLUP_COLLECTION).document(f'{scope}_{scope_id}')
+                .collection(subcollection)
+                .where('start', '>=', start)
+                .where('start', '<', end)
+                .stream()
+            )
+            for doc in docs:
+                data = doc.to_dict()
+                bucket = totals.setdefault(bucket_start(data['start'], granularity), [0, 0])
+                bucket[0] += data.get('tickets', 0)
+                bucket[1] += data.get('revenue', 0)
+        except Exception as e:
+            print(f"Error fetching sales rollups for {scope}/{scope_id}: {e}")
+            return None
+
+    step = GRANULARITIES[granularity][1]
+    points = []
+    moment = start
+    while moment < end:
+        tickets, revenue = totals.get(moment, (0, 0))
+        points.append({'start': moment.isoformat(), 'tickets': tickets, 'revenue': round(revenue, 2)})
+        # Step in local wall-clock time so day buckets stay aligned across DST changes
+        moment = bucket_start(moment + step + timedelta(hours=1 if granularity == 'day' else 0), granularity)
+
+    series = {
+        'scope': scope,
+        'id': scope_id,
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'totalTickets': sum(point['tickets'] for point in points),
+        'totalRevenue': round(sum(point['revenue'] for point in points), 2),
+        'points': points,
+    }
+    cache.set(cache_key, series, settings.SALES_SERIES_CACHE_TIMEOUT)
+    return series
+
+
+def rebuild_rollups():
+    """Recompute every bucket from the issued tickets; returns the number of tickets counted.
+
+    For backfilling history recorded before the rollups existed, or after a
+    repair. Live sales landing while this runs may be lost from the buckets,
+    so run it outside an on-sale.
+    """
+    from events.models import Event
+
+    db = get_firestore_client()
+    if db is None:
+        return 0
+
+    tickets = [
+        doc.to_dict() for doc in
+        db.collection_group('tickets').select(['eventId', 'price', 'purchasedAt']).stream()
+    ]
+    # Archived events keep their tickets under eventsArchive, so both are counted once
+    venues = {event.id: event.venue_id for event in Event.get_many({t.get('eventId') for t in tickets})}
+
+    buckets = {}
+    counted = 0
+    for ticket in tickets:
+        event_id, purchased_at = ticket.get('eventId'), ticket.get('purchasedAt')
+        if not event_id or not purchased_at:
+            continue
+        counted += 1
+        scopes = [('events', event_id)] + ([('venues', venues[event_id])] if venues.get(event_id) else [])
+        for scope, scope_id in scopes:
+            for granularity in GRANULARITIES:
+                key = (scope, scope_id, granularity, bucket_start(purchased_at, granularity))
+                bucket = buckets.setdefault(key, [0, 0])
+                bucket[0] += 1
+                bucket[1] += ticket.get('price', 0)
+
+    with BatchWriter(db) as writer:
+        for subcollection, _, _ in GRANULARITIES.values():
+            for doc in db.collection_group(subcollection).select([]).stream():
+                writer.delete(doc.reference)
+        for (scope, scope_id, granularity, start), (count, revenue) in buckets.items():
+            writer.set(_bucket_ref(db, scope, scope_id, granularity, start, 0), {
+                'start': start,
+                'tickets': count,
+                'revenue': revenue,
+            })
+
+    return counted
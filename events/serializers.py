@@ -1,5 +1,6 @@
+from decimal import Decimal
 from rest_framework import serializers
-from .models import Event
+from .models import Event, WEEKDAYS
 
 class EventSerializer(serializers.Serializer):
     id = serializers.CharField(read_only=True)
@@ -19,8 +20,16 @@ class EventSerializer(serializers.Serializer):
     is_sold_out = serializers.BooleanField(read_only=True)
     is_upcoming = serializers.BooleanField(read_only=True)
     event_status = serializers.CharField(read_only=True)
+    series_id = serializers.CharField(read_only=True)
+    is_cancelled = serializers.BooleanField(read_only=True)
 
 class EventListSerializer(serializers.Serializer):
+    # Firestore fields behind the output below - list reads select() only these
+    document_fields = Event.field_paths(
+        'name', 'venue', 'date', 'price', 'max_tickets', 'base_tickets_sold',
+        'counter_shards', 'image_url', 'is_featured', 'is_cancelled',
+    )
+    
     id = serializers.CharField(read_only=True)
     name = serializers.CharField()
     venue = serializers.CharField()
@@ -29,4 +38,51 @@ class EventListSerializer(serializers.Serializer):
     tickets_remaining = serializers.IntegerField(read_only=True)
     image_url = serializers.URLField()
     is_featured = serializers.BooleanField()
-    event_status = serializers.CharField(read_only=True)
\ No newline at end of file
+    event_status = serializers.CharField(read_only=True)
+
+
+class RecurrenceSerializer(serializers.Serializer):
+    frequency = serializers.ChoiceField(choices=['weekly', 'daily'], default='weekly')
+    interval = serializers.IntegerField(min_value=1, max_value=52, default=1)
+    count = serializers.IntegerField(min_value=1, required=False)
+    until = serializers.DateField(required=False)
+    weekdays = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(WEEKDAYS)), required=False, allow_empty=False
+    )
+    
+    def validate(self, attrs):
+        if 'count' not in attrs and 'until' not in attrs:
+            raise serializers.ValidationError('Give a count or an until date.')
+        if attrs.get('weekdays') and attrs['frequency'] != 'weekly':
+            raise serializers.ValidationError('weekdays only apply to weekly series.')
+        return attrs
+
+
+class EventSeriesCreateSerializer(serializers.Serializer):
+    # The first occurrence, checked with EventForm's rules
+    template = serializers.DictField()
+    recurrence = RecurrenceSerializer()
+
+
+class EventSeriesUpdateSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200, required=False)
+    description = serializers.CharField(max_length=500, required=False, allow_blank=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False)
+    max_tickets = serializers.IntegerField(min_value=1, required=False)
+    image_url = serializers.URLField(required=False, allow_blank=True)
+    is_featured = serializers.BooleanField(required=False)
+    start_time = serializers.TimeField(required=False)
+    
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Nothing to change.')
+        return attrs
+
+
+class EventSeriesSerializer(serializers.Serializer):
+    id = serializers.CharField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    venue_id = serializers.CharField(read_only=True)
+    recurrence = serializers.DictField(read_only=True)
+    event_ids = serializers.ListField(child=serializers.CharField(), read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
@@ -1,3 +1,334 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APIClient
+from burnermanagement.firebase_config import run_in_transaction
+from burnermanagement.testing import MemoryBackendTestCase
+from users.models import User
+from .counters import ticket_sales_counter
+from .exports import EXPORT_ERROR, render_csv, render_ndjson
+from .imports import EventImportError, import_events, read_csv
+from .models import Event, EventSeries, occurrence_dates
 
-# Create your tests here.
+
+def event_row(name='Friday Night', **fields):
+    return dict({
+        'name': name,
+        'description': 'Live music',
+        'venue_id': 'venue-1',
+        'date': '2030-05-03 20:00',
+        'price': '12.50',
+        'max_tickets': '200',
+    }, **fields)
+
+
+class EventImportTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_venue('venue-1', name='The Venue')
+        self.create_venue('venue-2', name='Other Venue')
+
+    def events(self):
+        return {doc.id: doc.to_dict() for doc in self.db.collection('events').stream()}
+
+    def test_valid_rows_are_created(self):
+        report = import_events([event_row('Friday Night'), event_row('Saturday Night', date='2030-05-04 20:00')])
+
+        self.assertEqual((report['created'], report['invalid'], report['failed']), (2, 0, 0))
+        events = self.events()
+        self.assertEqual(sorted(event['name'] for event in events.values()), ['Friday Night', 'Saturday Night'])
+        self.assertEqual({event['venue'] for event in events.values()}, {'The Venue'})
+        self.assertEqual({entry['id'] for entry in report['rows']}, set(events))
+
+    def test_dry_run_writes_nothing(self):
+        report = import_events([event_row()], dry_run=True)
+
+        self.assertEqual(report['valid'], 1)
+        self.assertEqual(self.events(), {})
+
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        rows = [
+            event_row('Good'),
+            event_row(''),
+            event_row('Nowhere', venue_id='no-such-venue'),
+            event_row('good'),
+        ]
+
+        report = import_events(rows)
+
+        self.assertEqual([entry['status'] for entry in report['rows']], ['created', 'invalid', 'invalid', 'invalid'])
+        self.assertEqual([entry['row'] for entry in report['rows']], [2, 3, 4, 5])
+        self.assertIn('name', report['rows'][1]['errors'])
+        self.assertEqual(len(self.events()), 1)
+
+    def test_running_an_import_again_creates_nothing_new(self):
+        rows = [event_row('Friday Night'), event_row('Saturday Night', date='2030-05-04 20:00')]
+        import_events(rows)
+
+        report = import_events(rows)
+
+        self.assertEqual((report['created'], report['exists']), (0, 2))
+        self.assertEqual(len(self.events()), 2)
+
+    def test_rows_matching_events_created_elsewhere_are_skipped(self):
+        self.create_event('existing', name='Friday Night', venueId='venue-1',
+                          date=datetime(2030, 5, 3, 20, 0, tzinfo=dt_timezone.utc))
+
+        report = import_events([event_row('friday night'), event_row('Friday Night', venue_id='venue-2')])
+
+        self.assertEqual(report['rows'][0], {'row': 2, 'name': 'friday night', 'status': 'exists', 'id': 'existing'})
+        self.assertEqual(report['rows'][1]['status'], 'created')
+
+    def test_venue_admins_only_import_to_their_own_venue(self):
+        admin = User.objects.create(username='admin', email='admin@example.com', role='venueAdmin', venue_id='venue-1')
+
+        report = import_events([
+            event_row('Mine', venue_id='', is_featured='true'),
+            event_row('Theirs', venue_id='venue-2'),
+        ], user=admin)
+
+        self.assertEqual([entry['status'] for entry in report['rows']], ['created', 'invalid'])
+        event = self.events()[report['rows'][0]['id']]
+        self.assertEqual((event['venueId'], event['isFeatured']), ('venue-1', False))
+
+    def test_csv_files_need_a_header_and_rows(self):
+        rows = read_csv(b'\xef\xbb\xbfname,venueId,date,price,maxTickets\nFriday Night,venue-1,2030-05-03 20:00,10,100\n')
+        self.assertEqual(rows, [{
+            'name': 'Friday Night', 'venue_id': 'venue-1', 'date': '2030-05-03 20:00', 'price': '10', 'max_tickets': '100',
+        }])
+
+        for content in (b'', b'title,date\nx,y\n', b'name,date\n'):
+            with self.assertRaises(EventImportError):
+                read_csv(content)
+
+    def test_import_endpoint_reports_each_run(self):
+        admin = User.objects.create(username='admin', email='admin@example.com', role='siteAdmin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        content = b'name,venue_id,date,price,max_tickets\nFriday Night,venue-1,2030-05-03 20:00,10,100\n'
+
+        def upload():
+            return client.post('/api/events/import/', {'file': SimpleUploadedFile('events.csv', content)})
+
+        first = upload()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()['created'], 1)
+        second = upload()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['exists'], 1)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class OccurrenceDatesTests(MemoryBackendTestCase):
+    def test_weekly_series_run_on_the_given_weekdays(self):
+        dates = occurrence_dates(utc(2030, 5, 3, 20), weekdays=['FRI', 'SAT'], count=4)
+
+        self.assertEqual(dates, [utc(2030, 5, 3, 20), utc(2030, 5, 4, 20), utc(2030, 5, 10, 20), utc(2030, 5, 11, 20)])
+
+    def test_daily_series_stop_on_the_until_date(self):
+        dates = occurrence_dates(utc(2030, 5, 1, 18), frequency='daily', interval=2, until=date(2030, 5, 6))
+
+        self.assertEqual(dates, [utc(2030, 5, 1, 18), utc(2030, 5, 3, 18), utc(2030, 5, 5, 18)])
+
+    @override_settings(EVENT_SERIES_MAX_OCCURRENCES=3)
+    def test_series_are_capped(self):
+        with self.assertRaises(ValueError):
+            occurrence_dates(utc(2030, 5, 1, 18), frequency='daily', count=4)
+
+
+class EventSeriesTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_venue('venue-1', name='The Venue')
+        self.admin = User.objects.create(
+            username='admin', email='admin@example.com', role='venueAdmin', venue_id='venue-1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_series(self, count=3):
+        response = self.client.post('/api/events/series/', {
+            'template': event_row('Weekly Jam', venue_id='', date='2030-05-03 20:00'),
+            'recurrence': {'frequency': 'weekly', 'count': count},
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_creating_a_series_writes_every_occurrence(self):
+        series = self.create_series()
+
+        occurrences = EventSeries.get_occurrences(series['id'])
+        self.assertEqual([event.date for event in occurrences], [
+            datetime(2030, 5, 3, 20), datetime(2030, 5, 10, 20), datetime(2030, 5, 17, 20),
+        ])
+        self.assertEqual({(event.venue_id, event.series_id) for event in occurrences}, {('venue-1', series['id'])})
+
+    def test_editing_moves_upcoming_occurrences_but_keeps_capacity_on_sale(self):
+        series = self.create_series()
+        on_sale = EventSeries.get_occurrences(series['id'])[0]
+        self.db.collection('events').document(on_sale.id).update({'inventoryShards': 4})
+
+        response = self.client.patch(f"/api/events/series/{series['id']}/", {
+            'name': 'Weekly Jam Session', 'max_tickets': 300, 'start_time': '21:30',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['max_tickets_unchanged'], [on_sale.id])
+        occurrences = EventSeries.get_occurrences(series['id'])
+        self.assertEqual({event.name for event in occurrences}, {'Weekly Jam Session'})
+        self.assertEqual([event.max_tickets for event in occurrences], [200, 300, 300])
+        self.assertEqual({event.date.time() for event in occurrences}, {time(21, 30)})
+
+    def test_cancelled_occurrences_leave_listings_but_stay_readable(self):
+        from tickets.models import Reservation, ReservationError
+
+        series = self.create_series()
+        first, *rest = EventSeries.get_occurrences(series['id'])
+
+        response = self.client.delete(f"/api/events/series/{series['id']}/?from=2030-05-05T00:00:00Z")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['cancelled']), sorted(event.id for event in rest))
+        self.assertEqual([event.id for event in Event.get_upcoming()], [first.id])
+        self.assertEqual(Event.count_upcoming(), 1)
+        self.assertTrue(Event.get_by_id(rest[0].id).is_cancelled)
+        with self.assertRaises(ReservationError) as raised:
+            Reservation.place(rest[0].id, 'user-1', 'one@example.com')
+        self.assertEqual(raised.exception.code, 'event_cancelled')
+
+    def test_other_venues_cannot_touch_the_series(self):
+        series = self.create_series()
+        outsider = User.objects.create(
+            username='outsider', email='outsider@example.com', role='venueAdmin', venue_id='venue-2'
+        )
+        self.client.force_authenticate(outsider)
+
+        self.assertEqual(self.client.delete(f"/api/events/series/{series['id']}/").status_code, 404)
+        self.assertFalse(any(event.is_cancelled for event in EventSeries.get_occurrences(series['id'])))
+
+
+class ExportRenderingTests(MemoryBackendTestCase):
+    columns = (('id', 'id'), ('userEmail', 'user_email'))
+
+    def failing_pages(self):
+        yield [SimpleNamespace(id='t1', user_email='one@example.com')]
+        raise RuntimeError('query failed')
+
+    def test_csv_cells_are_never_formulas(self):
+        rows = [SimpleNamespace(id='t1', user_email='=HYPERLINK("http://evil")'), SimpleNamespace(id='t2', user_email='-1+2')]
+
+        output = ''.join(render_csv(self.columns, [rows]))
+
+        self.assertEqual(output.splitlines(), ['id,userEmail', 't1,"\'=HYPERLINK(""http://evil"")"', "t2,'-1+2"])
+
+    def test_failed_exports_end_with_an_error_marker(self):
+        csv_lines = ''.join(render_csv(self.columns, self.failing_pages())).splitlines()
+        ndjson_lines = ''.join(render_ndjson(self.columns, self.failing_pages())).splitlines()
+
+        self.assertEqual(csv_lines, ['id,userEmail', 't1,one@example.com', f'#error,{EXPORT_ERROR}'])
+        self.assertEqual([json.loads(line) for line in ndjson_lines], [
+            {'id': 't1', 'userEmail': 'one@example.com'}, {'error': EXPORT_ERROR},
+        ])
+
+
+def failing_aggregations():
+    return mock.patch('burnermanagement.backends.memory.Query.sum', side_effect=RuntimeError('deadline exceeded'))
+
+
+class ShardedCounterTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_event('event-1', ticketsSold=5, maxTickets=50)
+        Event.enable_sharded_counter('event-1', num_shards=4)
+        self.counter = ticket_sales_counter('event-1', 4)
+
+    def test_enabling_creates_every_shard(self):
+        shards = self.counter.shards_ref(self.db).stream()
+
+        self.assertEqual({doc.id: doc.to_dict() for doc in shards}, {str(n): {'count': 0} for n in range(4)})
+        self.assertEqual(Event.get_by_id('event-1').counter_shards, 4)
+
+    def test_increments_are_summed_across_shards(self):
+        for amount in (1, 2, 3, 4):
+            self.counter.increment(amount)
+
+        self.assertEqual(self.counter.get_total(use_cache=False), 10)
+        self.assertEqual(Event.get_by_id('event-1').tickets_sold, 15)
+
+    def test_cached_totals_follow_increments_and_invalidation(self):
+        self.assertEqual(self.counter.get_total(), 0)
+        self.counter.increment(3)
+        self.assertEqual(self.counter.get_total(), 3)
+
+        # Increments staged on a transaction leave the cache alone until invalidated
+        run_in_transaction(lambda transaction: self.counter.increment(7, transaction=transaction))
+        self.assertEqual(self.counter.get_total(), 3)
+        self.counter.invalidate()
+        self.assertEqual(self.counter.get_total(), 10)
+
+    def test_unreadable_counters_are_unknown_not_zero(self):
+        self.counter.increment(45)
+        self.counter.invalidate()
+
+        with failing_aggregations():
+            self.assertIsNone(self.counter.get_total())
+            event = Event.get_by_id('event-1')
+            self.assertEqual((event.tickets_sold, event.tickets_remaining, event.is_sold_out), (None, None, False))
+
+        self.assertEqual(Event.get_by_id('event-1').tickets_sold, 50)
+        self.assertTrue(Event.get_by_id('event-1').is_sold_out)
+
+    def test_inventory_is_not_sized_from_an_unreadable_count(self):
+        from tickets.models import Reservation, ReservationError
+
+        self.counter.increment(45)
+        self.counter.invalidate()
+
+        with failing_aggregations(), self.assertRaises(ReservationError) as raised:
+            Reservation.place('event-1', 'user-1', 'one@example.com')
+        self.assertEqual(raised.exception.code, 'unavailable')
+        self.assertFalse(Event.get_by_id('event-1').inventory_shards)
+
+
+class ArchiveTests(MemoryBackendTestCase):
+    def create_past_event(self, event_id, days_ago=60, counted=0, **data):
+        self.create_event(event_id, date=datetime.utcnow() - timedelta(days=days_ago), ticketsSold=5, **data)
+        if counted:
+            Event.enable_sharded_counter(event_id, num_shards=4)
+            ticket_sales_counter(event_id, 4).increment(counted)
+        return self.db.collection('events').document(event_id)
+
+    def test_counted_sales_are_folded_into_the_archived_event(self):
+        event_ref = self.create_past_event('event-1', counted=40)
+        event_ref.collection('tickets').document('ticket-1').set({'eventId': 'event-1', 'status': 'valid'})
+        self.create_event('upcoming')
+
+        self.assertEqual(Event.archive_past(older_than_days=30), 1)
+
+        archived = self.db.collection(Event.archive_collection).document('event-1').get().to_dict()
+        self.assertEqual((archived['ticketsSold'], archived['counterShards']), (45, 0))
+        self.assertEqual([doc.id for doc in self.db.collection('events').stream()], ['upcoming'])
+        self.assertEqual(list(event_ref.collection('ticketCounterShards').stream()), [])
+        archive_tickets = self.db.collection(Event.archive_collection).document('event-1').collection('tickets')
+        self.assertEqual([doc.id for doc in archive_tickets.stream()], ['ticket-1'])
+        self.assertEqual(Event.get_by_id('event-1').tickets_sold, 45)
+
+    def test_events_whose_sales_cant_be_read_stay_live(self):
+        counted = [self.create_past_event(f'counted-{n}', days_ago=60 - n, counted=40) for n in range(2)]
+        self.create_past_event('plain', days_ago=50)
+
+        with failing_aggregations():
+            self.assertEqual(Event.archive_past(older_than_days=30, page_size=1), 1)
+
+        self.assertEqual(sorted(doc.id for doc in self.db.collection('events').stream()), ['counted-0', 'counted-1'])
+        for event_ref in counted:
+            self.assertEqual(len(list(event_ref.collection('ticketCounterShards').stream())), 4)
+
+        self.assertEqual(Event.archive_past(older_than_days=30), 2)
+        self.assertEqual(Event.get_by_id('counted-0').tickets_sold, 45)
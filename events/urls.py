@@ -6,5 +6,8 @@ router = DefaultRouter()
 router.register(r'', views.EventViewSet, basename='event')
 
 urlpatterns = [
+    path('live/', views.live_availability, name='event-live'),
+    path('series/', views.EventSeriesView.as_view(), name='event-series-create'),
+    path('series/<str:series_id>/', views.EventSeriesDetailView.as_view(), name='event-series-detail'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
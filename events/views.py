@@ -1,16 +1,97 @@
+import json
+from django.conf import settings
+from datetime import datetime
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
-from .models import Event
-from .serializers import EventSerializer, EventListSerializer
+from .exports import CONTENT_TYPES, export_event_tickets
+from .imports import EventImportError, import_events, read_csv
+from .live import hub
+from .forms import EventForm
+from .models import Event, EventSeries, occurrence_dates
+from .rollups import sales_series
+from .serializers import (
+    EventSerializer, EventListSerializer, EventSeriesSerializer, EventSeriesCreateSerializer,
+    EventSeriesUpdateSerializer
+)
+
+# Upper bound for /api/events/featured/?limit=
+MAX_FEATURED_LIMIT = 24
+
+# EventSeriesUpdateSerializer field -> Firestore field
+EVENT_SERIES_FIELDS = {
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'max_tickets': 'maxTickets',
+    'image_url': 'imageUrl',
+    'is_featured': 'isFeatured',
+}
+
+def parse_moment(value):
+    """A query parameter as an aware datetime; accepts a date or an ISO 8601 datetime"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        moment = datetime(day.year, day.month, day.day)
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+def export_response(request, export, scope_id):
+    """Stream an export in ?as=csv (default) or ?as=ndjson"""
+    export_format = request.query_params.get('as', 'csv')
+    if export_format not in CONTENT_TYPES:
+        return Response(
+            {'error': f"as must be one of: {', '.join(CONTENT_TYPES)}"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    response = export(scope_id, export_format)
+    if response is None:
+        return Response(
+            {'error': 'Exports are unavailable'}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return response
+
+def sales_response(request, scope, scope_id):
+    """Sales series for ?granularity=hour|day&start=&end= (end is inclusive)"""
+    params = request.query_params
+    try:
+        series = sales_series(
+            scope, scope_id,
+            granularity=params.get('granularity', 'day'),
+            start=parse_moment(params['start']) if params.get('start') else None,
+            end=parse_moment(params['end']) if params.get('end') else None,
+        )
+    except ValueError as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if series is None:
+        return Response(
+            {'error': 'Sales data is unavailable'}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return Response(series)
 
 class EventViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_scope = 'events'
     
     def list(self, request):
         """Get all active events"""
-        events = Event.get_all_active()
+        events = Event.get_all_active(fields=EventListSerializer.document_fields)
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
     
@@ -28,8 +109,15 @@ class EventViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured events"""
-        limit = int(request.query_params.get('limit', 6))
-        events = Event.get_featured(limit=limit)
+        try:
+            limit = int(request.query_params.get('limit', 6))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be a number'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, MAX_FEATURED_LIMIT))
+        events = Event.get_featured(limit=limit, fields=EventListSerializer.document_fields)
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
     
@@ -43,10 +131,45 @@ class EventViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        events = Event.get_by_venue(venue_id)
+        events = Event.get_by_venue(venue_id, fields=EventListSerializer.document_fields)
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser],
+            permission_classes=[IsAuthenticated])
+    def import_csv(self, request):
+        """Create events from an uploaded CSV (file=...), validated row by row like EventForm"""
+        if not request.user.can_manage_venue(request.user.venue_id):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        dry_run = request.data.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        try:
+            report = import_events(
+                read_csv(upload.file), user=request.user, dry_run=dry_run, created_by=request.user.email
+            )
+        except EventImportError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if report['created']:
+            return Response(report, status=status.HTTP_201_CREATED)
+        if not report['invalid'] and not report['failed']:
+            # Dry runs, and re-runs where every event already exists
+            return Response(report)
+        return Response(report, status=status.HTTP_400_BAD_REQUEST)
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def toggle_featured(self, request, pk=None):
         """Toggle featured status (admin only)"""
@@ -62,4 +185,228 @@ class EventViewSet(viewsets.ViewSet):
         return Response(
             {'error': 'Failed to toggle featured status'}, 
             status=status.HTTP_400_BAD_REQUEST
-        )
\ No newline at end of file
+        )
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def sales(self, request, pk=None):
+        """Tickets sold and revenue per hour or day (venue admins)"""
+        event = Event.get_by_id(pk)
+        if not event:
+            return Response(
+                {'error': 'Event not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not request.user.can_manage_venue(event.venue_id):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return sales_response(request, 'events', pk)
+    
+    @action(detail=True, methods=['get'], url_path='tickets/export', permission_classes=[IsAuthenticated])
+    def export_tickets(self, request, pk=None):
+        """Stream the event's tickets as CSV or NDJSON (venue admins)"""
+        event = Event.get_by_id(pk)
+        if not event:
+            return Response(
+                {'error': 'Event not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not request.user.can_manage_venue(event.venue_id):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return export_response(request, export_event_tickets, pk)
+
+
+class EventSeriesView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        """Create a recurring series from a template event and a recurrence rule"""
+        from venues.models import Venue
+        
+        serializer = EventSeriesCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        template = dict(serializer.validated_data['template'])
+        recurrence = serializer.validated_data['recurrence']
+        
+        # Same rules as creating one event: venue admins only get their own venue
+        if not request.user.is_site_admin():
+            template['venue_id'] = request.user.venue_id
+        if not request.user.can_manage_venue(template.get('venue_id')):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        venue = Venue.get_by_id(template['venue_id'])
+        if not venue:
+            return Response(
+                {'error': 'Venue not found'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        form = EventForm(data=template, user=request.user, venues=[venue])
+        if not form.is_valid():
+            return Response(
+                {'template': form.errors}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            dates = occurrence_dates(
+                form.cleaned_data['date'],
+                frequency=recurrence['frequency'],
+                interval=recurrence['interval'],
+                count=recurrence.get('count'),
+                until=recurrence.get('until'),
+                weekdays=recurrence.get('weekdays'),
+            )
+        except ValueError as e:
+            return Response(
+                {'recurrence': [str(e)]}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        event_data = form.to_document(venue, request.user.email, image_url=template.get('image_url', ''))
+        del event_data['date']
+        if recurrence.get('until'):
+            recurrence['until'] = recurrence['until'].isoformat()
+        series = EventSeries.create(event_data, dates, recurrence, created_by=request.user.email)
+        if series is None:
+            return Response(
+                {'error': 'Failed to create the series'}, 
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        response = EventSeriesSerializer(series).data
+        response['dates'] = [date.isoformat() for date in dates]
+        return Response(response, status=status.HTTP_201_CREATED)
+
+class EventSeriesDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get_series(self, request, series_id):
+        series = EventSeries.get_by_id(series_id)
+        if series and request.user.can_manage_venue(series.venue_id):
+            return series
+        return None
+    
+    def get_from_date(self, request):
+        """?from= limits an edit or cancellation to occurrences on or after that date (default now)"""
+        value = request.query_params.get('from')
+        return parse_moment(value) if value else None
+    
+    def get(self, request, series_id):
+        """The series and all its occurrences"""
+        series = self.get_series(request, series_id)
+        if not series:
+            return Response(
+                {'error': 'Series not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = EventSeriesSerializer(series).data
+        response['events'] = EventSerializer(EventSeries.get_occurrences(series_id), many=True).data
+        return Response(response)
+    
+    def patch(self, request, series_id):
+        """Edit every upcoming occurrence in one batch"""
+        series = self.get_series(request, series_id)
+        if not series:
+            return Response(
+                {'error': 'Series not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        serializer = EventSeriesUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        if 'is_featured' in data and not request.user.is_site_admin():
+            return Response(
+                {'error': 'Only site admins can feature events'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        start_time = data.pop('start_time', None)
+        if 'price' in data:
+            data['price'] = float(data['price'])
+        changes = {field: data[attr] for attr, field in EVENT_SERIES_FIELDS.items() if attr in data}
+        
+        try:
+            result = EventSeries.update_future(
+                series_id, changes, start_time=start_time, from_date=self.get_from_date(request)
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if result is None:
+            return Response(
+                {'error': 'Failed to update the series'}, 
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        updated, kept_capacity = result
+        return Response({'updated': updated, 'max_tickets_unchanged': kept_capacity})
+    
+    def delete(self, request, series_id):
+        """Cancel every upcoming occurrence in one batch"""
+        series = self.get_series(request, series_id)
+        if not series:
+            return Response(
+                {'error': 'Series not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            cancelled = EventSeries.cancel_future(series_id, from_date=self.get_from_date(request))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if cancelled is None:
+            return Response(
+                {'error': 'Failed to cancel the series'}, 
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response({'cancelled': cancelled})
+
+
+@require_GET
+async def live_availability(request):
+    """Server-Sent Events stream of availability for ?ids=<event id>,<event id>...
+
+    Needs an ASGI server (e.g. uvicorn burnermanagement.asgi:application) so
+    an open stream doesn't hold a worker thread. Every stream in the process
+    shares the hub's Firestore listeners.
+    """
+    event_ids = [event_id for event_id in request.GET.get('ids', '').split(',') if event_id]
+    if not event_ids:
+        return JsonResponse({'error': 'ids parameter required'}, status=400)
+    if len(event_ids) > settings.LIVE_MAX_EVENTS_PER_STREAM:
+        return JsonResponse(
+            {'error': f'At most {settings.LIVE_MAX_EVENTS_PER_STREAM} events per stream'},
+            status=400
+        )
+
+    async def stream():
+        subscription = hub.subscribe(event_ids)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                states = await subscription.next(timeout=settings.LIVE_HEARTBEAT_SECONDS)
+                if not states:
+                    # Keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                for state in states.values():
+                    yield f"event: availability\ndata: {json.dumps(state)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx would otherwise buffer the stream
+    return response
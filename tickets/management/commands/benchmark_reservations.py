@@ -0,0 +1,159 @@
+# tickets/management/commands/benchmark_reservations.py
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from burnermanagement.backends import get_backend
+from burnermanagement.backends.memory import MemoryBackend
+from burnermanagement.firebase_config import get_firestore_client
+from events.counters import ticket_sales_counter
+from tickets.models import Reservation, ReservationError
+
+class Command(BaseCommand):
+    help = 'Stampede the reservation engine on the Firestore emulator (or in-memory backend) and check nothing oversells'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=500, help='maxTickets for the benchmark event (default: 500)')
+        parser.add_argument('--requests', type=int, default=5000, help='Purchase attempts to make (default: 5000)')
+        parser.add_argument('--workers', type=int, default=64, help='Concurrent buyers (default: 64)')
+        parser.add_argument('--max-quantity', type=int, default=2, help='Largest hold per attempt (default: 2)')
+        parser.add_argument('--confirm-rate', type=float, default=0.8, help='Share of holds that get paid (default: 0.8)')
+        parser.add_argument('--abandon-rate', type=float, default=0.1, help='Share of holds left to expire (default: 0.1)')
+        parser.add_argument('--hold-seconds', type=int, default=2, help='Hold lifetime during the run (default: 2)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark event afterwards')
+
+    def handle(self, *args, **options):
+        if not (os.environ.get('FIRESTORE_EMULATOR_HOST') or isinstance(get_backend(), MemoryBackend)):
+            raise CommandError(
+                'FIRESTORE_EMULATOR_HOST is not set. This benchmark writes thousands of '
+                'documents and must only run against the Firestore emulator or the '
+                'in-memory DATA_BACKEND.'
+            )
+
+        db = get_firestore_client()
+        if not db:
+            raise CommandError('Failed to connect to the Firestore emulator.')
+
+        event_id = f'bench-{uuid.uuid4()}'
+        max_tickets = options['tickets']
+        db.collection('events').document(event_id).set({
+            'name': 'Reservation benchmark',
+            'date': timezone.now() + timedelta(days=30),
+            'price': 10.0,
+            'maxTickets': max_tickets,
+            'ticketsSold': 0,
+            'createdBy': 'benchmark',
+        })
+        self.stdout.write(f'Created event {event_id} with {max_tickets} tickets')
+
+        outcomes = {}
+        latencies = []
+        owners = {}
+        lock = threading.Lock()
+
+        def buyer(i):
+            user_id = f'bench-user-{i}'
+            started = time.perf_counter()
+            try:
+                hold = Reservation.place(
+                    event_id, user_id, f'{user_id}@example.com',
+                    quantity=random.randint(1, options['max_quantity']),
+                    hold_seconds=options['hold_seconds'],
+                )
+                roll = random.random()
+                if roll < options['confirm_rate']:
+                    # Confirm the way the payment webhook does
+                    Reservation.confirm_paid(event_id, hold.id, f'bench-payment-{hold.id}', hold.total)
+                    with lock:
+                        owners[hold.id] = user_id
+                    result = 'confirmed'
+                elif roll < options['confirm_rate'] + options['abandon_rate']:
+                    result = 'abandoned'
+                else:
+                    Reservation.release(event_id, hold.id, user_id)
+                    result = 'released'
+            except ReservationError as e:
+                result = e.code
+            except Exception as e:
+                result = f'error: {type(e).__name__}'
+            elapsed = time.perf_counter() - started
+
+            with lock:
+                outcomes[result] = outcomes.get(result, 0) + 1
+                latencies.append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            list(pool.map(buyer, range(options['requests'])))
+        duration = time.perf_counter() - started
+
+        # Let abandoned holds lapse, then sweep them
+        time.sleep(options['hold_seconds'] + 1)
+        expired = Reservation.sweep_expired()
+
+        event_ref = db.collection('events').document(event_id)
+        tickets = event_ref.collection('tickets').count(alias='total').get()[0][0].value
+        # Every ticket must belong to the buyer whose hold it was issued from
+        misowned = sum(
+            1 for doc in event_ref.collection('tickets').select(['holdId', 'userId']).stream()
+            if doc.get('userId') != owners.get(doc.get('holdId'))
+        )
+        shards = [doc.to_dict() for doc in event_ref.collection('inventory').stream()]
+        sold = sum(shard['sold'] for shard in shards)
+        held = sum(shard['held'] for shard in shards)
+        counted = ticket_sales_counter(event_id).get_total(use_cache=False)
+
+        latencies.sort()
+        results = {
+            'event_id': event_id,
+            'max_tickets': max_tickets,
+            'requests': options['requests'],
+            'workers': options['workers'],
+            'duration_seconds': round(duration, 3),
+            'requests_per_second': round(options['requests'] / duration, 1),
+            'latency_ms': {
+                'p50': round(statistics.median(latencies) * 1000, 1),
+                'p95': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+                'p99': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+            },
+            'outcomes': outcomes,
+            'holds_expired_by_sweeper': expired,
+            'tickets_issued': tickets,
+            'inventory_sold': sold,
+            'inventory_held': held,
+            'counter_total': counted,
+            'tickets_misowned': misowned,
+            'oversold': tickets > max_tickets,
+            'consistent': tickets == sold == counted and held == 0,
+        }
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+        if not options['keep']:
+            self.cleanup(event_ref)
+
+        if results['oversold']:
+            raise CommandError(f'Oversold: {tickets} tickets issued for {max_tickets} places')
+        if not results['consistent']:
+            raise CommandError('Ticket, inventory and counter totals disagree')
+        if misowned:
+            raise CommandError(f'{misowned} tickets are not owned by the buyer who paid for them')
+        self.stdout.write(self.style.SUCCESS('No overselling detected'))
+
+    def cleanup(self, event_ref):
+        """Delete the benchmark event and everything under it"""
+        for collection in ('tickets', 'holds', 'inventory', 'ticketCounterShards'):
+            for doc in event_ref.collection(collection).stream():
+                doc.reference.delete()
+        event_ref.delete()
@@ -0,0 +1,30 @@
+# tickets/management/commands/sweep_holds.py
+import time
+from django.core.management.base import BaseCommand
+from tickets.models import Reservation
+
+class Command(BaseCommand):
+    help = 'Expire unpaid ticket holds and return their tickets to inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=500,
+            help='Expired holds to fetch per query (default: 500)'
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            help='Keep sweeping every N seconds instead of running once'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = Reservation.sweep_expired(page_size=options['page_size'])
+            self.stdout.write(f'Expired {expired} holds')
+            
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
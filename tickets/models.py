@@ -1,3 +1,600 @@
-from django.db import models
+# tickets/models.py
+import random
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from burnermanagement.documents import FirestoreDocument, Field, decode_datetime
+from burnermanagement.firebase_config import get_firestore_client, run_in_transaction
+from events.counters import ticket_sales_counter
+from events.models import Event
+from events.rollups import record_sale
+from .payments import PaymentError, get_payment_provider, payment_doc_id, to_cents
+from .signing import sign_ticket, signing_enabled, ticket_expiry
 
-# Create your models here.
+HELD = 'held'
+CONFIRMED = 'confirmed'
+RELEASED = 'released'
+EXPIRED = 'expired'
+
+VALID = 'valid'
+USED = 'used'
+
+
+class ReservationError(Exception):
+    """Raised when a hold can't be placed, confirmed or released"""
+
+    def __init__(self, message, code='invalid'):
+        super().__init__(message)
+        self.code = code
+
+
+class TicketError(Exception):
+    """Raised when a ticket can't be admitted at the door"""
+
+    def __init__(self, message, code='invalid'):
+        super().__init__(message)
+        self.code = code
+
+
+def _inventory_ref(db, event_id, shard):
+    return db.collection('events').document(event_id).collection('inventory').document(str(shard))
+
+
+def _holds_ref(db, event_id):
+    return db.collection('events').document(event_id).collection('holds')
+
+
+def _sold_out_key(event_id):
+    return f"reservations:sold_out:{event_id}"
+
+
+def _initialize_inventory(transaction, db, event_ref, tickets_sold, num_shards):
+    """Split the remaining tickets across inventory shards (runs once per event)"""
+    snapshot = event_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        raise ReservationError('Event not found', 'not_found')
+
+    data = snapshot.to_dict()
+    if data.get('inventoryShards'):
+        return data['inventoryShards']
+
+    remaining = max(data.get('maxTickets', 0) - tickets_sold, 0)
+    # Keep shards big enough that a full-size order fits in one of them
+    num_shards = max(1, min(num_shards, remaining // (settings.TICKET_MAX_PER_ORDER * 4)))
+    per_shard, extra = divmod(remaining, num_shards)
+    for shard in range(num_shards):
+        transaction.set(_inventory_ref(db, event_ref.id, shard), {
+            'capacity': per_shard + (1 if shard < extra else 0),
+            'held': 0,
+            'sold': 0,
+        })
+
+    transaction.update(event_ref, {
+        'inventoryShards': num_shards,
+        'counterShards': data.get('counterShards') or settings.TICKET_COUNTER_SHARDS,
+    })
+    return num_shards
+
+
+def _shard_availability(db, event_id, num_shards):
+    """Tickets still free in each of an event's inventory shards"""
+    snapshots = db.get_all([_inventory_ref(db, event_id, shard) for shard in range(num_shards)])
+    available = []
+    for snapshot in snapshots:
+        shard = snapshot.to_dict() or {}
+        available.append(max(shard.get('capacity', 0) - shard.get('held', 0) - shard.get('sold', 0), 0))
+    return available
+
+
+def _place_hold(transaction, shard_ref, hold_ref, hold_data):
+    """Reserve hold_data['quantity'] tickets from one shard if it has room"""
+    shard = shard_ref.get(transaction=transaction).to_dict() or {}
+    quantity = hold_data['quantity']
+
+    available = shard.get('capacity', 0) - shard.get('held', 0) - shard.get('sold', 0)
+    if available < quantity:
+        return False
+
+    transaction.update(shard_ref, {'held': shard.get('held', 0) + quantity})
+    transaction.set(hold_ref, hold_data)
+    return True
+
+
+def _payment_ref(db, payment_reference):
+    return db.collection('payments').document(payment_doc_id(payment_reference))
+
+
+def _confirm_hold(transaction, db, hold_ref, user_id, payment_reference):
+    """Turn a live hold into tickets; returns (hold data, whether it was confirmed now).
+
+    user_id None skips the owner check, for the payment provider's webhook.
+    A payment reference pays for one hold only; it is recorded in
+    payments/{sha256(reference)} with the tickets. A payment for a hold
+    that expired or was released first is recorded with refundDue set, on
+    the hold and in payments, and the hold comes back unconfirmed.
+    """
+    snapshot = hold_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        raise ReservationError('Reservation not found', 'not_found')
+
+    hold = snapshot.to_dict()
+    if user_id is not None and hold.get('userId') != user_id:
+        raise ReservationError('Reservation belongs to another user', 'forbidden')
+    if hold.get('status') == CONFIRMED:
+        return hold, False
+    if hold.get('status') != HELD and not payment_reference:
+        raise ReservationError(f"Reservation is {hold.get('status')}", hold.get('status'))
+
+    event_id = hold['eventId']
+    quantity = hold['quantity']
+    shard_ref = _inventory_ref(db, event_id, hold['shard'])
+    shard = shard_ref.get(transaction=transaction).to_dict() or {}
+    now = timezone.now()
+
+    payment_ref = None
+    if payment_reference:
+        payment_ref = _payment_ref(db, payment_reference)
+        payment = payment_ref.get(transaction=transaction)
+        if payment.exists and payment.to_dict().get('holdId') != hold_ref.id:
+            raise ReservationError('Payment has already been used for another reservation', 'payment_used')
+
+    if hold.get('status') != HELD or hold['expiresAt'] <= now:
+        # Payment came in too late - hand the tickets back
+        if hold.get('status') == HELD:
+            transaction.update(shard_ref, {'held': shard.get('held', 0) - quantity})
+            hold['status'] = EXPIRED
+        unapplied = {'status': hold['status']}
+        if payment_ref is not None:
+            # The money was captured all the same; keep the reference so it can be refunded
+            unapplied.update({'paymentReference': payment_reference, 'refundDue': True})
+            transaction.set(payment_ref, {
+                'eventId': event_id,
+                'holdId': hold_ref.id,
+                'amount': quantity * hold.get('price', 0),
+                'usedAt': now,
+                'refundDue': True,
+            })
+        transaction.update(hold_ref, unapplied)
+        hold.update(unapplied)
+        return hold, False
+
+    tickets_ref = db.collection('events').document(event_id).collection('tickets')
+    ticket_ids = []
+    for _ in range(quantity):
+        ticket_ref = tickets_ref.document()
+        transaction.set(ticket_ref, {
+            'eventId': event_id,
+            'holdId': hold_ref.id,
+            # The hold's owner, also when the webhook (user_id None) confirms it
+            'userId': hold.get('userId'),
+            'userEmail': hold.get('userEmail', ''),
+            'price': hold.get('price', 0),
+            'status': VALID,
+            'paymentReference': payment_reference,
+            'purchasedAt': now,
+        })
+        ticket_ids.append(ticket_ref.id)
+
+    transaction.update(shard_ref, {
+        'held': shard.get('held', 0) - quantity,
+        'sold': shard.get('sold', 0) + quantity,
+    })
+
+    confirmed = {
+        'status': CONFIRMED,
+        'confirmedAt': now,
+        'ticketIds': ticket_ids,
+        'paymentReference': payment_reference,
+    }
+    transaction.update(hold_ref, confirmed)
+    hold.update(confirmed)
+    if payment_ref is not None:
+        transaction.set(payment_ref, {
+            'eventId': event_id,
+            'holdId': hold_ref.id,
+            'amount': quantity * hold.get('price', 0),
+            'usedAt': now,
+        })
+    ticket_sales_counter(event_id).increment(quantity, transaction=transaction)
+    return hold, True
+
+
+def _record_sale(db, event_id, hold_id, hold):
+    """Add a confirmed hold to the sales rollups, after (and outside) the transaction that issued it"""
+    # Holds placed before venueId was stored fall back to the (cached) event
+    venue_id = hold.get('venueId')
+    if venue_id is None:
+        event = Event.get_by_id(event_id)
+        venue_id = event.venue_id if event else ''
+
+    batch = db.batch()
+    quantity = hold['quantity']
+    record_sale(batch, db, event_id, venue_id, quantity, quantity * hold.get('price', 0), hold['confirmedAt'])
+    try:
+        batch.commit()
+    except Exception as e:
+        # The tickets stand; manage.py rebuild_sales_rollups recounts them
+        print(f"Error recording sale for hold {hold_id} of event {event_id}: {e}")
+
+
+def _release_hold(transaction, db, hold_ref, user_id):
+    """Give a live hold's tickets back to its shard"""
+    snapshot = hold_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        raise ReservationError('Reservation not found', 'not_found')
+
+    hold = snapshot.to_dict()
+    if user_id is not None and hold.get('userId') != user_id:
+        raise ReservationError('Reservation belongs to another user', 'forbidden')
+    if hold.get('status') != HELD:
+        return False
+
+    shard_ref = _inventory_ref(db, hold['eventId'], hold['shard'])
+    shard = shard_ref.get(transaction=transaction).to_dict() or {}
+    transaction.update(shard_ref, {'held': shard.get('held', 0) - hold['quantity']})
+    transaction.update(hold_ref, {'status': RELEASED})
+    return True
+
+
+def _expire_holds(transaction, shard_ref, hold_refs, now):
+    """Expire a group of holds from the same shard in one transaction"""
+    shard = shard_ref.get(transaction=transaction).to_dict() or {}
+
+    released = 0
+    expired = 0
+    for snapshot in transaction.get_all(hold_refs):
+        hold = snapshot.to_dict() or {}
+        # Re-check inside the transaction - it may have been confirmed meanwhile
+        if hold.get('status') != HELD or hold['expiresAt'] > now:
+            continue
+        transaction.update(snapshot.reference, {'status': EXPIRED})
+        released += hold['quantity']
+        expired += 1
+
+    if released:
+        transaction.update(shard_ref, {'held': shard.get('held', 0) - released})
+    return expired
+
+
+def _admit_ticket(transaction, ticket_ref, scanned_by):
+    """Mark a ticket used exactly once; a second scan of the same ticket fails"""
+    snapshot = ticket_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        raise TicketError('Ticket not found', 'not_found')
+
+    ticket = snapshot.to_dict()
+    if ticket.get('status') == USED:
+        raise TicketError(f"Ticket already scanned at {ticket.get('usedAt')}", 'already_used')
+    if ticket.get('status') != VALID:
+        raise TicketError(f"Ticket is {ticket.get('status')}", 'not_valid')
+
+    admitted = {'status': USED, 'usedAt': timezone.now(), 'scannedBy': scanned_by}
+    transaction.update(ticket_ref, admitted)
+    ticket.update(admitted)
+    return ticket
+
+
+class Reservation:
+    """Time-boxed hold on tickets for an event, stored in events/{id}/holds.
+
+    Capacity lives in events/{id}/inventory shard documents ({capacity, held,
+    sold}) created on the first reservation, so concurrent buyers contend on
+    different documents. Every hold, confirm and release runs in a Firestore
+    transaction against one shard, so a shard can never hand out more than
+    its capacity and the event can never oversell.
+    """
+
+    def __init__(self, id=None, **kwargs):
+        self.id = id
+        self.event_id = kwargs.get('eventId', '')
+        self.venue_id = kwargs.get('venueId', '')
+        self.user_id = kwargs.get('userId', '')
+        self.user_email = kwargs.get('userEmail', '')
+        self.quantity = kwargs.get('quantity', 0)
+        self.shard = kwargs.get('shard', 0)
+        self.price = kwargs.get('price', 0)
+        self.status = kwargs.get('status', HELD)
+        self.created_at = kwargs.get('createdAt')
+        self.expires_at = kwargs.get('expiresAt')
+        self.confirmed_at = kwargs.get('confirmedAt')
+        self.ticket_ids = kwargs.get('ticketIds', [])
+        self.payment_reference = kwargs.get('paymentReference', '')
+        self.refund_due = kwargs.get('refundDue', False)
+
+    @classmethod
+    def ensure_inventory(cls, event):
+        """Create the event's inventory shards if needed and return how many there are"""
+        if event.inventory_shards:
+            return event.inventory_shards
+
+        # Inventory is sized from the sales so far, so an unreadable count must not pass for 0
+        tickets_sold = event.tickets_sold
+        if tickets_sold is None:
+            raise ReservationError('Ticketing is unavailable', 'unavailable')
+
+        db = get_firestore_client()
+        event_ref = db.collection('events').document(event.id)
+        num_shards = run_in_transaction(
+            _initialize_inventory, db, event_ref, tickets_sold, settings.TICKET_INVENTORY_SHARDS
+        )
+        Event.invalidate(event.id)
+        return num_shards
+
+    @classmethod
+    def place(cls, event_id, user_id, user_email, quantity=1, hold_seconds=None):
+        """Hold tickets for a user; raises ReservationError if none are left"""
+        if quantity < 1 or quantity > settings.TICKET_MAX_PER_ORDER:
+            raise ReservationError(
+                f"Quantity must be between 1 and {settings.TICKET_MAX_PER_ORDER}", 'invalid_quantity'
+            )
+
+        if cache.get(_sold_out_key(event_id)):
+            raise ReservationError('Not enough tickets left', 'sold_out')
+
+        db = get_firestore_client()
+        if db is None:
+            raise ReservationError('Ticketing is unavailable', 'unavailable')
+
+        event = Event.get_by_id(event_id)
+        if not event:
+            raise ReservationError('Event not found', 'not_found')
+        if event.is_cancelled:
+            raise ReservationError('Event has been cancelled', 'event_cancelled')
+        if not event.is_upcoming:
+            raise ReservationError('Event has already taken place', 'event_past')
+
+        num_shards = cls.ensure_inventory(event)
+        now = timezone.now()
+        hold_ref = _holds_ref(db, event_id).document()
+        hold_data = {
+            'eventId': event_id,
+            'venueId': event.venue_id,
+            'userId': user_id,
+            'userEmail': user_email,
+            'quantity': quantity,
+            'price': event.price,
+            'status': HELD,
+            'createdAt': now,
+            'expiresAt': now + timedelta(seconds=hold_seconds or settings.TICKET_HOLD_SECONDS),
+        }
+
+        # Start at a random shard and walk the rest until one has room
+        start = random.randrange(num_shards)
+        for offset in range(num_shards):
+            hold_data['shard'] = (start + offset) % num_shards
+            shard_ref = _inventory_ref(db, event_id, hold_data['shard'])
+            if run_in_transaction(_place_hold, shard_ref, hold_ref, hold_data):
+                return cls(id=hold_ref.id, **hold_data)
+
+        # No single shard has room; only cache sold-out if the whole event is
+        available = _shard_availability(db, event_id, num_shards)
+        if not sum(available):
+            cache.set(_sold_out_key(event_id), True, 5)
+            raise ReservationError('Not enough tickets left', 'sold_out')
+        raise ReservationError(
+            f"Only {min(max(available), sum(available))} tickets can be held in one order right now",
+            'not_enough'
+        )
+
+    @classmethod
+    def get(cls, event_id, hold_id):
+        """Get a hold by event and hold ID"""
+        db = get_firestore_client()
+
+        if db is None:
+            return None
+
+        try:
+            doc = _holds_ref(db, event_id).document(hold_id).get()
+            if doc.exists:
+                return cls(id=doc.id, **doc.to_dict())
+        except Exception as e:
+            print(f"Error fetching reservation {hold_id}: {e}")
+
+        return None
+
+    @classmethod
+    def confirm(cls, event_id, hold_id, user_id, payment_reference=''):
+        """Convert a user's hold into tickets once PAYMENT_PROVIDER confirms it was paid for"""
+        if get_firestore_client() is None:
+            raise ReservationError('Ticketing is unavailable', 'unavailable')
+
+        reservation = cls.get(event_id, hold_id)
+        if reservation is None:
+            raise ReservationError('Reservation not found', 'not_found')
+        if reservation.user_id != user_id:
+            raise ReservationError('Reservation belongs to another user', 'forbidden')
+
+        # Free holds need no payment; confirmed ones are returned as they are
+        if reservation.status == HELD and to_cents(reservation.total) > 0:
+            try:
+                get_payment_provider().verify(payment_reference, reservation.total)
+            except PaymentError as e:
+                raise ReservationError(str(e), e.code)
+
+        return cls._confirm(event_id, hold_id, user_id, payment_reference)
+
+    @classmethod
+    def confirm_paid(cls, event_id, hold_id, payment_reference, amount):
+        """Convert a hold into tickets for a payment the provider reported through its signed webhook"""
+        if get_firestore_client() is None:
+            raise ReservationError('Ticketing is unavailable', 'unavailable')
+
+        reservation = cls.get(event_id, hold_id)
+        if reservation is None:
+            raise ReservationError('Reservation not found', 'not_found')
+        if to_cents(amount) < to_cents(reservation.total):
+            raise ReservationError('Payment does not cover the reservation', 'payment_required')
+
+        return cls._confirm(event_id, hold_id, None, payment_reference)
+
+    @classmethod
+    def _confirm(cls, event_id, hold_id, user_id, payment_reference):
+        db = get_firestore_client()
+        if db is None:
+            raise ReservationError('Ticketing is unavailable', 'unavailable')
+
+        hold_ref = _holds_ref(db, event_id).document(hold_id)
+        hold, confirmed_now = run_in_transaction(_confirm_hold, db, hold_ref, user_id, payment_reference)
+        if hold['status'] != CONFIRMED:
+            cache.delete(_sold_out_key(event_id))
+            if hold['status'] == EXPIRED:
+                raise ReservationError('Reservation has expired', EXPIRED)
+            raise ReservationError(f"Reservation is {hold['status']}", hold['status'])
+
+        if confirmed_now:
+            _record_sale(db, event_id, hold_id, hold)
+
+        ticket_sales_counter(event_id).invalidate()
+        return cls(id=hold_id, **hold)
+
+    @classmethod
+    def release(cls, event_id, hold_id, user_id=None):
+        """Cancel a live hold and return its tickets to the pool"""
+        db = get_firestore_client()
+        if db is None:
+            raise ReservationError('Ticketing is unavailable', 'unavailable')
+
+        hold_ref = _holds_ref(db, event_id).document(hold_id)
+        released = run_in_transaction(_release_hold, db, hold_ref, user_id)
+        if released:
+            cache.delete(_sold_out_key(event_id))
+        return released
+
+    @classmethod
+    def sweep_expired(cls, page_size=500):
+        """Expire every unpaid hold past its expiry and return the tickets to inventory"""
+        db = get_firestore_client()
+
+        if db is None:
+            return 0
+
+        total = 0
+        while True:
+            now = timezone.now()
+            docs = list(
+                db.collection_group('holds')
+                .where('status', '==', HELD)
+                .where('expiresAt', '<=', now)
+                .limit(page_size)
+                .stream()
+            )
+            if not docs:
+                break
+
+            # One transaction per shard covers every expired hold on it
+            groups = {}
+            for doc in docs:
+                data = doc.to_dict()
+                key = (data['eventId'], data['shard'])
+                groups.setdefault(key, []).append(doc.reference)
+
+            expired = 0
+            for (event_id, shard), hold_refs in groups.items():
+                try:
+                    expired += run_in_transaction(
+                        _expire_holds, _inventory_ref(db, event_id, shard), hold_refs, now
+                    )
+                    cache.delete(_sold_out_key(event_id))
+                except Exception as e:
+                    print(f"Error expiring holds for event {event_id} shard {shard}: {e}")
+
+            total += expired
+            # Stop on a short page, or if nothing on this page could be expired
+            if len(docs) < page_size or not expired:
+                break
+
+        return total
+
+    @property
+    def total(self):
+        return self.quantity * self.price
+
+    @property
+    def is_expired(self):
+        return self.status == HELD and self.expires_at is not None and self.expires_at <= timezone.now()
+
+    def __str__(self):
+        return f"Reservation: {self.quantity} x {self.event_id} (ID: {self.id}, {self.status})"
+
+
+class Ticket(FirestoreDocument):
+    """Ticket issued when a hold is confirmed, stored in events/{id}/tickets"""
+
+    fields = (
+        Field('eventId', 'event_id', default=''),
+        Field('holdId', 'hold_id', default=''),
+        Field('userId', 'user_id', default=''),
+        Field('userEmail', 'user_email', default=''),
+        Field('price', default=0),
+        Field('status', default=VALID),
+        Field('paymentReference', 'payment_reference', default=''),
+        Field('purchasedAt', 'purchased_at', decode=decode_datetime),
+        Field('usedAt', 'used_at', decode=decode_datetime),
+    )
+    extra_slots = ('event',)
+
+    @staticmethod
+    def ref(db, event_id, ticket_id):
+        return db.collection('events').document(event_id).collection('tickets').document(ticket_id)
+
+    @classmethod
+    def get(cls, event_id, ticket_id):
+        """Get a ticket by event and ticket ID"""
+        db = get_firestore_client()
+
+        if db is None:
+            return None
+
+        try:
+            doc = cls.ref(db, event_id, ticket_id).get()
+            if doc.exists:
+                return cls.from_snapshot(doc)
+        except Exception as e:
+            print(f"Error fetching ticket {ticket_id}: {e}")
+
+        return None
+
+    @classmethod
+    def admit(cls, event_id, ticket_id, scanned_by=''):
+        """Let a ticket in at the door; raises TicketError if it was already used or isn't valid"""
+        db = get_firestore_client()
+        if db is None:
+            raise TicketError('Ticketing is unavailable', 'unavailable')
+
+        ticket = run_in_transaction(_admit_ticket, cls.ref(db, event_id, ticket_id), scanned_by)
+        return cls.from_dict(ticket_id, ticket)
+
+    @property
+    def payload(self):
+        """Signed code for the ticket's QR, valid until a while after its event starts (None without a signing key)"""
+        if not signing_enabled():
+            return None
+        event = getattr(self, 'event', None) or Event.get_by_id(self.event_id)
+        return sign_ticket(self.event_id, self.id, ticket_expiry(event.date if event else None, self.purchased_at))
+
+    @classmethod
+    def get_for_user(cls, user_id):
+        """All of a user's tickets, with their events attached from one batched read"""
+        db = get_firestore_client()
+
+        if db is None:
+            return []
+
+        try:
+            docs = db.collection_group('tickets').where('userId', '==', user_id).stream()
+            tickets = [cls.from_snapshot(doc) for doc in docs]
+        except Exception as e:
+            print(f"Error fetching tickets for user {user_id}: {e}")
+            return []
+
+        events = {event.id: event for event in Event.get_many([t.event_id for t in tickets])}
+        for ticket in tickets:
+            ticket.event = events.get(ticket.event_id)
+
+        tickets.sort(key=lambda t: t.event.date if t.event and t.event.date else datetime.max)
+        return tickets
+
+    def __str__(self):
+        return f"Ticket: {self.event_id} (ID: {self.id}, {self.status})"
@@ -0,0 +1,74 @@
+# tickets/payments.py
+import hashlib
+import hmac
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_provider = None
+
+
+class PaymentError(Exception):
+    """Raised when a payment can't be verified with the payment provider"""
+
+    def __init__(self, message, code='payment_required'):
+        super().__init__(message)
+        self.code = code
+
+
+def to_cents(amount):
+    return int(round(amount * 100))
+
+
+class BasePaymentProvider:
+    """Server-side check that a payment really happened.
+
+    Subclasses look the reference up with their provider's API and return
+    the settled amount; the client's word that it paid is never enough.
+    """
+
+    def settled_amount(self, reference):
+        """Amount captured for reference, or None if it isn't a settled payment"""
+        raise NotImplementedError
+
+    def verify(self, reference, amount):
+        """Raise PaymentError unless reference is a settled payment of at least amount"""
+        if not reference:
+            raise PaymentError('A payment reference is required')
+        settled = self.settled_amount(reference)
+        if settled is None:
+            raise PaymentError('Payment has not been completed')
+        if to_cents(settled) < to_cents(amount):
+            raise PaymentError('Payment does not cover the reservation')
+
+
+class UnconfiguredProvider(BasePaymentProvider):
+    """Default provider: nothing can be verified, so paid holds are only confirmed by the webhook"""
+
+    def settled_amount(self, reference):
+        raise PaymentError('Payments are confirmed by the payment provider', 'payment_unavailable')
+
+
+def get_payment_provider():
+    """The provider selected by settings.PAYMENT_PROVIDER (created once per process)"""
+    global _provider
+
+    if _provider is None:
+        _provider = import_string(settings.PAYMENT_PROVIDER)()
+    return _provider
+
+
+def payment_doc_id(reference):
+    """Document ID recording a used payment reference (references may contain slashes)"""
+    return hashlib.sha256(reference.encode()).hexdigest()
+
+
+def webhook_signature(body):
+    """Hex HMAC-SHA256 of a webhook body under PAYMENT_WEBHOOK_SECRET"""
+    return hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def check_webhook_signature(body, signature):
+    """True if signature was made with PAYMENT_WEBHOOK_SECRET; always False when none is set"""
+    if not settings.PAYMENT_WEBHOOK_SECRET or not signature:
+        return False
+    return hmac.compare_digest(webhook_signature(body), signature)
@@ -0,0 +1,52 @@
+from rest_framework import serializers
+from django.conf import settings
+from events.serializers import EventListSerializer
+
+class ReservationRequestSerializer(serializers.Serializer):
+    event_id = serializers.CharField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    admission_pass = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate_quantity(self, value):
+        if value > settings.TICKET_MAX_PER_ORDER:
+            raise serializers.ValidationError(
+                f"You can reserve at most {settings.TICKET_MAX_PER_ORDER} tickets at once."
+            )
+        return value
+
+class ConfirmReservationSerializer(serializers.Serializer):
+    payment_reference = serializers.CharField(required=False, allow_blank=True, default='')
+
+class PaymentWebhookSerializer(serializers.Serializer):
+    event_id = serializers.CharField()
+    hold_id = serializers.CharField()
+    reference = serializers.CharField(max_length=256)
+    amount = serializers.FloatField(min_value=0)
+
+class ValidateTicketSerializer(serializers.Serializer):
+    # The signed code read from the ticket's QR
+    payload = serializers.CharField(max_length=512)
+
+class WaitingRoomSerializer(serializers.Serializer):
+    rate = serializers.IntegerField(min_value=1, required=False)
+
+class ReservationSerializer(serializers.Serializer):
+    id = serializers.CharField(read_only=True)
+    event_id = serializers.CharField(read_only=True)
+    quantity = serializers.IntegerField(read_only=True)
+    price = serializers.FloatField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    expires_at = serializers.DateTimeField(read_only=True)
+    confirmed_at = serializers.DateTimeField(read_only=True)
+    ticket_ids = serializers.ListField(child=serializers.CharField(), read_only=True)
+
+class TicketSerializer(serializers.Serializer):
+    id = serializers.CharField(read_only=True)
+    event_id = serializers.CharField(read_only=True)
+    price = serializers.FloatField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    purchased_at = serializers.DateTimeField(read_only=True)
+    used_at = serializers.DateTimeField(read_only=True)
+    payload = serializers.CharField(read_only=True)
+    event = EventListSerializer(read_only=True)
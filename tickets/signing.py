@@ -0,0 +1,148 @@
+# tickets/signing.py
+import base64
+import calendar
+import functools
+import hashlib
+import io
+import time
+from datetime import timedelta
+import qrcode
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+# Payload layout: BT1.<key id>.<base64url "eventId|ticketId|expires">.<base64url Ed25519 signature>
+PAYLOAD_PREFIX = 'BT1'
+SEPARATOR = '|'
+
+
+class TicketSignatureError(Exception):
+    """Raised when a ticket payload is malformed, forged, signed by an unknown key or expired"""
+
+    def __init__(self, message, code='invalid'):
+        super().__init__(message)
+        self.code = code
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _raw_public_bytes(public_key):
+    return public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+
+def key_id(public_key):
+    """Short fingerprint naming a key in payloads, so scanners know which one to check against"""
+    return hashlib.sha256(_raw_public_bytes(public_key)).hexdigest()[:8]
+
+
+@functools.lru_cache(maxsize=None)
+def _keys(seed, verify_keys):
+    private_key = Ed25519PrivateKey.from_private_bytes(_b64decode(seed))
+    public_keys = {key_id(private_key.public_key()): private_key.public_key()}
+    for encoded in filter(None, (key.strip() for key in verify_keys.split(','))):
+        public_key = Ed25519PublicKey.from_public_bytes(_b64decode(encoded))
+        public_keys.setdefault(key_id(public_key), public_key)
+    return private_key, public_keys
+
+
+def signing_enabled():
+    """Ticket codes are only issued and checked with a dedicated TICKET_SIGNING_KEY"""
+    return bool(settings.TICKET_SIGNING_KEY)
+
+
+def signing_keys():
+    """(private key, {key id: public key}) from TICKET_SIGNING_KEY and TICKET_VERIFY_KEYS"""
+    if not signing_enabled():
+        raise ImproperlyConfigured('TICKET_SIGNING_KEY must be set to issue or check ticket codes')
+    return _keys(settings.TICKET_SIGNING_KEY, settings.TICKET_VERIFY_KEYS)
+
+
+def public_keys():
+    """Public keys for scanner clients to verify payloads offline"""
+    return [
+        {'kid': kid, 'alg': 'Ed25519', 'key': _b64encode(_raw_public_bytes(public_key))}
+        for kid, public_key in signing_keys()[1].items()
+    ]
+
+
+def ticket_expiry(event_date, purchased_at=None):
+    """Unix time a ticket's payload stops scanning.
+
+    TICKET_PAYLOAD_VALID_HOURS after the event starts, or for an undated
+    event TICKET_UNDATED_PAYLOAD_VALID_DAYS after purchase, so a ticket's
+    code is the same every time it is rendered.
+    """
+    if event_date is not None:
+        expires = event_date + timedelta(hours=settings.TICKET_PAYLOAD_VALID_HOURS)
+    elif purchased_at is not None:
+        expires = purchased_at + timedelta(days=settings.TICKET_UNDATED_PAYLOAD_VALID_DAYS)
+    else:
+        raise ValueError('A ticket needs an event date or a purchase time to expire')
+    # Naive datetimes are UTC
+    return calendar.timegm(expires.utctimetuple())
+
+
+def sign_ticket(event_id, ticket_id, expires):
+    """Compact signed payload for a ticket; expires is a Unix timestamp"""
+    if SEPARATOR in event_id or SEPARATOR in ticket_id:
+        raise ValueError(f'IDs cannot contain {SEPARATOR!r}')
+    private_key, _ = signing_keys()
+    body = f'{event_id}{SEPARATOR}{ticket_id}{SEPARATOR}{int(expires)}'.encode()
+    return '.'.join((
+        PAYLOAD_PREFIX,
+        key_id(private_key.public_key()),
+        _b64encode(body),
+        _b64encode(private_key.sign(body)),
+    ))
+
+
+def verify_ticket(payload, now=None):
+    """Check a payload with local crypto only; returns (event_id, ticket_id, expires) or raises TicketSignatureError"""
+    parts = payload.strip().split('.') if isinstance(payload, str) else []
+    if len(parts) != 4 or parts[0] != PAYLOAD_PREFIX:
+        raise TicketSignatureError('Not a ticket code', 'malformed')
+    _, kid, body, signature = parts
+
+    public_key = signing_keys()[1].get(kid)
+    if public_key is None:
+        raise TicketSignatureError('Ticket signed with an unknown key', 'unknown_key')
+
+    try:
+        body = _b64decode(body)
+        public_key.verify(_b64decode(signature), body)
+    except (ValueError, InvalidSignature):
+        raise TicketSignatureError('Ticket signature is not valid', 'forged')
+
+    try:
+        event_id, ticket_id, expires = body.decode().split(SEPARATOR)
+        expires = int(expires)
+    except ValueError:
+        raise TicketSignatureError('Not a ticket code', 'malformed')
+
+    if expires < (now or time.time()):
+        raise TicketSignatureError('Ticket has expired', 'expired')
+    return event_id, ticket_id, expires
+
+
+def ticket_qr_png(payload):
+    """PNG QR code of a payload, cached since payloads for a ticket never change"""
+    cache_key = f"ticket_qr:{hashlib.sha256(payload.encode()).hexdigest()}"
+    png = cache.get(cache_key)
+    if png is not None:
+        return png
+
+    image = qrcode.make(payload, error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=8, border=2)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    png = buffer.getvalue()
+    cache.set(cache_key, png, settings.TICKET_QR_CACHE_TIMEOUT)
+    return png
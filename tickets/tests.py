@@ -1,3 +1,415 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from burnermanagement.testing import MemoryBackendTestCase
+from burnermanagement.throttling import TokenBucketThrottle
+from events.rollups import sales_series
+from users.models import User
+from .models import Reservation, ReservationError, Ticket, _sold_out_key, HELD, CONFIRMED, USED
+from .payments import BasePaymentProvider, payment_doc_id, webhook_signature
+from .signing import TicketSignatureError, sign_ticket, ticket_expiry, verify_ticket
+from .waiting_room import WaitingRoom
 
-# Create your tests here.
+
+class FakeProvider(BasePaymentProvider):
+    """Provider whose settled payments are a dict of reference -> amount"""
+
+    def __init__(self, payments):
+        self.payments = payments
+
+    def settled_amount(self, reference):
+        return self.payments.get(reference)
+
+
+class ReservationTestCase(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_venue()
+        self.event_id = self.create_event(maxTickets=10, price=10.0)
+
+    def use_provider(self, payments):
+        patcher = mock.patch('tickets.payments._provider', FakeProvider(payments))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tickets(self, event_id=None):
+        return list(self.db.collection('events').document(event_id or self.event_id).collection('tickets').stream())
+
+    def inventory(self, event_id=None):
+        """capacity, held and sold summed over the event's inventory shards"""
+        totals = {'capacity': 0, 'held': 0, 'sold': 0}
+        for doc in self.db.collection('events').document(event_id or self.event_id).collection('inventory').stream():
+            for field in totals:
+                totals[field] += doc.to_dict()[field]
+        return totals
+
+
+class ReservationTests(ReservationTestCase):
+    def test_place_holds_tickets_from_inventory(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=2)
+
+        self.assertEqual(hold.status, HELD)
+        self.assertEqual(hold.total, 20.0)
+        self.assertEqual(self.inventory()['held'], 2)
+
+    def test_sold_out_is_cached_only_when_nothing_is_left(self):
+        Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=6)
+
+        with self.assertRaises(ReservationError) as raised:
+            Reservation.place(self.event_id, 'user-2', 'two@example.com', quantity=6)
+        self.assertEqual(raised.exception.code, 'not_enough')
+        self.assertIsNone(cache.get(_sold_out_key(self.event_id)))
+
+        Reservation.place(self.event_id, 'user-2', 'two@example.com', quantity=4)
+        with self.assertRaises(ReservationError) as raised:
+            Reservation.place(self.event_id, 'user-3', 'three@example.com', quantity=1)
+        self.assertEqual(raised.exception.code, 'sold_out')
+        self.assertTrue(cache.get(_sold_out_key(self.event_id)))
+
+    def test_releasing_a_hold_returns_its_tickets(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=3)
+
+        self.assertTrue(Reservation.release(self.event_id, hold.id, 'user-1'))
+        self.assertEqual(self.inventory()['held'], 0)
+
+    def test_confirming_a_free_hold_needs_no_payment(self):
+        event_id = self.create_event('free-event', price=0)
+        hold = Reservation.place(event_id, 'user-1', 'one@example.com', quantity=2)
+
+        reservation = Reservation.confirm(event_id, hold.id, 'user-1')
+
+        self.assertEqual(reservation.status, CONFIRMED)
+        self.assertEqual(len(reservation.ticket_ids), 2)
+        self.assertEqual(len(self.tickets(event_id)), 2)
+        self.assertEqual(self.inventory(event_id), {'capacity': 100, 'held': 0, 'sold': 2})
+
+    def test_confirm_is_refused_without_a_payment_provider(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=1)
+
+        with self.assertRaises(ReservationError) as raised:
+            Reservation.confirm(self.event_id, hold.id, 'user-1', payment_reference='anything')
+        self.assertEqual(raised.exception.code, 'payment_unavailable')
+        self.assertEqual(self.tickets(), [])
+
+    def test_confirm_issues_tickets_for_a_verified_payment(self):
+        self.use_provider({'pay-1': 20.0})
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=2)
+
+        reservation = Reservation.confirm(self.event_id, hold.id, 'user-1', payment_reference='pay-1')
+
+        self.assertEqual(reservation.status, CONFIRMED)
+        self.assertEqual(reservation.payment_reference, 'pay-1')
+        self.assertEqual(len(self.tickets()), 2)
+
+    def test_confirm_is_refused_for_unknown_or_short_payments(self):
+        self.use_provider({'pay-1': 20.0})
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=3)
+
+        for reference in ('', 'made-up', 'pay-1'):
+            with self.assertRaises(ReservationError) as raised:
+                Reservation.confirm(self.event_id, hold.id, 'user-1', payment_reference=reference)
+            self.assertEqual(raised.exception.code, 'payment_required')
+        self.assertEqual(self.tickets(), [])
+
+    def test_a_payment_confirms_only_one_hold(self):
+        self.use_provider({'pay-1': 10.0})
+        first = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=1)
+        second = Reservation.place(self.event_id, 'user-2', 'two@example.com', quantity=1)
+        Reservation.confirm(self.event_id, first.id, 'user-1', payment_reference='pay-1')
+
+        with self.assertRaises(ReservationError) as raised:
+            Reservation.confirm(self.event_id, second.id, 'user-2', payment_reference='pay-1')
+        self.assertEqual(raised.exception.code, 'payment_used')
+        self.assertEqual(len(self.tickets()), 1)
+
+    def test_only_the_holder_can_confirm(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=1)
+
+        with self.assertRaises(ReservationError) as raised:
+            Reservation.confirm(self.event_id, hold.id, 'user-2')
+        self.assertEqual(raised.exception.code, 'forbidden')
+
+    def test_confirming_twice_issues_and_counts_tickets_once(self):
+        event_id = self.create_event('free-event', price=0, venueId='venue-1')
+        hold = Reservation.place(event_id, 'user-1', 'one@example.com', quantity=2)
+
+        Reservation.confirm(event_id, hold.id, 'user-1')
+        Reservation.confirm(event_id, hold.id, 'user-1')
+
+        self.assertEqual(len(self.tickets(event_id)), 2)
+        self.assertEqual(sales_series('events', event_id, 'day')['totalTickets'], 2)
+        self.assertEqual(sales_series('venues', 'venue-1', 'hour')['totalTickets'], 2)
+
+    def test_paid_holds_confirmed_by_the_provider_belong_to_the_holder(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=2)
+
+        reservation = Reservation.confirm_paid(self.event_id, hold.id, 'pay-1', 20.0)
+
+        self.assertEqual(reservation.user_id, 'user-1')
+        self.assertEqual({(doc.to_dict()['userId'], doc.to_dict()['userEmail']) for doc in self.tickets()},
+                         {('user-1', 'one@example.com')})
+        self.assertEqual(sorted(ticket.id for ticket in Ticket.get_for_user('user-1')), sorted(reservation.ticket_ids))
+
+    def test_an_expired_hold_gives_its_tickets_back(self):
+        event_id = self.create_event('free-event', price=0)
+        hold = Reservation.place(event_id, 'user-1', 'one@example.com', quantity=2)
+        self.db.collection('events').document(event_id).collection('holds').document(hold.id).update({
+            'expiresAt': timezone.now() - timedelta(seconds=1),
+        })
+
+        with self.assertRaises(ReservationError) as raised:
+            Reservation.confirm(event_id, hold.id, 'user-1')
+        self.assertEqual(raised.exception.code, 'expired')
+        self.assertEqual(self.inventory(event_id)['held'], 0)
+        self.assertEqual(self.tickets(event_id), [])
+
+
+@override_settings(PAYMENT_WEBHOOK_SECRET='webhook-secret')
+class PaymentWebhookTests(ReservationTestCase):
+    url = '/api/tickets/payments/webhook/'
+
+    def post(self, payload, signature=None):
+        body = json.dumps(payload).encode()
+        if signature is None:
+            signature = webhook_signature(body)
+        return APIClient().post(self.url, body, content_type='application/json', HTTP_X_PAYMENT_SIGNATURE=signature)
+
+    def test_signed_webhook_confirms_the_hold(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=2)
+
+        response = self.post({'event_id': self.event_id, 'hold_id': hold.id, 'reference': 'pay-1', 'amount': 20})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], CONFIRMED)
+        self.assertEqual(len(self.tickets()), 2)
+
+    def test_unsigned_or_short_payments_are_refused(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=2)
+        payload = {'event_id': self.event_id, 'hold_id': hold.id, 'reference': 'pay-1', 'amount': 20}
+
+        self.assertEqual(self.post(payload, signature='forged').status_code, 403)
+        self.assertEqual(self.post(dict(payload, amount=19.99)).status_code, 402)
+        with override_settings(PAYMENT_WEBHOOK_SECRET=''):
+            self.assertEqual(self.post(payload, signature='').status_code, 403)
+        self.assertEqual(self.tickets(), [])
+
+    def test_the_provider_is_not_throttled(self):
+        hold = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=1)
+
+        with mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', {'ip': '2/min'}):
+            statuses = [
+                self.post({'event_id': self.event_id, 'hold_id': hold.id, 'reference': 'pay-1', 'amount': 10}).status_code
+                for _ in range(3)
+            ]
+        self.assertEqual(statuses, [200, 200, 200])
+
+    def test_late_payments_are_kept_for_a_refund(self):
+        expired = Reservation.place(self.event_id, 'user-1', 'one@example.com', quantity=2)
+        self.db.collection('events').document(self.event_id).collection('holds').document(expired.id).update({
+            'expiresAt': timezone.now() - timedelta(seconds=1),
+        })
+        released = Reservation.place(self.event_id, 'user-2', 'two@example.com', quantity=1)
+        Reservation.release(self.event_id, released.id, 'user-2')
+
+        late = self.post({'event_id': self.event_id, 'hold_id': expired.id, 'reference': 'pay-1', 'amount': 20})
+        after_release = self.post({'event_id': self.event_id, 'hold_id': released.id, 'reference': 'pay-2', 'amount': 10})
+
+        self.assertEqual((late.status_code, after_release.status_code), (410, 410))
+        self.assertEqual(self.tickets(), [])
+        self.assertEqual(self.inventory()['held'], 0)
+        for hold, reference, hold_status in ((expired, 'pay-1', 'expired'), (released, 'pay-2', 'released')):
+            reservation = Reservation.get(self.event_id, hold.id)
+            self.assertEqual((reservation.status, reservation.payment_reference, reservation.refund_due),
+                             (hold_status, reference, True))
+            payment = self.db.collection('payments').document(payment_doc_id(reference)).get().to_dict()
+            self.assertEqual((payment['holdId'], payment['refundDue']), (hold.id, True))
+
+
+class WaitingRoomTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = 1_000_000.0
+        patcher = mock.patch('tickets.waiting_room.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.room = WaitingRoom('event-1')
+        self.room.open(rate=60)
+
+    def test_places_are_admitted_at_the_configured_rate(self):
+        tokens = [self.room.join(f'user-{i}')[0] for i in range(5)]
+        self.assertEqual([self.room.status(token)['position'] for token in tokens], [1, 2, 3, 4, 5])
+
+        self.now += 2.5
+        statuses = [self.room.status(token) for token in tokens]
+        self.assertEqual([status['position'] for status in statuses], [0, 0, 1, 2, 3])
+        self.assertIn('admission_pass', statuses[0])
+        self.assertNotIn('admission_pass', statuses[2])
+
+    def test_an_idle_room_does_not_bank_admissions(self):
+        self.now += 600
+        self.assertEqual(self.room.admitted_count(), 0)
+
+        tokens = [self.room.join(f'user-{i}')[0] for i in range(3)]
+        self.assertEqual([self.room.status(token)['position'] for token in tokens], [1, 2, 3])
+
+    def test_joining_again_keeps_the_same_place(self):
+        self.room.join('user-1')
+        _, number = self.room.join('user-2')
+
+        self.assertEqual(self.room.join('user-2')[1], number)
+        self.assertEqual(self.room.queue_length(), 2)
+
+    def test_reopening_starts_a_fresh_line(self):
+        old_token, _ = self.room.join('user-1')
+        self.room.join('user-2')
+        self.room.close()
+        self.assertEqual(self.room.status(old_token)['position'], 0)
+
+        self.room.open(rate=60)
+        self.assertIsNone(self.room.status(old_token))
+        self.assertEqual(self.room.join('user-2')[1], 1)
+
+    def test_admission_passes_are_checked_while_the_room_is_open(self):
+        admission_pass = self.room.issue_pass('user-1')
+
+        self.assertTrue(self.room.check_pass(admission_pass, 'user-1'))
+        self.assertFalse(self.room.check_pass(admission_pass, 'user-2'))
+        self.assertFalse(self.room.check_pass('', 'user-1'))
+        self.room.close()
+        self.assertTrue(self.room.check_pass('', 'user-1'))
+
+
+def new_key():
+    """(base64url private key, base64url public key) for TICKET_SIGNING_KEY / TICKET_VERIFY_KEYS"""
+    private_key = Ed25519PrivateKey.generate()
+    private = private_key.private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+    )
+    public = private_key.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return base64.urlsafe_b64encode(private).decode(), base64.urlsafe_b64encode(public).decode()
+
+
+SIGNING_KEY, _ = new_key()
+RETIRED_KEY, RETIRED_PUBLIC_KEY = new_key()
+
+
+@override_settings(TICKET_SIGNING_KEY=SIGNING_KEY, TICKET_VERIFY_KEYS='')
+class TicketSigningTests(MemoryBackendTestCase):
+    def test_payloads_verify_locally(self):
+        expires = ticket_expiry(datetime(2030, 1, 1, 20))
+        payload = sign_ticket('event-1', 'ticket-1', expires)
+
+        self.assertEqual(verify_ticket(payload), ('event-1', 'ticket-1', expires))
+
+    def test_tampered_and_malformed_payloads_are_rejected(self):
+        payload = sign_ticket('event-1', 'ticket-1', ticket_expiry(datetime(2030, 1, 1)))
+        prefix, kid, body, signature = payload.split('.')
+        other_body = sign_ticket('event-1', 'ticket-2', ticket_expiry(datetime(2030, 1, 1))).split('.')[2]
+
+        cases = {
+            'forged': '.'.join((prefix, kid, other_body, signature)),
+            'malformed': 'not a ticket',
+        }
+        for code, bad in cases.items():
+            with self.assertRaises(TicketSignatureError) as raised:
+                verify_ticket(bad)
+            self.assertEqual(raised.exception.code, code)
+
+    def test_expired_payloads_are_rejected(self):
+        expires = ticket_expiry(datetime(2030, 1, 1))
+        payload = sign_ticket('event-1', 'ticket-1', expires)
+
+        with self.assertRaises(TicketSignatureError) as raised:
+            verify_ticket(payload, now=expires + 1)
+        self.assertEqual(raised.exception.code, 'expired')
+
+    def test_only_configured_keys_are_trusted(self):
+        with override_settings(TICKET_SIGNING_KEY=RETIRED_KEY):
+            payload = sign_ticket('event-1', 'ticket-1', ticket_expiry(datetime(2030, 1, 1)))
+
+        with self.assertRaises(TicketSignatureError) as raised:
+            verify_ticket(payload)
+        self.assertEqual(raised.exception.code, 'unknown_key')
+
+        with override_settings(TICKET_VERIFY_KEYS=RETIRED_PUBLIC_KEY):
+            self.assertEqual(verify_ticket(payload)[:2], ('event-1', 'ticket-1'))
+
+    def test_undated_tickets_expire_a_fixed_time_after_purchase(self):
+        ticket = Ticket.from_dict('ticket-1', {'eventId': 'missing-event', 'purchasedAt': datetime(2030, 1, 1)})
+
+        self.assertEqual(ticket.payload, ticket.payload)
+        self.assertEqual(verify_ticket(ticket.payload)[2], ticket_expiry(None, datetime(2030, 1, 1)))
+
+    @override_settings(TICKET_SIGNING_KEY='')
+    def test_nothing_is_signed_or_verified_without_a_signing_key(self):
+        ticket = Ticket.from_dict('ticket-1', {'eventId': 'event-1', 'purchasedAt': datetime(2030, 1, 1)})
+
+        self.assertIsNone(ticket.payload)
+        with self.assertRaises(ImproperlyConfigured):
+            sign_ticket('event-1', 'ticket-1', 0)
+        self.assertEqual(APIClient().get('/api/tickets/signing-keys/').status_code, 503)
+
+
+@override_settings(TICKET_SIGNING_KEY=SIGNING_KEY, TICKET_VERIFY_KEYS='')
+class ValidateTicketTests(MemoryBackendTestCase):
+    url = '/api/tickets/validate/'
+
+    def setUp(self):
+        super().setUp()
+        self.create_venue()
+        self.create_event()
+        self.db.collection('events').document('event-1').collection('tickets').document('ticket-1').set({
+            'eventId': 'event-1',
+            'userId': 'buyer',
+            'userEmail': 'buyer@example.com',
+            'status': 'valid',
+            'purchasedAt': timezone.now(),
+        })
+        self.payload = Ticket.get('event-1', 'ticket-1').payload
+
+    def scan(self, payload, venue_id='venue-1', username='scanner'):
+        scanner = User.objects.create(
+            username=username, email=f'{username}@example.com', role='scanner', venue_id=venue_id,
+        )
+        client = APIClient()
+        client.force_authenticate(scanner)
+        return client.post(self.url, {'payload': payload}, format='json')
+
+    def test_a_ticket_is_admitted_once(self):
+        response = self.scan(self.payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['valid'])
+        self.assertEqual(Ticket.get('event-1', 'ticket-1').status, USED)
+
+    def test_a_second_scan_is_refused(self):
+        self.scan(self.payload)
+
+        response = self.scan(self.payload, venue_id='venue-1', username='second-scanner')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['code'], 'already_used')
+
+    def test_scanners_only_admit_to_their_own_venue(self):
+        response = self.scan(self.payload, venue_id='venue-2')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Ticket.get('event-1', 'ticket-1').status, 'valid')
+
+    def test_forged_codes_never_reach_the_database(self):
+        prefix, kid, body, signature = self.payload.split('.')
+        forged = '.'.join((prefix, kid, body, signature[::-1]))
+
+        response = self.scan(forged)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['code'], 'forged')
+
+    @override_settings(TICKET_SIGNING_KEY='')
+    def test_scanning_is_unavailable_without_a_signing_key(self):
+        self.assertEqual(self.scan(self.payload).status_code, 503)
@@ -7,4 +7,14 @@ router = DefaultRouter()
 urlpatterns = [
     path('', include(router.urls)),
     path('validate/', views.ValidateTicketView.as_view(), name='validate-ticket'),
-]
\ No newline at end of file
+    path('mine/', views.MyTicketsView.as_view(), name='my-tickets'),
+    path('signing-keys/', views.SigningKeysView.as_view(), name='ticket-signing-keys'),
+    path('<str:event_id>/<str:ticket_id>/qr.png', views.TicketQRCodeView.as_view(), name='ticket-qr'),
+    path('reservations/', views.ReservationView.as_view(), name='reservation-create'),
+    path('reservations/<str:event_id>/<str:hold_id>/', views.ReservationDetailView.as_view(), name='reservation-detail'),
+    path('reservations/<str:event_id>/<str:hold_id>/confirm/', views.ConfirmReservationView.as_view(), name='reservation-confirm'),
+    path('payments/webhook/', views.PaymentWebhookView.as_view(), name='payment-webhook'),
+    path('waiting-room/<str:event_id>/', views.WaitingRoomView.as_view(), name='waiting-room'),
+    path('waiting-room/<str:event_id>/join/', views.JoinWaitingRoomView.as_view(), name='waiting-room-join'),
+    path('waiting-room/<str:event_id>/status/', views.WaitingRoomStatusView.as_view(), name='waiting-room-status'),
+]
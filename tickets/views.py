@@ -1,18 +1,322 @@
+from django.conf import settings
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from events.models import Event
+from .models import Reservation, ReservationError, Ticket, TicketError
+from .serializers import (
+    ReservationRequestSerializer, ConfirmReservationSerializer, ReservationSerializer,
+    PaymentWebhookSerializer,
+    WaitingRoomSerializer, TicketSerializer, ValidateTicketSerializer
+)
+from .payments import check_webhook_signature
+from .signing import TicketSignatureError, public_keys, signing_enabled, ticket_qr_png, verify_ticket
+from .waiting_room import WaitingRoom
+
+# HTTP status for each ReservationError code
+RESERVATION_ERROR_STATUS = {
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'forbidden': status.HTTP_403_FORBIDDEN,
+    'sold_out': status.HTTP_409_CONFLICT,
+    'not_enough': status.HTTP_409_CONFLICT,
+    'expired': status.HTTP_410_GONE,
+    'released': status.HTTP_410_GONE,
+    'payment_required': status.HTTP_402_PAYMENT_REQUIRED,
+    'payment_used': status.HTTP_409_CONFLICT,
+    'payment_unavailable': status.HTTP_503_SERVICE_UNAVAILABLE,
+    'unavailable': status.HTTP_503_SERVICE_UNAVAILABLE,
+}
+
+def reservation_error_response(error):
+    return Response(
+        {'error': str(error), 'code': error.code},
+        status=RESERVATION_ERROR_STATUS.get(error.code, status.HTTP_400_BAD_REQUEST)
+    )
+
+# HTTP status for each TicketSignatureError / TicketError code at the door
+SCAN_ERROR_STATUS = {
+    'malformed': status.HTTP_400_BAD_REQUEST,
+    'forged': status.HTTP_400_BAD_REQUEST,
+    'unknown_key': status.HTTP_400_BAD_REQUEST,
+    'expired': status.HTTP_410_GONE,
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'wrong_venue': status.HTTP_403_FORBIDDEN,
+    'event_cancelled': status.HTTP_409_CONFLICT,
+    'already_used': status.HTTP_409_CONFLICT,
+    'not_valid': status.HTTP_409_CONFLICT,
+    'unavailable': status.HTTP_503_SERVICE_UNAVAILABLE,
+}
+
+def scan_error_response(error):
+    return Response(
+        {'valid': False, 'error': str(error), 'code': error.code},
+        status=SCAN_ERROR_STATUS.get(error.code, status.HTTP_400_BAD_REQUEST)
+    )
 
 class ValidateTicketView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        """Validate ticket (scanner permission required)"""
+        """Admit a scanned ticket (scanner permission required)"""
         if not request.user.can_scan_tickets():
             return Response(
                 {'error': 'Permission denied'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Add ticket validation logic here
-        return Response({'message': 'Ticket validation endpoint ready'})
\ No newline at end of file
+        serializer = ValidateTicketSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        if not signing_enabled():
+            return scan_error_response(TicketSignatureError('Ticket scanning is not configured', 'unavailable'))
+        
+        # Forged, foreign and expired codes are turned away without touching Firestore
+        try:
+            event_id, ticket_id, _ = verify_ticket(serializer.validated_data['payload'])
+        except TicketSignatureError as e:
+            return scan_error_response(e)
+        
+        try:
+            event = Event.get_by_id(event_id)
+            if event is None:
+                raise TicketError('Event not found', 'not_found')
+            if not (request.user.is_site_admin() or request.user.venue_id == event.venue_id):
+                raise TicketError('Ticket is for another venue', 'wrong_venue')
+            if event.is_cancelled:
+                raise TicketError('Event has been cancelled', 'event_cancelled')
+            
+            # Only the double-entry check needs the database
+            ticket = Ticket.admit(event_id, ticket_id, scanned_by=str(request.user.id))
+        except TicketError as e:
+            return scan_error_response(e)
+        
+        return Response({
+            'valid': True,
+            'event_id': event_id,
+            'event_name': event.name,
+            'ticket_id': ticket.id,
+            'user_email': ticket.user_email,
+            'used_at': ticket.used_at,
+        })
+
+class SigningKeysView(APIView):
+    """Public keys scanner apps use to check ticket codes offline"""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        if not signing_enabled():
+            return Response(
+                {'error': 'Ticket signing is not configured'}, 
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        response = Response({'keys': public_keys()})
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
+
+class TicketQRCodeView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, event_id, ticket_id):
+        """PNG QR code of one of the current user's tickets"""
+        ticket = Ticket.get(event_id, ticket_id)
+        if not ticket or ticket.user_id != str(request.user.id):
+            return Response(
+                {'error': 'Ticket not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        payload = ticket.payload
+        if payload is None:
+            return Response(
+                {'error': 'Ticket signing is not configured'}, 
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        response = HttpResponse(ticket_qr_png(payload), content_type='image/png')
+        response['Cache-Control'] = f'private, max-age={settings.TICKET_QR_CACHE_TIMEOUT}'
+        return response
+
+class MyTicketsView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Current user's tickets with their events"""
+        tickets = Ticket.get_for_user(str(request.user.id))
+        return Response(TicketSerializer(tickets, many=True).data)
+
+class ReservationView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        """Place a time-boxed hold on tickets for an event"""
+        serializer = ReservationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        event_id = serializer.validated_data['event_id']
+        
+        # During a queued on-sale only admitted users may buy
+        room = WaitingRoom(event_id)
+        admission_pass = (serializer.validated_data['admission_pass'] or
+                          request.META.get('HTTP_X_ADMISSION_PASS', ''))
+        if not room.check_pass(admission_pass, request.user.id):
+            return Response(
+                {'error': 'Join the waiting room for this event first', 'code': 'queue_required'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            reservation = Reservation.place(
+                event_id,
+                user_id=str(request.user.id),
+                user_email=request.user.email,
+                quantity=serializer.validated_data['quantity'],
+            )
+        except ReservationError as e:
+            return reservation_error_response(e)
+        
+        return Response(ReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+
+class ReservationDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, event_id, hold_id):
+        """Get one of the current user's holds"""
+        reservation = Reservation.get(event_id, hold_id)
+        if not reservation or reservation.user_id != str(request.user.id):
+            return Response(
+                {'error': 'Reservation not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(ReservationSerializer(reservation).data)
+    
+    def delete(self, request, event_id, hold_id):
+        """Release a hold before it expires"""
+        try:
+            Reservation.release(event_id, hold_id, user_id=str(request.user.id))
+        except ReservationError as e:
+            return reservation_error_response(e)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class ConfirmReservationView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, event_id, hold_id):
+        """Turn a paid hold into tickets; the payment is checked with the provider first"""
+        serializer = ConfirmReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            reservation = Reservation.confirm(
+                event_id, hold_id,
+                user_id=str(request.user.id),
+                payment_reference=serializer.validated_data['payment_reference'],
+            )
+        except ReservationError as e:
+            return reservation_error_response(e)
+        
+        return Response(ReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+
+class PaymentWebhookView(APIView):
+    """Payment provider's server-to-server notice that a hold has been paid for"""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []  # Signed by the provider, which calls from a handful of IPs
+    
+    def post(self, request):
+        if not check_webhook_signature(request.body, request.META.get('HTTP_X_PAYMENT_SIGNATURE', '')):
+            return Response(
+                {'error': 'Invalid signature'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = PaymentWebhookSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            reservation = Reservation.confirm_paid(
+                data['event_id'], data['hold_id'],
+                payment_reference=data['reference'],
+                amount=data['amount'],
+            )
+        except ReservationError as e:
+            print(f"Payment {data['reference']} for hold {data['hold_id']} not applied: {e}")
+            return reservation_error_response(e)
+        
+        return Response(ReservationSerializer(reservation).data)
+
+class WaitingRoomView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get_event(self, request, event_id):
+        event = Event.get_by_id(event_id)
+        if event and request.user.can_manage_venue(event.venue_id):
+            return event
+        return None
+    
+    def put(self, request, event_id):
+        """Open the waiting room for an event, or change its admission rate"""
+        if not self.get_event(request, event_id):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = WaitingRoomSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        room = WaitingRoom(event_id)
+        config = room.open(rate=serializer.validated_data.get('rate'))
+        return Response({
+            'event_id': event_id,
+            'rate': config['rate'],
+            'admitted': room.admitted_count(config),
+            'queue_length': room.queue_length(),
+        })
+    
+    def delete(self, request, event_id):
+        """Close the waiting room and let everyone through"""
+        if not self.get_event(request, event_id):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        WaitingRoom(event_id).close()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class JoinWaitingRoomView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, event_id):
+        """Take a place in line for an event's on-sale"""
+        room = WaitingRoom(event_id)
+        if not room.is_active:
+            return Response({
+                'event_id': event_id,
+                'admitted': True,
+                'admission_pass': room.issue_pass(request.user.id),
+            })
+        
+        token, number = room.join(request.user.id)
+        response = room.status(token)
+        response['token'] = token
+        return Response(response, status=status.HTTP_201_CREATED)
+
+class WaitingRoomStatusView(APIView):
+    # Polled constantly during an on-sale: the signed token identifies the
+    # user, so skip session lookups and answer from the cache alone
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request, event_id):
+        """Current position for a queue token"""
+        token = request.query_params.get('token', '')
+        response = WaitingRoom(event_id).status(token)
+        if response is None:
+            return Response(
+                {'error': 'Invalid or expired queue token'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(response)
@@ -0,0 +1,159 @@
+# tickets/waiting_room.py
+import math
+import time
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+QUEUE_TOKEN_SALT = 'tickets.waiting_room.queue'
+ADMISSION_PASS_SALT = 'tickets.waiting_room.pass'
+
+
+class WaitingRoom:
+    """Admission-control queue for a high-demand on-sale.
+
+    Joining hands out a signed token carrying the user's place in line (an
+    atomic cache counter). Nobody needs to run a dispatcher: every status
+    check advances the stored admitted count by the admissions due at the
+    configured rate, up to the last place handed out, so a token's position
+    is arithmetic on a few cache reads and never touches Firestore. Admitted
+    users swap their token for a short-lived signed pass that the purchase
+    path checks.
+
+    Each opening of the room is a new generation; places and tokens from an
+    earlier opening don't carry over.
+
+    All state lives in the Django cache, so production needs a shared cache
+    backend for every worker to see the same queue.
+    """
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+
+    def _key(self, suffix):
+        return f"waiting_room:{self.event_id}:{suffix}"
+
+    def get_config(self):
+        return cache.get(self._key('config'))
+
+    @property
+    def is_active(self):
+        return self.get_config() is not None
+
+    def open(self, rate=None):
+        """Open (or re-rate) the room; rate is admissions per minute"""
+        rate = rate or settings.WAITING_ROOM_DEFAULT_RATE
+        config = self.get_config()
+
+        if config:
+            # Changing the rate mid-sale keeps everyone already admitted admitted
+            self.admitted_count(config)
+            generation = config['generation']
+        else:
+            cache.add(self._key('generation'), 0, None)
+            generation = cache.incr(self._key('generation'))
+            cache.set(self._key('seq'), 0, None)
+            cache.set(self._key('admitted'), {'count': 0, 'time': time.time()}, None)
+
+        cache.set(self._key('config'), {'rate': rate, 'generation': generation}, None)
+        return self.get_config()
+
+    def close(self):
+        # Places are keyed by generation, so leftover user keys are never read again
+        cache.delete_many([self._key('config'), self._key('seq'), self._key('admitted')])
+
+    def admitted_count(self, config=None):
+        """How many places in line have been let through so far.
+
+        Advances the stored count by the admissions due since it was last
+        moved, clamped to the places handed out, so an empty queue doesn't
+        bank admissions that would wave a later rush straight through.
+        """
+        config = config or self.get_config()
+        if not config:
+            return 0
+
+        now = time.time()
+        state = cache.get(self._key('admitted')) or {'count': 0, 'time': now}
+        due = int(max(now - state['time'], 0) * config['rate'] / 60)
+        if not due:
+            return state['count']
+
+        queued = self.queue_length()
+        if state['count'] + due >= queued:
+            state = {'count': max(queued, state['count']), 'time': now}
+        else:
+            # Keep the part of a tick not used yet
+            state = {'count': state['count'] + due, 'time': state['time'] + due * 60 / config['rate']}
+        cache.set(self._key('admitted'), state, None)
+        return state['count']
+
+    def queue_length(self):
+        return cache.get(self._key('seq'), 0)
+
+    def join(self, user_id):
+        """Give a user a place in line (the same place if they join again) and their signed token"""
+        generation = (self.get_config() or {}).get('generation', 0)
+        user_key = self._key(f'user:{generation}:{user_id}')
+        number = cache.get(user_key)
+
+        if number is None:
+            cache.add(self._key('seq'), 0, None)
+            number = cache.incr(self._key('seq'))
+            if not cache.add(user_key, number, settings.WAITING_ROOM_TOKEN_MAX_AGE):
+                # Lost a race with the same user's other request - keep their first place
+                number = cache.get(user_key, number)
+
+        token = signing.dumps(
+            {'e': self.event_id, 'g': generation, 'u': str(user_id), 'n': number}, salt=QUEUE_TOKEN_SALT
+        )
+        return token, number
+
+    def status(self, token):
+        """Position for a queue token; includes an admission pass once the user is through"""
+        try:
+            data = signing.loads(
+                token, salt=QUEUE_TOKEN_SALT, max_age=settings.WAITING_ROOM_TOKEN_MAX_AGE
+            )
+        except signing.BadSignature:
+            return None
+        if data.get('e') != self.event_id:
+            return None
+
+        config = self.get_config()
+        if config is None:
+            # Room closed - everyone is through
+            position = 0
+        elif data.get('g') != config['generation']:
+            # Token from an earlier opening of the room
+            return None
+        else:
+            position = max(data['n'] - self.admitted_count(config), 0)
+
+        status = {
+            'event_id': self.event_id,
+            'number': data['n'],
+            'position': position,
+            'admitted': position == 0,
+            'estimated_wait_seconds': math.ceil(position * 60 / config['rate']) if position else 0,
+        }
+        if status['admitted']:
+            status['admission_pass'] = self.issue_pass(data['u'])
+        return status
+
+    def issue_pass(self, user_id):
+        return signing.dumps({'e': self.event_id, 'u': str(user_id)}, salt=ADMISSION_PASS_SALT)
+
+    def check_pass(self, admission_pass, user_id):
+        """True if the room is closed or the pass admits this user to this event"""
+        if not self.is_active:
+            return True
+        if not admission_pass:
+            return False
+        try:
+            data = signing.loads(
+                admission_pass, salt=ADMISSION_PASS_SALT, max_age=settings.WAITING_ROOM_PASS_SECONDS
+            )
+        except signing.BadSignature:
+            return False
+        return data.get('e') == self.event_id and data.get('u') == str(user_id)
@@ -0,0 +1,33 @@
+# users/activity.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+
+def touch_last_seen(user):
+    """Record that user is active, writing to the database at most once per LAST_SEEN_INTERVAL"""
+    if not cache.add(f"last_seen:{user.pk}", 1, settings.LAST_SEEN_INTERVAL):
+        return False
+
+    now = timezone.now()
+    # A targeted UPDATE, not user.save(), so nothing else on the row is rewritten
+    get_user_model().objects.filter(pk=user.pk).update(last_login_at=now)
+    user.last_login_at = now
+    return True
+
+
+class LastSeenMiddleware:
+    """Keeps User.last_login_at current for authenticated requests without a write per request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        # DRF copies the user it authenticated back onto the Django request
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            touch_last_seen(user)
+        return response
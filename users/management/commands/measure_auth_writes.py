@@ -0,0 +1,73 @@
+# users/management/commands/measure_auth_writes.py
+import json
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, modify_settings, override_settings
+from users.models import User
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+LAST_SEEN_MIDDLEWARE = 'users.activity.LastSeenMiddleware'
+
+# (label, session engine, whether LastSeenMiddleware runs)
+CONFIGURATIONS = [
+    # Before: last_login_at was auto_now, only written when something saved the user
+    ('before: db sessions, no last-seen tracking', 'django.contrib.sessions.backends.db', False),
+    ('after: cached_db sessions, debounced last seen', 'django.contrib.sessions.backends.cached_db', True),
+]
+
+class Command(BaseCommand):
+    help = 'Count database reads and writes on the authenticated request path, before and after the cached sessions and last-seen tracking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Authenticated requests per configuration, within the per-user throttle (default: 200)')
+        parser.add_argument('--path', default='/api/auth/profile/', help='Endpoint to call (default: /api/auth/profile/)')
+
+    def handle(self, *args, **options):
+        # Everything runs in a throwaway test database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            results = [
+                self.measure(label, engine, last_seen, options)
+                for label, engine, last_seen in CONFIGURATIONS
+            ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(json.dumps(results, indent=2))
+        before, after = results[0], results[-1]
+        # Last-seen tracking adds writes that weren't there before; cached sessions save reads
+        self.stdout.write(self.style.SUCCESS(
+            f"Over {options['requests']} requests: "
+            f"writes {before['writes']} -> {after['writes']} ({after['writes'] - before['writes']:+d}), "
+            f"reads {before['reads']} -> {after['reads']} ({after['reads'] - before['reads']:+d})"
+        ))
+
+    def measure(self, label, engine, last_seen, options):
+        middleware = {} if last_seen else {'remove': [LAST_SEEN_MIDDLEWARE]}
+
+        overrides = override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=['testserver'])
+        with overrides, modify_settings(MIDDLEWARE=middleware):
+            cache.clear()
+            User.objects.filter(email='measure@example.com').delete()
+            user = User.objects.create(username='measure', email='measure@example.com')
+            client = Client()
+            client.force_login(user)
+
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(options['requests']):
+                    client.get(options['path'])
+
+        statements = [query['sql'].lstrip().split(' ', 1)[0].upper() for query in queries.captured_queries]
+        writes = sum(1 for statement in statements if statement in WRITE_STATEMENTS)
+        return {
+            'configuration': label,
+            'requests': options['requests'],
+            'queries': len(statements),
+            'writes': writes,
+            'reads': len(statements) - writes,
+            'writes_per_request': round(writes / options['requests'], 3),
+            'queries_per_request': round(len(statements) / options['requests'], 3),
+        }
@@ -3,6 +3,8 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from burnermanagement.firebase_config import get_firestore_client
 from venues.models import Venue
+from burnermanagement.singleflight import invalidate_reads
+from core.feeds import rebuild_home_feed
 from datetime import datetime, timedelta
 import random
 import uuid
@@ -48,6 +50,8 @@ class Command(BaseCommand):
         # Create events
         count = options['count']
         self.create_events(db, venues, count)
+        invalidate_reads('events')
+        rebuild_home_feed()
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {count} events!')
@@ -0,0 +1,30 @@
+# users/management/commands/sync_user_venues.py
+import time
+from django.core.management.base import BaseCommand
+from users.models import User
+
+class Command(BaseCommand):
+    help = "Refresh the venue name snapshot stored on users (picks up renamed or deleted venues)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--venue',
+            action='append',
+            dest='venues',
+            help='Only sync users of this venue ID (repeatable)'
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            help='Keep syncing every N seconds instead of running once'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            updated = User.sync_venue_snapshots(options['venues'])
+            self.stdout.write(f'Updated venue snapshots for {updated} users')
+            
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
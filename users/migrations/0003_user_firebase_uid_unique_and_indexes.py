@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+def blank_uids_to_null(apps, schema_editor):
+    # Several users with '' would break the unique constraint; NULLs don't
+    User = apps.get_model('users', 'User')
+    User.objects.filter(firebase_uid='').update(firebase_uid=None)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0002_user_firebase_uid'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_uids_to_null, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='firebase_uid',
+            field=models.CharField(max_length=128, null=True, blank=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'id'], name='users_role_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['venue_id', 'role', 'id'], name='users_venue_role_id_idx'),
+        ),
+    ]
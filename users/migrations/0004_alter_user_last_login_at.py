@@ -0,0 +1,17 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0003_user_firebase_uid_unique_and_indexes'),
+    ]
+
+    operations = [
+        # No longer auto_now: users.activity.touch_last_seen updates it, debounced
+        migrations.AlterField(
+            model_name='user',
+            name='last_login_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0004_alter_user_last_login_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='venue_name',
+            field=models.CharField(max_length=200, blank=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='venue_snapshot_id',
+            field=models.CharField(max_length=100, blank=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='venue_synced_at',
+            field=models.DateTimeField(null=True, blank=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
+from burnermanagement.documents import DocumentFetchError
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -14,14 +16,25 @@ class User(AbstractUser):
     display_name = models.CharField(max_length=100, blank=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='user')
     venue_id = models.CharField(max_length=100, blank=True)  # Store Firestore venue ID instead
+    # Snapshot of the venue's name, so profile reads don't need Firestore
+    venue_name = models.CharField(max_length=200, blank=True)
+    venue_snapshot_id = models.CharField(max_length=100, blank=True)  # venue_id the snapshot was taken for
+    venue_synced_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    last_login_at = models.DateTimeField(auto_now=True)
+    last_login_at = models.DateTimeField(default=timezone.now)  # Last seen; see users.activity
     provider = models.CharField(max_length=50, blank=True)
-    firebase_uid = models.CharField(max_length=128, null=True, blank=True)  # Added this field
+    firebase_uid = models.CharField(max_length=128, null=True, blank=True, unique=True)  # Looked up on every authenticated request
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # UserViewSet filters by role and/or venue and pages by id
+            models.Index(fields=['role', 'id'], name='users_role_id_idx'),
+            models.Index(fields=['venue_id', 'role', 'id'], name='users_venue_role_id_idx'),
+        ]
+    
     def __str__(self):
         return self.email
     
@@ -49,8 +62,72 @@ class User(AbstractUser):
                 self.is_venue_admin() or self.is_sub_admin())
     
     def get_venue(self):
-        """Get the venue object for this user if they have one"""
-        if self.venue_id:
+        """Get the venue object for this user if they have one (fetched once per instance)"""
+        if not self.venue_id:
+            return None
+        cached = getattr(self, '_venue', None)
+        if cached is None or cached.id != self.venue_id:
             from venues.models import Venue
-            return Venue.get_by_id(self.venue_id)
-        return None
\ No newline at end of file
+            self._venue = Venue.get_by_id(self.venue_id)
+        return self._venue
+    
+    def get_venue_name(self):
+        """Venue name from the snapshot on this row; Firestore is only read if the snapshot is for another venue"""
+        if not self.venue_id:
+            return None
+        if self.venue_snapshot_id != self.venue_id and not self.sync_venue():
+            # Couldn't read the new venue; the snapshot is for the old one
+            return None
+        return self.venue_name or None
+    
+    def sync_venue(self):
+        """Refresh this user's venue snapshot from Firestore; False (snapshot untouched) if the read failed"""
+        from venues.models import Venue
+        
+        try:
+            venues = Venue.get_many([self.venue_id], strict=True)
+        except DocumentFetchError as e:
+            print(f"Error syncing venue for user {self.pk}: {e}")
+            return False
+        
+        # A venue that was read and isn't there has been deleted
+        self._venue = venues[0] if venues else None
+        self.venue_name = self._venue.name if self._venue else ''
+        self.venue_snapshot_id = self.venue_id
+        self.venue_synced_at = timezone.now()
+        if self.pk:
+            User.objects.filter(pk=self.pk).update(
+                venue_name=self.venue_name,
+                venue_snapshot_id=self.venue_snapshot_id,
+                venue_synced_at=self.venue_synced_at,
+            )
+        return True
+    
+    @classmethod
+    def sync_venue_snapshots(cls, venue_ids=None):
+        """Refresh venue snapshots for every user of the given venues (all venues if None).
+
+        Venues are read with one batched get_many; returns the number of users
+        updated. Users of deleted venues get an empty name. If the read fails
+        nobody is updated, rather than blanking names that are still right.
+        """
+        from venues.models import Venue
+        
+        if venue_ids is None:
+            venue_ids = cls.objects.exclude(venue_id='').values_list('venue_id', flat=True).distinct()
+        venue_ids = list(venue_ids)
+        try:
+            names = {venue.id: venue.name for venue in Venue.get_many(venue_ids, strict=True)}
+        except DocumentFetchError as e:
+            print(f"Error syncing venue snapshots: {e}")
+            return 0
+        
+        now = timezone.now()
+        updated = 0
+        for venue_id in venue_ids:
+            updated += cls.objects.filter(venue_id=venue_id).update(
+                venue_name=names.get(venue_id, ''),
+                venue_snapshot_id=venue_id,
+                venue_synced_at=now,
+            )
+        return updated
\ No newline at end of file
@@ -25,8 +25,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'last_login_at', 'email')
     
     def get_venue_name(self, obj):
-        venue = obj.get_venue()
-        return venue.name if venue else None
+        return obj.get_venue_name()
     
     def get_permissions(self, obj):
         return {
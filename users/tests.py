@@ -1,3 +1,39 @@
-from django.test import TestCase
+from unittest import mock
+from burnermanagement.testing import MemoryBackendTestCase
+from venues.models import Venue
+from .models import User
 
-# Create your tests here.
+
+class VenueSnapshotTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_venue('venue-1', name='The Venue')
+        self.user = User.objects.create(username='admin', email='admin@example.com', role='venueAdmin', venue_id='venue-1')
+
+    def test_names_follow_venue_renames(self):
+        self.assertEqual(self.user.get_venue_name(), 'The Venue')
+        Venue.update('venue-1', {'name': 'The New Venue'})
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).venue_name, 'The New Venue')
+
+    def test_deleted_venues_clear_the_name(self):
+        self.user.sync_venue()
+        self.db.collection('venues').document('venue-1').delete()
+        Venue.invalidate('venue-1')
+
+        User.sync_venue_snapshots()
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).venue_name, '')
+
+    def test_failed_reads_keep_the_last_known_name(self):
+        self.user.sync_venue()
+        Venue.invalidate('venue-1')
+
+        with mock.patch.object(self.db, 'get_all', side_effect=RuntimeError('deadline exceeded')):
+            self.assertEqual(User.sync_venue_snapshots(), 0)
+            user = User.objects.get(pk=self.user.pk)
+            user.venue_id = 'venue-2'
+            self.assertIsNone(user.get_venue_name())
+
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.venue_name, user.venue_snapshot_id), ('The Venue', 'venue-1'))
@@ -1,22 +1,41 @@
 from rest_framework import viewsets, generics, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
 from .serializers import UserSerializer, UserProfileSerializer
 
 User = get_user_model()
 
+class UserCursorPagination(CursorPagination):
+    """Keyset pagination on id, so deep pages cost the same as the first"""
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UserCursorPagination
+    
+    # Query params filtered on in the database (role/venue_id are indexed with id)
+    filter_fields = ('role', 'venue_id', 'provider')
 
     def get_queryset(self):
         # Site admins can see all users, others only their own profile
-        if self.request.user.is_site_admin():
-            return User.objects.all()
-        return User.objects.filter(id=self.request.user.id)
+        if not self.request.user.is_site_admin():
+            return User.objects.filter(id=self.request.user.id)
+        
+        queryset = User.objects.all()
+        filters = {
+            field: self.request.query_params[field]
+            for field in self.filter_fields
+            if field in self.request.query_params
+        }
+        return queryset.filter(**filters)
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
@@ -0,0 +1,24 @@
+# venues/management/commands/rebuild_venue_admin_index.py
+import time
+from django.core.management.base import BaseCommand
+from venues.models import VenueAdminIndex
+
+class Command(BaseCommand):
+    help = 'Rebuild venueAdminIndex (admin email -> venues) from every venue\'s admin maps and names'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            help='Keep rebuilding every N seconds instead of running once'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = VenueAdminIndex.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} admin emails'))
+            
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
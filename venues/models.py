@@ -1,80 +1,66 @@
 # venues/models.py
+from google.cloud.firestore_v1 import DELETE_FIELD
+from google.cloud.firestore_v1.field_path import FieldPath
+from burnermanagement.documents import BatchWriter, FirestoreDocument, Field, decode_datetime
 from burnermanagement.firebase_config import get_firestore_client
-from datetime import datetime
+from burnermanagement.singleflight import cached_read
 import warnings
 
 # Suppress the Firestore filter warnings
 warnings.filterwarnings("ignore", message="Detected filter using positional arguments")
 
-class Venue:
+class Venue(FirestoreDocument):
     """Venue model that interfaces with Firestore"""
     
-    def __init__(self, id=None, **kwargs):
-        self.id = id
-        self.name = kwargs.get('name', '')
-        self.city = kwargs.get('city', '')
-        self.created_at = kwargs.get('createdAt')
-        self.admins = kwargs.get('admins', {})
-        self.sub_admins = kwargs.get('subAdmins', {})
-        
-        # Set defaults for fields that don't exist in your Firestore
-        self.description = ''
-        self.address = ''
-        self.capacity = 0
-        self.image_url = ''
-        self.is_active = True
-        self.updated_at = None
+    collection = 'venues'
+    fields = (
+        Field('name', default=''),
+        Field('city', default=''),
+        Field('createdAt', 'created_at', decode=decode_datetime),
+        Field('admins', default=dict),
+        Field('subAdmins', 'sub_admins', default=dict),
+    )
+    
+    # Set defaults for fields that don't exist in your Firestore
+    description = ''
+    address = ''
+    capacity = 0
+    image_url = ''
+    is_active = True
+    updated_at = None
     
     @classmethod
-    def get_all_active(cls):
-        """Get all venues from Firestore"""
+    @cached_read('venues', default=list)
+    def get_all_active(cls, fields=None):
+        """Get all venues from Firestore, optionally reading only some fields"""
         db = get_firestore_client()
         
         if db is None:
             return []
         
         try:
-            venues_ref = db.collection('venues')
+            venues_ref = db.collection(cls.collection)
+            if fields:
+                venues_ref = venues_ref.select(fields)
             docs = list(venues_ref.stream())
             print(f"Found {len(docs)} venues in Firestore")
             
-            venues = []
-            for doc in docs:
-                data = doc.to_dict()
-                venue = cls(id=doc.id, **data)
-                venues.append(venue)
+            venues = [cls.from_snapshot(doc) for doc in docs]
             
             # Sort by name in Python
             venues.sort(key=lambda x: x.name.lower() if x.name else '')
             return venues
             
         except Exception as e:
+            # cached_read serves the last good list (or []) instead
             print(f"Error fetching venues: {e}")
-            return []
-    
-    @classmethod
-    def get_by_id(cls, venue_id):
-        """Get a specific venue by ID"""
-        db = get_firestore_client()
-        
-        if db is None:
-            return None
-            
-        try:
-            doc = db.collection('venues').document(venue_id).get()
-            
-            if doc.exists:
-                data = doc.to_dict()
-                return cls(id=doc.id, **data)
-        except Exception as e:
-            print(f"Error fetching venue {venue_id}: {e}")
-        
-        return None
+            raise
     
     @classmethod
+    @cached_read('venues', default=0)
     def count_active(cls):
         """Count venues"""
-        venues = cls.get_all_active()
+        venues = cls.get_all_active(fields=cls.field_paths('name'))
         return len(venues)
     
     def get_admin_emails(self):
@@ -92,4 +78,160 @@ class Venue:
     
     def is_sub_admin(self, email):
         """Check if email is a sub admin for this venue"""
-        return email in self.sub_admins if self.sub_admins else False
\ No newline at end of file
+        return email in self.sub_admins if self.sub_admins else False
+    
+    # Fields a site admin may edit through Venue.update()
+    EDITABLE_FIELDS = ('name', 'city')
+    
+    @classmethod
+    def update(cls, venue_id, changes):
+        """Update a venue's details; a new name is copied into venueAdminIndex and its users' venue snapshots"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return False
+        
+        try:
+            venue = cls.get_by_id(venue_id)
+            if venue is None:
+                return False
+            
+            data = {field: changes[field] for field in cls.EDITABLE_FIELDS if field in changes}
+            batch = db.batch()
+            batch.update(db.collection(cls.collection).document(venue_id), data)
+            renamed = data.get('name', venue.name) != venue.name
+            emails = venue.get_admin_emails() if renamed else []
+            for email in emails:
+                batch.set(VenueAdminIndex.ref(db, email), {
+                    'venues': {venue_id: {'name': data['name']}},
+                }, merge=True)
+            batch.commit()
+            
+            cls.invalidate(venue_id)
+            VenueAdminIndex.invalidate(*[VenueAdminIndex.doc_id(email) for email in emails])
+        except Exception as e:
+            print(f"Error updating venue {venue_id}: {e}")
+            return False
+        
+        if renamed:
+            # Users keep a copy of their venue's name too
+            from users.models import User
+            User.sync_venue_snapshots([venue_id])
+        return True
+    
+    # Venue map field for each admin role
+    ADMIN_ROLE_FIELDS = {'admin': 'admins', 'subAdmin': 'subAdmins'}
+    
+    @classmethod
+    def set_admin(cls, venue_id, email, role='admin', value=True):
+        """Grant email the role ('admin' or 'subAdmin') at a venue, keeping venueAdminIndex in step"""
+        db = get_firestore_client()
+        
+        if db is None or role not in cls.ADMIN_ROLE_FIELDS:
+            return False
+        
+        try:
+            venue = cls.get_by_id(venue_id)
+            if venue is None:
+                return False
+            
+            # One role per email per venue; the venue and index writes commit together
+            batch = db.batch()
+            updates = {
+                FieldPath(field, email).to_api_repr(): value if field_role == role else DELETE_FIELD
+                for field_role, field in cls.ADMIN_ROLE_FIELDS.items()
+            }
+            batch.update(db.collection(cls.collection).document(venue_id), updates)
+            batch.set(VenueAdminIndex.ref(db, email), {
+                'email': email,
+                'venues': {venue_id: {'role': role, 'name': venue.name}},
+            }, merge=True)
+            batch.commit()
+            
+            cls.invalidate(venue_id)
+            VenueAdminIndex.invalidate(VenueAdminIndex.doc_id(email))
+            return True
+        except Exception as e:
+            print(f"Error setting {role} {email} for venue {venue_id}: {e}")
+            return False
+    
+    @classmethod
+    def remove_admin(cls, venue_id, email):
+        """Remove email from both admin maps of a venue and from venueAdminIndex"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return False
+        
+        try:
+            batch = db.batch()
+            batch.update(db.collection(cls.collection).document(venue_id), {
+                FieldPath(field, email).to_api_repr(): DELETE_FIELD
+                for field in cls.ADMIN_ROLE_FIELDS.values()
+            })
+            batch.set(VenueAdminIndex.ref(db, email), {'venues': {venue_id: DELETE_FIELD}}, merge=True)
+            batch.commit()
+            
+            cls.invalidate(venue_id)
+            VenueAdminIndex.invalidate(VenueAdminIndex.doc_id(email))
+            return True
+        except Exception as e:
+            print(f"Error removing {email} from venue {venue_id}: {e}")
+            return False
+    
+    @classmethod
+    def get_managed_by(cls, email):
+        """Venues email administers, as {venue_id: {'role', 'name'}} - one index read"""
+        entry = VenueAdminIndex.get_by_id(VenueAdminIndex.doc_id(email))
+        return entry.venues if entry else {}
+
+
+class VenueAdminIndex(FirestoreDocument):
+    """Reverse index venueAdminIndex/{email} -> the venues that email administers.
+
+    Every write the app makes to a venue's admins/subAdmins maps or name
+    goes through Venue.set_admin(), remove_admin() or update(), which change
+    the index in the same batch. rebuild() recreates it from the venues, for
+    edits made outside the app (run rebuild_venue_admin_index --loop N to
+    pick those up on a schedule).
+    """
+    
+    collection = 'venueAdminIndex'
+    fields = (
+        Field('email', default=''),
+        Field('venues', default=dict),
+    )
+    
+    @staticmethod
+    def doc_id(email):
+        return email.strip().lower()
+    
+    @classmethod
+    def ref(cls, db, email):
+        return db.collection(cls.collection).document(cls.doc_id(email))
+    
+    @classmethod
+    def rebuild(cls):
+        """Recreate the whole index from the venues' admin maps; returns the number of emails indexed"""
+        db = get_firestore_client()
+        
+        if db is None:
+            return 0
+        
+        index = {}
+        for doc in db.collection(Venue.collection).stream():
+            venue = Venue.from_snapshot(doc)
+            for role, emails in (('admin', venue.admins), ('subAdmin', venue.sub_admins)):
+                for email in emails or {}:
+                    entry = index.setdefault(cls.doc_id(email), {'email': email, 'venues': {}})
+                    entry['venues'].setdefault(venue.id, {'role': role, 'name': venue.name})
+        
+        stale = [doc.id for doc in db.collection(cls.collection).select([]).stream() if doc.id not in index]
+        with BatchWriter(db) as writer:
+            for doc_id, entry in index.items():
+                writer.set(db.collection(cls.collection).document(doc_id), entry)
+            for doc_id in stale:
+                writer.delete(db.collection(cls.collection).document(doc_id))
+        
+        cls.invalidate(*index, *stale)
+        return len(index)
\ No newline at end of file
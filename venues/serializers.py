@@ -10,7 +10,17 @@ class VenueSerializer(serializers.Serializer):
     sub_admins = serializers.DictField(read_only=True)
     admin_emails = serializers.ListField(read_only=True, source='get_admin_emails')
 
+class VenueUpdateSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200, required=False)
+    city = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+class VenueAdminSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    role = serializers.ChoiceField(choices=list(Venue.ADMIN_ROLE_FIELDS), default='admin')
+
 class VenueListSerializer(serializers.Serializer):
+    document_fields = Venue.field_paths('name', 'city')
+    
     id = serializers.CharField(read_only=True)
     name = serializers.CharField()
     city = serializers.CharField()
\ No newline at end of file
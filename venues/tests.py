@@ -1,3 +1,61 @@
-from django.test import TestCase
+from rest_framework.test import APIClient
+from burnermanagement.testing import MemoryBackendTestCase
+from users.models import User
+from .models import Venue, VenueAdminIndex
 
-# Create your tests here.
+
+class VenueAdminIndexTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_venue('venue-1', name='The Venue')
+        self.create_venue('venue-2', name='Other Venue')
+        self.admin = User.objects.create(username='site', email='site@example.com', role='siteAdmin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def managed(self, email):
+        return self.client.get('/api/venues/managed/', {'email': email}).json()
+
+    def test_admin_changes_keep_the_index_in_step(self):
+        self.client.post('/api/venues/venue-1/admins/', {'email': 'owner@example.com'})
+        self.client.post('/api/venues/venue-2/admins/', {'email': 'owner@example.com', 'role': 'subAdmin'})
+
+        self.assertEqual(self.managed('owner@example.com'), [
+            {'id': 'venue-2', 'name': 'Other Venue', 'role': 'subAdmin'},
+            {'id': 'venue-1', 'name': 'The Venue', 'role': 'admin'},
+        ])
+        self.assertTrue(Venue.get_by_id('venue-1').is_admin('owner@example.com'))
+
+        response = self.client.delete('/api/venues/venue-1/admins/owner@example.com/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual([venue['id'] for venue in self.managed('owner@example.com')], ['venue-2'])
+        self.assertFalse(Venue.get_by_id('venue-1').is_admin('owner@example.com'))
+
+    def test_renaming_a_venue_renames_its_index_entries(self):
+        self.client.post('/api/venues/venue-1/admins/', {'email': 'owner@example.com'})
+
+        response = self.client.patch('/api/venues/venue-1/', {'name': 'The Big Venue'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.managed('owner@example.com'), [{'id': 'venue-1', 'name': 'The Big Venue', 'role': 'admin'}])
+
+    def test_only_site_admins_change_venues(self):
+        venue_admin = User.objects.create(
+            username='owner', email='owner@example.com', role='venueAdmin', venue_id='venue-1'
+        )
+        self.client.force_authenticate(venue_admin)
+
+        self.assertEqual(self.client.patch('/api/venues/venue-1/', {'name': 'Mine'}).status_code, 403)
+        self.assertEqual(self.client.post('/api/venues/venue-1/admins/', {'email': 'x@example.com'}).status_code, 403)
+        self.assertEqual(self.client.get('/api/venues/managed/', {'email': 'site@example.com'}).status_code, 403)
+
+    def test_rebuild_picks_up_edits_made_outside_the_app(self):
+        Venue.set_admin('venue-1', 'gone@example.com')
+        self.db.collection('venues').document('venue-1').set({'name': 'The Venue', 'admins': {}})
+        self.db.collection('venues').document('venue-2').update({'admins': {'new@example.com': True}})
+
+        self.assertEqual(VenueAdminIndex.rebuild(), 1)
+
+        self.assertEqual(Venue.get_managed_by('gone@example.com'), {})
+        self.assertEqual(Venue.get_managed_by('new@example.com'), {'venue-2': {'role': 'admin', 'name': 'Other Venue'}})
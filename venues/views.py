@@ -1,16 +1,19 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from events.exports import export_venue_events
+from events.views import export_response, sales_response
 from .models import Venue
-from .serializers import VenueSerializer, VenueListSerializer
+from .serializers import VenueSerializer, VenueListSerializer, VenueUpdateSerializer, VenueAdminSerializer
 
 class VenueViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_scope = 'venues'
     
     def list(self, request):
         """Get all active venues"""
-        venues = Venue.get_all_active()
+        venues = Venue.get_all_active(fields=VenueListSerializer.document_fields)
         serializer = VenueListSerializer(venues, many=True)
         return Response(serializer.data)
     
@@ -25,8 +28,115 @@ class VenueViewSet(viewsets.ViewSet):
         serializer = VenueSerializer(venue)
         return Response(serializer.data)
     
+    def partial_update(self, request, pk=None):
+        """Edit a venue's name or city (site admins)"""
+        if not request.user.is_site_admin():
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = VenueUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not Venue.get_by_id(pk):
+            return Response(
+                {'error': 'Venue not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if serializer.validated_data and not Venue.update(pk, serializer.validated_data):
+            return Response(
+                {'error': 'Failed to update venue'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(VenueSerializer(Venue.get_by_id(pk)).data)
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def admins(self, request, pk=None):
+        """Make an email an admin or sub admin of the venue (site admins)"""
+        if not request.user.is_site_admin():
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = VenueAdminSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not Venue.get_by_id(pk):
+            return Response(
+                {'error': 'Venue not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not Venue.set_admin(pk, serializer.validated_data['email'], serializer.validated_data['role']):
+            return Response(
+                {'error': 'Failed to update venue admins'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(VenueSerializer(Venue.get_by_id(pk)).data)
+    
+    @action(detail=True, methods=['delete'], url_path=r'admins/(?P<email>[^/]+)', permission_classes=[IsAuthenticated])
+    def remove_admin(self, request, pk=None, email=None):
+        """Take an email off the venue's admins and sub admins (site admins)"""
+        if not request.user.is_site_admin():
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if not Venue.get_by_id(pk):
+            return Response(
+                {'error': 'Venue not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not Venue.remove_admin(pk, email):
+            return Response(
+                {'error': 'Failed to update venue admins'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
     @action(detail=False, methods=['get'])
     def count(self, request):
         """Get venue count"""
         count = Venue.count_active()
-        return Response({'count': count})
\ No newline at end of file
+        return Response({'count': count})
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def managed(self, request):
+        """Venues the current user administers, from venueAdminIndex (site admins may pass ?email=)"""
+        email = request.user.email
+        if request.query_params.get('email'):
+            if not request.user.is_site_admin():
+                return Response(
+                    {'error': 'Permission denied'}, 
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            email = request.query_params['email']
+        
+        if not email:
+            return Response([])
+        
+        managed = Venue.get_managed_by(email)
+        return Response([
+            {'id': venue_id, 'name': entry.get('name', ''), 'role': entry.get('role', '')}
+            for venue_id, entry in sorted(managed.items(), key=lambda item: item[1].get('name', ''))
+        ])
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def sales(self, request, pk=None):
+        """Tickets sold and revenue per hour or day across the venue's events (venue admins)"""
+        if not request.user.can_manage_venue(pk):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return sales_response(request, 'venues', pk)
+    
+    @action(detail=True, methods=['get'], url_path='events/export', permission_classes=[IsAuthenticated])
+    def export_events(self, request, pk=None):
+        """Stream every event at the venue as CSV or NDJSON (venue admins)"""
+        if not request.user.can_manage_venue(pk):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return export_response(request, export_venue_events, pk)